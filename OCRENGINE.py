@@ -1,7 +1,11 @@
 import jaconv
 import re
 import os
+import threading
+import numpy as np
 from PIL import Image
+from metrics import timed
+from modelManager import MODELS
 class OCREngine:
     """
     A simple class that instantiates the selected OCR engine and 
@@ -9,24 +13,49 @@ class OCREngine:
     """
     def __init__(self, engine_name):
         self.engine_name = engine_name
-        self.reader = None
         self.pretrained_model_name_or_path = None
+        # Weights file the OCR output depends on, versioned in the job manifest (see ocr_version)
+        self.model_path = None
         self.feature_extractor = None
-        self.model = None
+        self.tokenizer = None
+        # The EasyOCR reader or the VisionEncoderDecoderModel, loaded on first use
+        # and dropped again when idle (see modelManager.py)
+        self.weights = None
+        self._lock = threading.Lock()
+        # Reused preprocessing buffers, see preprocess_batch
+        self._u8_buf = None
+        self._f64_buf = None
+        self._out_buf = None
         script_dir = os.path.dirname(os.path.abspath(__file__))
         if engine_name == "Chinese":
             print("Using Chinese")
-            import easyocr
-            self.reader = easyocr.Reader(['ch_sim'])
+            # EasyOCR's recognition weights for ch_sim, where easyocr.Reader downloads them
+            easyocr_dir = os.getenv("EASYOCR_MODULE_PATH", os.path.join(os.path.expanduser("~"), ".EasyOCR"))
+            self.model_path = os.path.join(easyocr_dir, "model", "zh_sim_g2.pth")
+            self.weights = MODELS.register("ocr Chinese (EasyOCR)", self._load_reader)
 
         elif engine_name == "Japanese":
-            from transformers import AutoFeatureExtractor, AutoTokenizer, VisionEncoderDecoderModel
+            from transformers import AutoFeatureExtractor, AutoTokenizer
 
             self.pretrained_model_name_or_path = os.path.join(script_dir, "model")
             self.feature_extractor = AutoFeatureExtractor.from_pretrained(self.pretrained_model_name_or_path)
 
             self.tokenizer = AutoTokenizer.from_pretrained(self.pretrained_model_name_or_path)
-            self.model = VisionEncoderDecoderModel.from_pretrained(self.pretrained_model_name_or_path)
+            self.model_path = next(
+                (path for path in (os.path.join(self.pretrained_model_name_or_path, name)
+                                   for name in ("model.safetensors", "pytorch_model.bin"))
+                 if os.path.isfile(path)),
+                self.pretrained_model_name_or_path,
+            )
+            self.weights = MODELS.register(f"ocr Japanese {self.pretrained_model_name_or_path}", self._load_model)
+
+    def _load_reader(self):
+        import easyocr
+        return easyocr.Reader(['ch_sim'])
+
+    def _load_model(self):
+        from transformers import VisionEncoderDecoderModel
+        return VisionEncoderDecoderModel.from_pretrained(self.pretrained_model_name_or_path)
 
     def post_process(self, text):
         if self.engine_name == "Chinese":
@@ -38,31 +67,116 @@ class OCREngine:
         return text
     
     def preprocess(self, img):
-        img = Image.fromarray(img)
-        img = img.convert('L').convert('RGB')
-        pixel_values = self.feature_extractor(img, return_tensors="pt").pixel_values
-        return pixel_values.squeeze()
-    
+        return self.preprocess_batch([img])[0].clone()
+
+    def _fast_preprocess_params(self):
+        """
+        Resize/rescale/normalize settings of a ViT-style feature extractor,
+        or None if it does something we don't reproduce (then we use it directly).
+        """
+        fe = self.feature_extractor
+        size = getattr(fe, "size", None)
+        if isinstance(size, dict) and "height" in size and "width" in size:
+            height, width = size["height"], size["width"]
+        elif getattr(size, "height", None) and getattr(size, "width", None):
+            height, width = size.height, size.width
+        elif isinstance(size, int):
+            height = width = size
+        else:
+            return None
+        if not getattr(fe, "do_resize", True):
+            return None
+        mean = fe.image_mean if getattr(fe, "do_normalize", False) else None
+        std = fe.image_std if getattr(fe, "do_normalize", False) else None
+        scale = fe.rescale_factor if getattr(fe, "do_rescale", True) else None
+        return height, width, getattr(fe, "resample", Image.BILINEAR), scale, mean, std
+
+    def _buffers(self, n, height, width):
+        """Preallocated uint8/float buffers, grown only when a bigger batch shows up."""
+        if self._u8_buf is None or self._u8_buf.shape[0] < n or self._u8_buf.shape[1:] != (height, width):
+            capacity = max(n, 8)
+            self._u8_buf = np.empty((capacity, height, width), dtype=np.uint8)
+            self._f64_buf = np.empty((capacity, height, width), dtype=np.float64)
+            self._out_buf = np.empty((capacity, 3, height, width), dtype=np.float32)
+        return self._u8_buf[:n], self._f64_buf[:n], self._out_buf[:n]
+
+    @timed("ocr_preprocess")
+    def preprocess_batch(self, imgs):
+        """
+        Preprocess a list of crops into one (N, 3, H, W) float tensor.
+        Matches feature_extractor(img.convert('L').convert('RGB')) value for value:
+        the gray channel is resized once (bilinear acts per band, so the three RGB
+        bands would be identical) and rescale/normalize run vectorized over the
+        whole batch in preallocated buffers. The returned tensor shares memory
+        with those buffers, so it is only valid until the next call.
+        """
+        import torch
+        params = self._fast_preprocess_params()
+        if params is None:
+            pixel_values = [
+                self.feature_extractor(Image.fromarray(img).convert('L').convert('RGB'), return_tensors="pt").pixel_values
+                for img in imgs
+            ]
+            return torch.cat(pixel_values)
+
+        height, width, resample, scale, mean, std = params
+        gray, as_float, out = self._buffers(len(imgs), height, width)
+        for i, img in enumerate(imgs):
+            crop = Image.fromarray(img).convert('L')
+            gray[i] = np.asarray(crop.resize((width, height), resample=resample, reducing_gap=None))
+
+        # Same arithmetic as transformers: rescale in float64, then float32 normalize
+        np.multiply(gray, scale if scale is not None else 1.0, out=as_float)
+        for c in range(3):
+            np.copyto(out[:, c], as_float, casting="unsafe")
+            if mean is not None:
+                out[:, c] -= np.float32(mean[c])
+                out[:, c] /= np.float32(std[c])
+        return torch.from_numpy(out)
+
     def predict(self, np_image):
         """
         Takes a NumPy array of the image/ROI and returns recognized text lines.
         """
-        if self.engine_name == "Chinese" and self.reader:
-            # Example usage of EasyOCR
-            return self.reader.readtext(
-                np_image, detail=0, paragraph=True, y_ths=1, canvas_size=1000
-            )
-        elif self.engine_name == "Japanese" and self.feature_extractor and self.tokenizer and self.model:
-            x = self.preprocess(np_image)
-            x = self.model.generate(x[None].to(self.model.device), max_length=300)[0] #.cpu()
-            x = self.tokenizer.decode(x, skip_special_tokens=True)
-            x = self.post_process(x)
-            return [x]
+        return self.predict_batch([np_image])[0]
+
+    def predict_batch(self, np_images, max_length=300):
+        """
+        OCR several crops at once. Returns one list of lines per crop,
+        in the same order (the same thing predict returns for each).
+        """
+        return self.predict_batch_with_lengths(np_images, max_length)[0]
+
+    @timed("ocr_predict")
+    def predict_batch_with_lengths(self, np_images, max_length=300):
+        """
+        predict_batch, plus the number of tokens generated for each crop
+        (None for engines that don't decode tokens). A length equal to
+        max_length means the text was cut off.
+        """
+        if not np_images:
+            return [], None
+        with self._lock:
+            if self.engine_name == "Chinese" and self.weights:
+                # Example usage of EasyOCR
+                with self.weights.use() as reader:
+                    return [
+                        reader.readtext(
+                            np_image, detail=0, paragraph=True, y_ths=1, canvas_size=1000
+                        )
+                        for np_image in np_images
+                    ], None
+            elif self.engine_name == "Japanese" and self.feature_extractor and self.tokenizer and self.weights:
+                x = self.preprocess_batch(np_images)
+                with self.weights.use() as model:
+                    x = model.generate(x.to(model.device), max_length=max_length) #.cpu()
+                lengths = (x != self.tokenizer.pad_token_id).sum(dim=1).tolist()
+                texts = self.tokenizer.batch_decode(x, skip_special_tokens=True)
+                return [[self.post_process(text)] for text in texts], lengths
+            return [None for _ in np_images], None
         
     def cleanup(self):
-        if self.reader or self.model:
-            import torch
-            torch.cuda.empty_cache()
-            pass
-        self.reader = None
-        self.model = None
\ No newline at end of file
+        # Frees the weights now instead of waiting for them to go idle
+        if self.weights is not None:
+            MODELS.unregister(self.weights)
+        self.weights = None
\ No newline at end of file
@@ -1,5 +1,6 @@
 import os
 import math
+import threading
 import torch
 import numpy as np
 import torch.nn as nn
@@ -7,6 +8,8 @@ import torch.nn.functional as F
 from torch.nn import TransformerEncoder, TransformerEncoderLayer
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from metrics import timed
+from modelManager import MODELS
 
 # Configuration Constants
 DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
@@ -127,17 +130,92 @@ class MangaVisualizer:
 
 class SequencerTransformer():
     def __init__(self, model_path):
-        self.model = MangaTransformer().to(DEVICE)
-        self.model.load_state_dict(torch.load(model_path, map_location=DEVICE), strict=False)
-        self.model.eval()
+        self.model_path = model_path
+        # Weights are loaded on first use and dropped again when idle, see modelManager.py
+        self.model = MODELS.register(f"sequencer {model_path}", self._load)
+        # Shared by the window and the chapter queue threads (see get_sequencer)
+        self._lock = threading.Lock()
+
+    def _load(self):
+        model = MangaTransformer().to(DEVICE)
+        model.load_state_dict(torch.load(self.model_path, map_location=DEVICE), strict=False)
+        model.eval()
+        return model
     
     # Expects xc yc w h
     def preprocessor(self, panels):
         preprocessed = [MangaTransformer.preprocess_panel(*panel) for panel in panels]
         return preprocessed
     
+    @timed("sequencer_predict")
     def predict(self, panels):
         preprocessed = self.preprocessor(panels)
-        sequence = self.model.predict_sequence(preprocessed)
+        with self._lock, self.model.use() as model:
+            sequence = model.predict_sequence(preprocessed)
         return sequence
+
+# Reading order checkpoints, one per direction. Loaded lazily and shared.
+# Directions without a checkpoint ("Strip" for webtoons) use the geometric engine.
+SEQUENCER_MODELS = {
+    "RTL": "./model/manga_transformerv1RTL_epoch50_lr1e4.pth",
+    "LTR": "./model/manga_transformerv3v2_epoch40lr1e4.pth",
+}
+
+# Process-wide sequencer cache, keyed by absolute checkpoint path.
+# Every window/job asking for the same checkpoint shares one sequencer, whose
+# weights come and go with MODELS.
+_SEQUENCER_CACHE = {}
+_SEQUENCER_LOCK = threading.Lock()
+
+def get_sequencer(model_path):
+    """Return the shared SequencerTransformer for model_path (its weights load on first predict)."""
+    key = os.path.abspath(model_path)
+    with _SEQUENCER_LOCK:
+        sequencer = _SEQUENCER_CACHE.get(key)
+        if sequencer is None:
+            sequencer = SequencerTransformer(model_path)
+            _SEQUENCER_CACHE[key] = sequencer
+        return sequencer
+
+def is_sequencer_loaded(model_path):
+    sequencer = _SEQUENCER_CACHE.get(os.path.abspath(model_path))
+    return sequencer is not None and sequencer.model.loaded
+
+def release_sequencer(model_path):
+    """Drop a cached sequencer and free its weights."""
+    with _SEQUENCER_LOCK:
+        sequencer = _SEQUENCER_CACHE.pop(os.path.abspath(model_path), None)
+    if sequencer is not None:
+        MODELS.unregister(sequencer.model)
+
+def available_memory_mb():
+    """Best-effort free RAM in MB, or None when it can't be determined."""
+    try:
+        import psutil
+        return psutil.virtual_memory().available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+def preload_sequencers(model_paths, min_free_mb=1024):
+    """
+    Load every checkpoint in model_paths while memory allows, so switching
+    reading direction soon after never hits torch.load. Ones that stay unused
+    are dropped again after MODEL_IDLE_SECONDS.
+    """
+    for model_path in model_paths:
+        if is_sequencer_loaded(model_path) or not os.path.exists(model_path):
+            continue
+        free_mb = available_memory_mb()
+        if free_mb is not None and free_mb < min_free_mb:
+            print(f"Skipping sequencer preload, only {free_mb:.0f} MB free")
+            return
+        get_sequencer(model_path).model.load()
     
\ No newline at end of file
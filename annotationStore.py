@@ -0,0 +1,388 @@
+import os
+import json
+import stat
+import tempfile
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from metrics import timer
+from boxRecords import PageBoxes, max_box_id
+from serializers import get_codec, json_codec
+
+# annotations.json of a chapter directory, read one page at a time.
+#
+#   annotations = AnnotationStore("C:/manga/ch12")   # reads the page index only
+#   file_data = annotations.get(file_path, [])       # parses this one page (a PageBoxes)
+#   annotations[file_path] = file_data               # dirty until flush()
+#   annotations.flush()                              # writes the file
+#
+# The file keeps its { file_path: [box, ...] } layout, encoded by the codec from
+# serializers.py (compact JSON, indent=4 JSON or msgpack). Next to it, an index
+# (annotations.index.json) records where each page's value starts and ends in
+# the file (byte offset and length) and its largest box id, tagged with the
+# file's size/mtime/inode. Opening a directory reads that small index; a missing
+# or stale one (file written by an older version or edited by hand) is rebuilt
+# by one pass over the file, keeping a single page parsed at a time.
+#
+# Pages are parsed when asked for and kept in an LRU of ANNOTATION_CACHE_PAGES.
+# Callers mutate the lists they get in place, so a page leaving the LRU is
+# compared with what was read; changed pages and pages assigned with
+# annotations[...] = ... stay in memory as dirty until the next flush(), which
+# also happens by itself once more than ANNOTATION_DIRTY_PAGES are waiting.
+#
+# flush() rewrites the file, copying the bytes of untouched pages straight from
+# the old file, so a save costs one sequential copy plus encoding the dirty
+# pages, not a parse and dump of every page. (A file in another layout than the
+# codec writes, say indent=4 JSON read with orjson, is re-encoded once, on the
+# first flush.) If another writer (the chapter queue) replaced the file in the
+# meantime, its index is reloaded first: their pages are kept, ours win where
+# both changed. Stores of the same directory in this process (the window's and
+# a chapter queue job's) flush one at a time, and every file is written to its
+# own temp file and moved into place, so writers never see each other's halves.
+#
+# With the msgpack codec the pages live in annotations.msgpack; annotations.json
+# is imported on open when it changed since we last wrote it, and written back
+# by export_json().
+#
+# AnnotationStore(directory, read_only=True) is a view for looking at another
+# chapter's pages (the duplicate page finder): it never writes the file or the
+# index, and reads annotations.json itself instead of importing it.
+
+ANNOTATION_CACHE_PAGES = int(os.getenv("ANNOTATION_CACHE_PAGES", 64))
+ANNOTATION_DIRTY_PAGES = int(os.getenv("ANNOTATION_DIRTY_PAGES", 32))
+INDEX_VERSION = 2
+
+
+_directory_locks = {}
+_directory_locks_lock = threading.Lock()
+
+def _directory_lock(directory):
+    """The lock every store of 'directory' in this process writes under."""
+    key = os.path.normcase(os.path.abspath(directory))
+    with _directory_locks_lock:
+        return _directory_locks.setdefault(key, threading.RLock())
+
+@contextmanager
+def replacing(path, mode="wb", encoding=None):
+    """A file opened on a unique temp name next to 'path', moved over 'path' once written."""
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(path) + ".", suffix=".tmp", dir=os.path.dirname(path) or ".")
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+        try:
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            os.chmod(tmp_path, 0o644)  # mkstemp's 0600 would hide it from other users
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def _file_signature(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_size, st.st_mtime_ns, st.st_ino]
+
+
+class AnnotationStore(MutableMapping):
+    def __init__(self, directory, cache_pages=ANNOTATION_CACHE_PAGES, dirty_pages=ANNOTATION_DIRTY_PAGES, codec=None,
+                 read_only=False):
+        self.directory = directory
+        self.read_only = read_only
+        self.codec = codec or get_codec()
+        self.path = os.path.join(directory, self.codec.file_name)
+        self.index_path = os.path.join(directory, self.codec.index_name)
+        self.json_path = os.path.join(directory, "annotations.json")
+        self.cache_pages = cache_pages
+        self.dirty_pages = dirty_pages
+        self._spans = {}             # file_path -> (offset, length) in the file, None if not written yet
+        self._max_ids = {}           # file_path -> largest box id on disk
+        self._pages = OrderedDict()  # file_path -> parsed page (LRU, clean as far as we know)
+        self._digests = {}           # file_path -> hash of the page as read
+        self._dirty = {}             # file_path -> page to write on the next flush
+        self._removed = False        # a page was deleted since the last flush
+        self._signature = None       # (size, mtime_ns, inode) of the file _spans describe
+        self._layout = None          # codec layout the file is written in
+        self._exported = None        # signature of annotations.json when last imported/exported
+        self._lock = threading.RLock()
+        with timer("annotations_open"):
+            self._load_index()
+            if not self.codec.is_json and self._json_changed():
+                if read_only:
+                    self._read_json_instead()
+                else:
+                    self._import_json()
+
+    ####################################################################
+    # Index
+    ####################################################################
+    def _load_index(self):
+        """(Re)read the page index of the file on disk; dirty pages are kept."""
+        for key, file_data in self._pages.items():
+            if self._changed(key, file_data):
+                self._dirty[key] = file_data
+        self._pages.clear()
+        self._digests.clear()
+        self._signature = _file_signature(self.path)
+        if self._signature is None:
+            entries = []
+            self._layout = self.codec.layout
+        else:
+            entries = self._read_index()
+            if entries is None:
+                with open(self.path, "rb") as f:
+                    entries = self.codec.scan(f)
+                self._layout = self._sniff_layout(entries)
+                self._write_index(entries)
+        spans = {key: (offset, length) for key, offset, length, _ in entries}
+        # Pages only we know about go after the ones on disk, as dict.update would put them
+        spans.update((key, None) for key in self._spans if key not in spans and key in self._dirty)
+        self._spans = spans
+        self._max_ids = {key: max_id for key, _, _, max_id in entries}
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if index.get("version") != INDEX_VERSION or index.get("file") != self._signature:
+            return None
+        self._layout = index["layout"]
+        self._exported = index.get("exported")
+        return index["pages"]
+
+    def _write_index(self, entries):
+        if self.read_only:
+            return
+        index = {
+            "version": INDEX_VERSION, "file": self._signature, "layout": self._layout,
+            "exported": self._exported, "pages": entries,
+        }
+        try:
+            with replacing(self.index_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+        except OSError:
+            pass  # read-only directory: rescan next time
+
+    def _entries(self):
+        return [[key, offset, length, self._max_ids.get(key, 0)] for key, (offset, length) in self._spans.items()]
+
+    def _sniff_layout(self, entries):
+        """The codec's layout if the first page re-encodes to the same bytes, else None."""
+        if not entries:
+            return self.codec.layout
+        _, offset, length, _ = entries[0]
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            raw = f.read(length)
+        return self.codec.layout if self.codec.dumps(self.codec.loads(raw)) == raw else None
+
+    ####################################################################
+    # Pages
+    ####################################################################
+    def _read_raw(self, f, key):
+        offset, length = self._spans[key]
+        f.seek(offset)
+        return f.read(length)
+
+    def _read_page(self, key):
+        if _file_signature(self.path) != self._signature:
+            # Replaced behind our back, offsets are stale
+            self._load_index()
+            if self._spans.get(key) is None:
+                raise KeyError(key)
+        with open(self.path, "rb") as f:
+            raw = self._read_raw(f, key)
+        self._digests[key] = hash(raw)
+        return PageBoxes.from_json(self.codec.loads(raw))
+
+    def _changed(self, key, file_data):
+        return hash(self.codec.dumps(file_data)) != self._digests.get(key)
+
+    def _evict(self, keep=None):
+        """Trim the LRU, never dropping 'keep' (the page being handed out)."""
+        for key in list(self._pages):
+            if len(self._pages) <= self.cache_pages:
+                break
+            if key == keep:
+                continue
+            file_data = self._pages.pop(key)
+            if not self.read_only and self._changed(key, file_data):
+                self._dirty[key] = file_data
+            self._digests.pop(key, None)
+        if len(self._dirty) > self.dirty_pages:
+            self.flush()
+
+    def __getitem__(self, key):
+        with self._lock:
+            file_data = self._dirty.get(key)
+            if file_data is not None:
+                return file_data
+            file_data = self._pages.get(key)
+            if file_data is not None:
+                self._pages.move_to_end(key)
+                return file_data
+            if self._spans.get(key) is None:
+                raise KeyError(key)
+            with timer("annotations_page_load"):
+                file_data = self._read_page(key)
+            self._pages[key] = file_data
+            self._evict(keep=key)
+            return file_data
+
+    def __setitem__(self, key, file_data):
+        self._check_writable()
+        with self._lock:
+            self._pages.pop(key, None)
+            self._digests.pop(key, None)
+            self._spans.setdefault(key, None)
+            self._dirty[key] = file_data
+            if len(self._dirty) > self.dirty_pages:
+                self.flush()
+
+    def __delitem__(self, key):
+        self._check_writable()
+        with self._lock:
+            if key not in self._spans:
+                raise KeyError(key)
+            del self._spans[key]
+            self._pages.pop(key, None)
+            self._digests.pop(key, None)
+            self._dirty.pop(key, None)
+            self._max_ids.pop(key, None)
+            self._removed = True
+
+    def __contains__(self, key):
+        return key in self._spans
+
+    def __iter__(self):
+        return iter(list(self._spans))
+
+    def __len__(self):
+        return len(self._spans)
+
+    def max_box_id(self):
+        """Largest box id over all pages, without parsing the ones not in memory."""
+        with self._lock:
+            ids = [max_box_id(file_data) for file_data in self._dirty.values()]
+            ids += [max_box_id(file_data) for file_data in self._pages.values()]
+            ids += [
+                max_id for key, max_id in self._max_ids.items()
+                if key not in self._dirty and key not in self._pages
+            ]
+            return max(ids, default=0)
+
+    ####################################################################
+    # Writing
+    ####################################################################
+    def _check_writable(self):
+        if self.read_only:
+            raise TypeError(f"{self.path} is opened read-only")
+
+    def flush(self, force=False):
+        """Write dirty pages (and pages changed in place) to the file."""
+        self._check_writable()
+        with self._lock:
+            for key, file_data in self._pages.items():
+                if self._changed(key, file_data):
+                    self._dirty[key] = file_data
+            if not (self._dirty or self._removed or force):
+                return
+            with timer("annotations_write"), _directory_lock(self.directory):
+                if _file_signature(self.path) != self._signature:
+                    self._load_index()
+                self._write()
+
+    def _write(self):
+        codec = self.codec
+        convert = self._layout != codec.layout
+        entries = []
+        digests = {}
+        old = open(self.path, "rb") if self._signature is not None else None
+        try:
+            with replacing(self.path) as out:
+                offset = out.write(codec.begin(len(self._spans)))
+                for n, key in enumerate(self._spans):
+                    offset += out.write(codec.key(key, n == 0))
+                    file_data = self._dirty.get(key)
+                    if file_data is not None:
+                        data = codec.dumps(file_data)
+                        max_id = max_box_id(file_data)
+                        digests[key] = hash(data)
+                    else:
+                        data = self._read_raw(old, key)
+                        if convert:
+                            data = codec.dumps(codec.loads(data))
+                        max_id = self._max_ids.get(key, 0)
+                    entries.append([key, offset, len(data), max_id])
+                    offset += out.write(data)
+                out.write(codec.end(len(entries)))
+        finally:
+            if old is not None:
+                old.close()
+
+        self._signature = _file_signature(self.path)
+        self._layout = codec.layout
+        self._spans = {key: (offset, length) for key, offset, length, _ in entries}
+        self._max_ids = {key: max_id for key, _, _, max_id in entries}
+        # Written pages stay cached as clean ones, and aren't evicted here: a caller
+        # may still be about to edit one (the LRU is trimmed on the next fetch)
+        self._pages.update(self._dirty)
+        self._digests.update(digests)
+        self._dirty.clear()
+        self._removed = False
+        self._write_index(entries)
+
+    ####################################################################
+    # annotations.json next to a binary file
+    ####################################################################
+    def _json_changed(self):
+        json_signature = _file_signature(self.json_path)
+        return json_signature is not None and json_signature != self._exported
+
+    def _import_json(self):
+        """Take the pages of an annotations.json written by someone else (theirs win)."""
+        with timer("annotations_import"):
+            source = AnnotationStore(self.directory, self.cache_pages, self.dirty_pages, codec=json_codec())
+            for key in source:
+                self[key] = source[key]
+            self._exported = source._signature
+            self.flush(force=True)
+
+    def _read_json_instead(self):
+        """Read pages from annotations.json, which has changes the binary file lacks (read-only view)."""
+        self.codec = json_codec()
+        self.path = self.json_path
+        self.index_path = os.path.join(self.directory, self.codec.index_name)
+        self._load_index()
+
+    def export_json(self):
+        """
+        Write annotations.json (for to_yolo and other tools) when the pages are
+        kept in a binary file; with a JSON codec this is just flush().
+        """
+        self._check_writable()
+        # Flushed under the directory lock, so nobody replaces the file before it is read back
+        with self._lock, _directory_lock(self.directory):
+            self.flush()
+            if _file_signature(self.path) != self._signature:
+                self._load_index()
+            if self.codec.is_json or self._signature is None:
+                return
+            with timer("annotations_export"):
+                target = json_codec()
+                with open(self.path, "rb") as old, replacing(self.json_path) as out:
+                    out.write(target.begin(len(self._spans)))
+                    for n, key in enumerate(self._spans):
+                        out.write(target.key(key, n == 0))
+                        out.write(target.dumps(self.codec.loads(self._read_raw(old, key))))
+                    out.write(target.end(len(self._spans)))
+                self._exported = _file_signature(self.json_path)
+                self._write_index(self._entries())
@@ -0,0 +1,401 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import numpy as np
+from PIL import Image, ImageDraw
+from metrics import METRICS, Metrics, timer
+from annotationStore import AnnotationStore
+from boxRecords import crop_box
+
+# Offline benchmark of the page pipeline: decode -> detect -> panels -> OCR -> arrange -> save.
+#
+#   python benchmark.py --pages 30 --output results.json
+#   python benchmark.py --pages 30 --output after.json --compare results.json
+#
+# Pages are generated (panels with gutters, outlined bubbles with text strokes)
+# from a fixed seed, so every run sees the same input and the true boxes, panels
+# and reading order are known. By default small stand-in models are used: they
+# cost real CPU time in the same shape as the real ones (a conv pass per page, a
+# greedy decoder whose step count follows the text length, the real
+# MangaTransformer architecture with random weights) but need no weights, GPU or
+# network. --real uses BoxDetection / PanelDetection / OCREngine / the sequencer
+# checkpoints instead, for machines that have them. The stand-in sequencer's
+# order is random, so with --order ai and stand-ins order_accuracy is None.
+
+RESULTS_VERSION = 1
+PAGE_SIZE = (1200, 1700)
+
+
+###############################################################################
+# Synthetic pages
+###############################################################################
+
+def _panel_grid(rng, width, height, direction, margin=40, gutter=30):
+    """Panel rects (x, y, w, h) in reading order."""
+    rows = int(rng.integers(2, 5))
+    heights = rng.dirichlet(np.full(rows, 4.0)) * (height - 2 * margin - gutter * (rows - 1))
+    panels = []
+    y = margin
+    for row_h in heights:
+        cols = int(rng.integers(1, 4))
+        widths = rng.dirichlet(np.full(cols, 4.0)) * (width - 2 * margin - gutter * (cols - 1))
+        row = []
+        x = margin
+        for col_w in widths:
+            row.append((int(x), int(y), int(col_w), int(row_h)))
+            x += col_w + gutter
+        panels.extend(row[::-1] if direction == "RTL" else row)
+        y += row_h + gutter
+    return panels
+
+def synth_page(rng, direction="RTL", size=PAGE_SIZE):
+    """
+    One manga-like page. Returns (PIL image, panels as normalized xc yc w h,
+    bubbles as [x1, y1, x2, y2] in true reading order).
+    """
+    width, height = size
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    panels = _panel_grid(rng, width, height, direction)
+    bubbles = []
+    for px, py, pw, ph in panels:
+        draw.rectangle((px, py, px + pw, py + ph), outline=0, width=4)
+        # A few bubbles stacked top to bottom, so their reading order is unambiguous
+        count = int(rng.integers(1, 4))
+        slot_h = ph // count
+        for i in range(count):
+            bw = int(min(pw - 20, rng.integers(60, 200)))
+            bh = int(min(slot_h - 20, rng.integers(80, 320)))
+            if bw < 30 or bh < 30:
+                continue
+            bx = px + 10 + int(rng.integers(0, max(1, pw - bw - 20)))
+            by = py + i * slot_h + 10 + int(rng.integers(0, max(1, slot_h - bh - 20)))
+            draw.ellipse((bx, by, bx + bw, by + bh), fill=255, outline=0, width=3)
+            # Vertical "text" columns
+            columns = max(1, bw // 40)
+            for c in range(columns):
+                cx = bx + bw // 2 + (c - columns // 2) * 22
+                length = int(rng.integers(bh // 4, max(bh // 4 + 1, bh * 2 // 3)))
+                draw.line((cx, by + bh // 2 - length // 2, cx, by + bh // 2 + length // 2), fill=40, width=6)
+            bubbles.append([bx, by, bx + bw, by + bh])
+    normalized = [[(x + w / 2) / width, (y + h / 2) / height, w / width, h / height] for x, y, w, h in panels]
+    return image.convert("RGB"), normalized, bubbles
+
+def write_pages(directory, count, seed, direction, fmt="jpg"):
+    """Generate 'count' pages into 'directory'. Returns { path: (panels, bubbles) }."""
+    rng = np.random.default_rng(seed)
+    truth = {}
+    for i in range(count):
+        image, panels, bubbles = synth_page(rng, direction)
+        path = os.path.join(directory, f"{i:03d}.{fmt}")
+        image.save(path, quality=90) if fmt == "jpg" else image.save(path)
+        truth[path] = (panels, bubbles)
+    return truth
+
+
+###############################################################################
+# Stand-in models
+###############################################################################
+
+class StandInBoxDetection():
+    """A small conv net over the page (detector-like cost), returning the true boxes."""
+    model_path = "standin:bubble"
+
+    def __init__(self, truth, work_size=320):
+        import torch
+        import torch.nn as nn
+        torch.manual_seed(0)
+        self.truth = truth
+        self.work_size = work_size
+        self.net = nn.Sequential(
+            nn.Conv2d(1, 16, 3, stride=2, padding=1), nn.ReLU(),
+            nn.Conv2d(16, 32, 3, stride=2, padding=1), nn.ReLU(),
+            nn.Conv2d(32, 64, 3, stride=2, padding=1), nn.ReLU(),
+            nn.Conv2d(64, 5, 1),
+        ).eval()
+
+    def predict(self, image=None, **kwargs):
+        import torch
+        with Image.open(image) as img:
+            img.draft("L", (self.work_size, self.work_size))
+            small = img.convert("L").resize((self.work_size, self.work_size))
+        x = torch.from_numpy(np.asarray(small, dtype=np.float32) / 255.0)[None, None]
+        with torch.no_grad():
+            self.net(x)
+        return [list(box) for box in self.truth[image][1]]
+
+class StandInPanelDetection():
+    """Model-free gutter splitter (the same code PanelDetection's fast path uses)."""
+    model_path = "standin:panel"
+
+    def __init__(self, direction):
+        self.direction = direction
+
+    def predict(self, image=None):
+        from geometricOrder import split_panels
+        return split_panels(image, self.direction)
+
+class StandInOCREngine():
+    """
+    Conv encoder + GRU decoder with greedy decoding. The number of characters it
+    "reads" follows the crop shape (tall thin crops are long columns), and every
+    decoder step runs over the whole batch, like generate() does.
+    """
+    engine_name = "StandIn"
+
+    def __init__(self, hidden=256, vocab=512):
+        import torch
+        import torch.nn as nn
+        torch.manual_seed(0)
+        self.encoder = nn.Sequential(
+            nn.Conv2d(1, 32, 3, stride=2, padding=1), nn.ReLU(),
+            nn.Conv2d(32, 64, 3, stride=2, padding=1), nn.ReLU(),
+            nn.AdaptiveAvgPool2d(1), nn.Flatten(), nn.Linear(64, hidden),
+        ).eval()
+        self.embed = nn.Embedding(vocab, hidden)
+        self.cell = nn.GRUCell(hidden, hidden)
+        self.head = nn.Linear(hidden, vocab)
+
+    @staticmethod
+    def text_length(crop):
+        h, w = crop.shape[:2]
+        return int(np.clip(h / max(w, 1) * 6 + h * w / 20000, 1, 120))
+
+    def predict_batch_with_lengths(self, np_images, max_length=300):
+        import torch
+        if not np_images:
+            return [], None
+        crops = np.stack([
+            np.asarray(Image.fromarray(img).convert("L").resize((64, 64)), dtype=np.float32) / 255.0
+            for img in np_images
+        ])
+        targets = [self.text_length(img) for img in np_images]
+        steps = min(max_length - 2, max(targets))
+        with torch.no_grad():
+            state = self.encoder(torch.from_numpy(crops)[:, None])
+            token = torch.zeros(len(np_images), dtype=torch.long)
+            for _ in range(steps):
+                state = self.cell(self.embed(token), state)
+                token = self.head(state).argmax(dim=1)
+        lengths = [min(target, steps) + 2 for target in targets]  # + start / end tokens
+        return [["字" * (n - 2)] for n in lengths], lengths
+
+    def predict_batch(self, np_images, max_length=300):
+        return self.predict_batch_with_lengths(np_images, max_length)[0]
+
+    def predict(self, np_image):
+        return self.predict_batch([np_image])[0]
+
+    def cleanup(self):
+        pass
+
+class StandInSequencer():
+    """The real MangaTransformer architecture with random weights."""
+    def __init__(self, direction):
+        from SequenceTransformer import MangaTransformer
+        import torch
+        torch.manual_seed(0)
+        self.model = MangaTransformer().eval()
+        self.model_path = f"standin:sequencer:{direction}"
+
+    def predict(self, panels):
+        from SequenceTransformer import MangaTransformer
+        return self.model.predict_sequence([MangaTransformer.preprocess_panel(*panel) for panel in panels])
+
+
+###############################################################################
+# Running
+###############################################################################
+
+def peak_rss_mb():
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+def import_seconds(modules):
+    """Cold import time of 'modules' in a fresh interpreter, or None if they can't be imported."""
+    code = "import time; t = time.perf_counter(); import {}; print(time.perf_counter() - t)".format(", ".join(modules))
+    try:
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, timeout=300,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        )
+        return float(out.stdout.strip().splitlines()[-1]) if out.returncode == 0 else None
+    except (OSError, ValueError, IndexError, subprocess.TimeoutExpired):
+        return None
+
+def build_models(args, truth):
+    if not args.real:
+        detector = StandInBoxDetection(truth)
+        panels = StandInPanelDetection(args.direction)
+        ocr = StandInOCREngine()
+        sequencer = None if args.order == "geometric" else StandInSequencer(args.direction)
+        return detector, panels, ocr, sequencer
+    from yoloer import BoxDetection, PanelDetection
+    from OCRENGINE import OCREngine
+    from SequenceTransformer import get_sequencer, SEQUENCER_MODELS
+    detector = BoxDetection()
+    panels = PanelDetection()
+    ocr = OCREngine(args.engine)
+    sequencer = None if args.order == "geometric" else get_sequencer(SEQUENCER_MODELS[args.direction])
+    return detector, panels, ocr, sequencer
+
+def arrange(file_data, panels, sequencer, direction, path, image_size):
+    from geometricOrder import GeometricOrder, organize_bubbles_geometric
+    if sequencer is None:
+        return organize_bubbles_geometric(file_data, panels, GeometricOrder(direction, page=path), image_size)
+    from panelWorker import organize_bubbles
+    return organize_bubbles(file_data, panels, sequencer, image_size)[::-1]
+
+def run_page(path, models, stages, args, annotations):
+    detector, panel_detector, ocr, sequencer = models
+    with timer("decode", stages):
+        img_np = np.array(Image.open(path).convert("RGB"))
+    with timer("detect", stages):
+        yolo_boxes = detector.predict(path)
+    boxes = [(x1, y1, x2 - x1, y2 - y1) for (x1, y1, x2, y2) in yolo_boxes if x2 > x1 and y2 > y1]
+    with timer("panels", stages):
+        panels = panel_detector.predict(path)
+    with timer("ocr", stages):
+        results = ocr.predict_batch([crop_box(img_np, box) for box in boxes])
+    file_data = [
+        {"id": i, "coords": coords, "lines": lines or [], "user_lines": []}
+        for i, (coords, lines) in enumerate(zip(boxes, results))
+    ]
+    with timer("arrange", stages):
+        ordered = arrange(file_data, panels, sequencer, args.direction, path, (img_np.shape[1], img_np.shape[0]))
+    with timer("save", stages):
+        annotations[path] = ordered
+        annotations.flush()
+    return [d["id"] for d in ordered]
+
+def run(args):
+    stages = Metrics()
+    directory = tempfile.mkdtemp(prefix="setsu_bench_")
+    try:
+        truth = write_pages(directory, args.pages + args.warmup, args.seed, args.direction, args.format)
+        paths = sorted(truth)
+
+        core = ["numpy", "PIL.Image", "geometricOrder", "panelWorker", "SequenceTransformer"]
+        if args.real:
+            core += ["yoloer", "OCRENGINE"]
+        start = time.perf_counter()
+        models = build_models(args, truth)
+        if args.batcher:
+            from ocrBatcher import OCRBatcher
+            models = models[:2] + (OCRBatcher(models[2]),) + models[3:]
+        model_load = time.perf_counter() - start
+
+        annotations = AnnotationStore(directory)
+        for path in paths[:args.warmup]:
+            run_page(path, models, Metrics(), args, annotations)
+        METRICS.reset()
+
+        correct = 0
+        start = time.perf_counter()
+        for path in paths[args.warmup:]:
+            with timer("end_to_end", stages):
+                order = run_page(path, models, stages, args, annotations)
+            # Boxes were emitted in true reading order, so the right order is 0, 1, 2, ...
+            correct += order == sorted(order)
+        elapsed = time.perf_counter() - start
+        if args.batcher:
+            models[2].close()
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    snapshot = stages.snapshot()
+    import torch
+    return {
+        "version": RESULTS_VERSION,
+        "config": {
+            "pages": args.pages, "warmup": args.warmup, "seed": args.seed, "direction": args.direction,
+            "order": args.order, "models": "real" if args.real else "stand-in", "batcher": args.batcher,
+            "format": args.format, "annotations": annotations.codec.name, "threads": torch.get_num_threads(),
+        },
+        "environment": {
+            "python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "cpus": os.cpu_count(),
+            "numpy": np.__version__, "torch": torch.__version__,
+        },
+        "startup": {"import_seconds": import_seconds(core), "model_load_seconds": model_load},
+        "pages_per_sec": args.pages / elapsed if elapsed else None,
+        # Random weights order at random: nothing to measure
+        "order_accuracy": correct / args.pages if args.pages and not isinstance(models[3], StandInSequencer) else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "end_to_end": snapshot.pop("end_to_end", None),
+        "stages": snapshot,
+        "internals": METRICS.snapshot(),
+    }
+
+def compare(current, baseline):
+    """Lines comparing p50 per stage and throughput against an earlier results file."""
+    lines = [f"{'stage':<12} {'base p50':>10} {'now p50':>10} {'change':>8}"]
+    for stage, summary in current["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if old is None or not old["p50"]:
+            continue
+        lines.append(
+            f"{stage:<12} {old['p50'] * 1000:>8.2f}ms {summary['p50'] * 1000:>8.2f}ms "
+            f"{(summary['p50'] / old['p50'] - 1) * 100:>+7.1f}%"
+        )
+    if baseline.get("pages_per_sec") and current.get("pages_per_sec"):
+        lines.append(f"pages/sec    {baseline['pages_per_sec']:>10.2f} {current['pages_per_sec']:>10.2f} "
+                     f"{(current['pages_per_sec'] / baseline['pages_per_sec'] - 1) * 100:>+7.1f}%")
+    return lines
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of the detect/OCR/arrange pipeline.")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2, help="pages run first and not measured")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--direction", default="RTL", choices=["RTL", "LTR", "Strip"])
+    parser.add_argument("--order", default="geometric", choices=["ai", "geometric"])
+    parser.add_argument("--format", default="jpg", choices=["jpg", "png"])
+    parser.add_argument("--batcher", action="store_true", help="send OCR through OCRBatcher")
+    parser.add_argument("--real", action="store_true", help="use the real models from ./model instead of stand-ins")
+    parser.add_argument("--engine", default="Japanese", choices=["Chinese", "Japanese"], help="OCR engine with --real")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads (default: torch's choice)")
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+    if args.direction == "Strip":
+        args.order = "geometric"
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    accuracy = results["order_accuracy"]
+    accuracy = f"{accuracy:.0%}" if accuracy is not None else "n/a (stand-in sequencer)"
+    print(f"{results['pages_per_sec']:.2f} pages/sec, order accuracy {accuracy}, "
+          f"peak RSS {results['peak_rss_mb'] or 0:.0f} MB", file=sys.stderr)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            for line in compare(results, json.load(f)):
+                print(line, file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
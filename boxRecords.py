@@ -0,0 +1,231 @@
+import itertools
+import numpy as np
+from spatialIndex import SpatialIndex
+
+# Bubbles of a page as slotted records instead of one dict per box.
+#
+#   page = PageBoxes.from_json(json_list)   # [{"id", "coords", "lines", "user_lines"}, ...]
+#   page[0].coords, page[0]["lines"]        # attribute or the old dict-style access
+#   page.coords                             # int32 N x 4 array of (x, y, w, h)
+#   page.to_json()                          # the same list of dicts back
+#
+# A BoxRecord takes a fraction of a dict's memory and still reads like one
+# (box["id"], box.get("lines", []), "user_lines" in box), so the ordering code,
+# the OCR jobs and the JSON schema don't care which of the two they get. Keys
+# this version doesn't know are kept in 'extra' and written back unchanged.
+#
+# The same records are shared by reference: the page in boxes_data and the
+# label's bounding_boxes hold the same objects (only the text panes keep their
+# own copies, to be able to discard edits). Coords are never edited in place,
+# a moved box is a new record, so a PageBoxes' version number (bumped by every
+# list change) is enough to know when its coords array and SpatialIndex are stale.
+
+FIELDS = ("id", "coords", "lines", "user_lines")
+
+_page_versions = itertools.count(1)
+
+
+class BoxRecord():
+    __slots__ = FIELDS + ("extra",)
+
+    def __init__(self, id, coords, lines=None, user_lines=None, extra=None):
+        self.id = id
+        self.coords = tuple(coords)  # (x, y, w, h) in original image pixels
+        self.lines = lines if lines is not None else []
+        self.user_lines = user_lines if user_lines is not None else []
+        self.extra = extra           # unknown JSON keys, or None
+
+    @classmethod
+    def from_json(cls, box_info):
+        extra = {key: value for key, value in box_info.items() if key not in FIELDS} or None
+        return cls(box_info["id"], box_info["coords"], box_info.get("lines"), box_info.get("user_lines"), extra)
+
+    def to_json(self):
+        box_info = {"id": self.id, "coords": list(self.coords), "lines": self.lines, "user_lines": self.user_lines}
+        if self.extra:
+            box_info.update(self.extra)
+        return box_info
+
+    def copy(self):
+        """Record with its own line lists (coords are immutable and shared)."""
+        return BoxRecord(self.id, self.coords, list(self.lines), list(self.user_lines),
+                         dict(self.extra) if self.extra else None)
+
+    # Dict-style access, for code written against the JSON schema
+    def __getitem__(self, key):
+        if key in FIELDS:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "coords":
+            self.coords = tuple(value)
+        elif key in FIELDS:
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in FIELDS or bool(self.extra and key in self.extra)
+
+    def keys(self):
+        return list(FIELDS) + list(self.extra or ())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, BoxRecord):
+            return (self.id, self.coords, self.lines, self.user_lines, self.extra or None) == \
+                   (other.id, other.coords, other.lines, other.user_lines, other.extra or None)
+        if isinstance(other, dict):
+            return self.to_json() == {**other, "coords": list(other.get("coords", ()))}
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(self.to_json())
+
+
+def as_record(box_info):
+    """box_info itself if it already is a BoxRecord, else a record built from the dict."""
+    return box_info if isinstance(box_info, BoxRecord) else BoxRecord.from_json(box_info)
+
+def mark_ocr(box_info, engine_name):
+    """Record that box_info's lines were read by engine_name from its current coords (saved as "ocr")."""
+    box_info["ocr"] = {"engine": engine_name, "coords": list(box_info["coords"])}
+
+def needs_ocr(box_info, engine_name):
+    """
+    True if box_info has no lines, moved since they were read, or wasn't read
+    by engine_name. Boxes without an "ocr" record (older files) can't be
+    confirmed, so they count as needing it.
+    """
+    if not box_info.get("lines"):
+        return True
+    source = box_info.get("ocr")
+    if not source:
+        return True
+    return source.get("engine") != engine_name or list(source.get("coords", ())) != list(box_info["coords"])
+
+def max_box_id(file_data):
+    return max((box["id"] for box in file_data), default=0)
+
+def coords_array(boxes):
+    """(x, y, w, h) of boxes (a PageBoxes or any list of box dicts) as an int32 N x 4 array."""
+    if isinstance(boxes, PageBoxes):
+        return boxes.coords
+    return np.array([box["coords"] for box in boxes], dtype=np.int32).reshape(-1, 4)
+
+def crop_box(image, coords):
+    """
+    The (x, y, w, h) region of an image array, clamped to the image: a box
+    dragged past an edge gives the part inside it (at least one pixel), never
+    the empty slice a negative index would.
+    """
+    height, width = image.shape[:2]
+    x, y, w, h = (int(v) for v in coords)
+    x0 = min(max(x, 0), width - 1)
+    y0 = min(max(y, 0), height - 1)
+    x1 = max(min(x + w, width), x0 + 1)
+    y1 = max(min(y + h, height), y0 + 1)
+    return image[y0:y1, x0:x1]
+
+
+class PageBoxes(list):
+    """
+    A page's BoxRecords, in order; dicts put in are turned into records.
+    Every change gets a new version number, which is how the label knows its
+    cached box layer is stale.
+
+    It also owns the SpatialIndex used for hit-testing: append/remove keep it up
+    to date, anything else drops it and it is rebuilt on the next lookup. The
+    coords array is rebuilt lazily after any change.
+    """
+    def __init__(self, boxes=()):
+        super().__init__(as_record(box) for box in boxes)
+        self.version = next(_page_versions)
+        self._index = None
+        self._coords = None
+        self._coords_version = None
+
+    @classmethod
+    def from_json(cls, file_data):
+        return cls(file_data)
+
+    def to_json(self):
+        return [box.to_json() for box in self]
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = SpatialIndex()
+            self._index.build(self)
+        return self._index
+
+    @property
+    def coords(self):
+        if self._coords_version != self.version:
+            self._coords = np.array([box.coords for box in self], dtype=np.int32).reshape(-1, 4)
+            self._coords_version = self.version
+        return self._coords
+
+    def append(self, box):
+        box = as_record(box)
+        super().append(box)
+        self.version = next(_page_versions)
+        if self._index is not None:
+            self._index.insert(box["id"], box["coords"])
+
+    def remove(self, box):
+        super().remove(box)
+        self.version = next(_page_versions)
+        if self._index is not None:
+            self._index.remove(box["id"])
+
+    def extend(self, boxes):
+        super().extend(as_record(box) for box in boxes)
+        self.version = next(_page_versions)
+        self._index = None
+
+    def insert(self, i, box):
+        super().insert(i, as_record(box))
+        self.version = next(_page_versions)
+        self._index = None
+
+    def __setitem__(self, i, value):
+        if isinstance(i, slice):
+            value = [as_record(box) for box in value]
+        else:
+            value = as_record(value)
+        super().__setitem__(i, value)
+        self.version = next(_page_versions)
+        self._index = None
+
+    def __iadd__(self, boxes):
+        self.extend(boxes)
+        return self
+
+def _page_mutator(name):
+    method = getattr(list, name)
+    def mutator(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.version = next(_page_versions)
+        self._index = None
+        return result
+    mutator.__name__ = name
+    return mutator
+
+for _name in ("pop", "clear", "sort", "reverse", "__delitem__", "__imul__"):
+    setattr(PageBoxes, _name, _page_mutator(_name))
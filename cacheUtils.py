@@ -0,0 +1,56 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU cache used to memoize per-page results
+    (panel detections, reading orders, ...).
+    """
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+def file_signature(path):
+    """(absolute path, mtime, size) so a replaced image never hits a stale entry."""
+    try:
+        st = os.stat(path)
+        return (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    except OSError:
+        return (os.path.abspath(path), 0, 0)
+
+
+def stable_hash(obj):
+    """Hash of a JSON-able object that is stable across runs (unlike hash())."""
+    payload = json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
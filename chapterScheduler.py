@@ -0,0 +1,423 @@
+import os
+import sys
+import json
+import time
+import heapq
+import argparse
+import itertools
+import threading
+import numpy as np
+from PIL import Image
+from yoloer import BoxDetection, PanelDetection
+from OCRENGINE import OCREngine
+from ocrBatcher import OCRBatcher
+from SequenceTransformer import get_sequencer, SEQUENCER_MODELS
+from panelWorker import organize_bubbles
+from geometricOrder import GeometricOrder, organize_bubbles_geometric
+from jobManifest import JobManifest, model_version, ocr_version
+from metrics import METRICS, timer
+from annotationStore import AnnotationStore
+from boxRecords import crop_box, mark_ocr
+from pageFingerprint import PageIndex, copy_boxes
+
+# Headless chapter processing: many chapter directories, one set of models.
+#
+#   scheduler = ChapterScheduler(ChapterPipeline("Japanese"), max_workers=4)
+#   scheduler.submit("C:/manga/ch12", priority=10)
+#   scheduler.submit("C:/manga/ch13")
+#   scheduler.wait()
+#
+# Work is handed out page by page, highest priority chapter first, with at most
+# max_workers pages in flight over all chapters. Each chapter keeps its own
+# annotations.json and job_manifest.json, so it can be opened in the GUI (or
+# resumed) on its own, and reports when its last page is done.
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+
+def list_chapter_images(directory):
+    """Sorted image paths of a chapter, same list open_directory shows."""
+    return sorted(
+        os.path.join(directory, f) for f in os.listdir(directory)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+def same_directory(a, b):
+    return os.path.normcase(os.path.abspath(a)) == os.path.normcase(os.path.abspath(b))
+
+def load_annotations(directory):
+    """The chapter's annotations.json as a lazily read { file_path: file_data } mapping."""
+    return AnnotationStore(directory)
+
+def translate_text(engine_name, text):
+    # deepl is optional, only needed when translating
+    from translator import translate_chinese, translate_japanese
+    if engine_name == "Chinese":
+        return translate_chinese(text)
+    if engine_name == "Japanese":
+        return translate_japanese(text)
+    raise ValueError(f"Unsupported language: {engine_name}")
+
+
+class ChapterJob():
+    """One chapter directory in the queue, with its pages and progress."""
+    def __init__(self, directory, priority=0, direction="RTL", seq=0):
+        self.directory = directory
+        self.priority = priority
+        self.direction = direction
+        self.seq = seq
+        self.pages = list_chapter_images(directory)
+        self.pending = list(self.pages)
+        self.annotations = load_annotations(directory)
+        self.manifest = JobManifest(directory)
+        self.next_box_id = 1 + self.annotations.max_box_id()
+        self.state = "queued"  # queued -> running -> done / failed / cancelled
+        self.in_flight = 0
+        self.processed = 0
+        self.skipped = 0
+        self.boxes = 0
+        self.errors = {}  # file_path -> error message
+        self.started_at = None
+        self.finished_at = None
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+
+    def __lt__(self, other):
+        # Higher priority first, then first come first served
+        return (-self.priority, self.seq) < (-other.priority, other.seq)
+
+    def take_ids(self, count):
+        with self.lock:
+            start = self.next_box_id
+            self.next_box_id += count
+        return list(range(start, start + count))
+
+    def write_page(self, file_path, file_data, stages, models):
+        """Store a finished page in this chapter's annotations.json, then in its manifest."""
+        with self.lock:
+            self.annotations[file_path] = file_data
+            self.annotations.flush()
+            for stage in stages:
+                self.manifest.mark(file_path, stage, models[stage], save=False)
+            self.manifest.save()
+
+    def export_annotations(self):
+        """annotations.json for the tools that read it, when pages are saved in another format."""
+        with self.lock:
+            self.annotations.export_json()
+
+    def report(self):
+        return {
+            "directory": self.directory,
+            "state": self.state,
+            "priority": self.priority,
+            "pages": len(self.pages),
+            "processed": self.processed,
+            "skipped": self.skipped,
+            "boxes": self.boxes,
+            "errors": dict(self.errors),
+            "seconds": round((self.finished_at or time.time()) - (self.started_at or time.time()), 2),
+        }
+
+
+class ChapterPipeline():
+    """
+    Detect -> OCR -> arrange (-> translate) for one page at a time.
+    Models are created on first use and shared by every chapter; pass the GUI's
+    own instances in to avoid loading them twice. The models serialize their own
+    calls, so any number of scheduler threads (and the window) can share them.
+    With a page_index, a page that repeats one already processed (in any
+    chapter) gets a copy of its boxes instead of going through the models.
+    """
+    def __init__(self, engine_name="Chinese", order_engine="ai", panels=True, translate=False,
+                 detector=None, ocr_engine=None, panel_detector=None, sequencer_for=None, page_index=None):
+        self.engine_name = engine_name
+        self.order_engine = order_engine
+        self.panels = panels
+        self.translate = translate
+        self.detector = detector
+        self.ocr_engine = ocr_engine
+        self.panel_detector = panel_detector
+        # direction -> sequencer, e.g. remote ones; defaults to the shared local cache
+        self.sequencer_for = sequencer_for or (lambda direction: get_sequencer(SEQUENCER_MODELS[direction]))
+        self.page_index = page_index
+        self._load_lock = threading.Lock()
+
+    def _models(self):
+        with self._load_lock:
+            if self.detector is None:
+                self.detector = BoxDetection()
+            if self.ocr_engine is None:
+                # Pages OCR'd by different threads get coalesced into shared batches
+                self.ocr_engine = OCRBatcher(OCREngine(self.engine_name))
+            if self.panels and self.panel_detector is None:
+                self.panel_detector = PanelDetection()
+
+    def use_geometric_order(self, direction):
+        return (
+            self.order_engine == "geometric"
+            or not self.panels
+            or direction not in SEQUENCER_MODELS
+        )
+
+    def stage_models(self, direction):
+        """{ stage: model version }, same keys MainWindow.stage_models uses."""
+        self._models()
+        models = {
+            "detected": model_version(self.detector.model_path),
+            "ocr": ocr_version(self.ocr_engine),
+            "arranged": (f"geometric:{direction}" if self.use_geometric_order(direction)
+                         else model_version(SEQUENCER_MODELS[direction])),
+        }
+        if self.translate:
+            from translator import translator_version
+            models["translated"] = translator_version(self.ocr_engine.engine_name)
+        return models
+
+    def detect(self, job, file_path, pending, models):
+        record = job.manifest.record(file_path, "detected")
+        if "detected" not in pending and record is not None and "boxes" in record:
+            return [tuple(box) for box in record["boxes"]]
+        yolo_boxes = self.detector.predict(file_path)
+        boxes = [(x1, y1, x2 - x1, y2 - y1) for (x1, y1, x2, y2) in yolo_boxes if x2 > x1 and y2 > y1]
+        with job.lock:
+            job.manifest.mark(file_path, "detected", models["detected"], boxes=[list(box) for box in boxes])
+        return boxes
+
+    def arrange(self, file_data, file_path, direction):
+        if len(file_data) <= 1:
+            return file_data
+        with Image.open(file_path) as img:
+            image_size = img.size
+        panels = self.panel_detector.predict(file_path) if self.panel_detector else None
+        if self.use_geometric_order(direction):
+            model = GeometricOrder(direction, page=file_path)
+            return organize_bubbles_geometric(file_data, panels, model, image_size)
+        ordered = organize_bubbles(file_data, panels, self.sequencer_for(direction), image_size)
+        return ordered[::-1]
+
+    def process_page(self, job, file_path):
+        """Run the unfinished stages of one page. Returns the number of boxes, or None if it was done already."""
+        models = self.stage_models(job.direction)
+        pending = job.manifest.pending_stages(file_path, models)
+        if not pending:
+            return None
+
+        done = [stage for stage in ("ocr", "arranged") if stage in pending]
+        copy = None
+        if "ocr" in pending and self.page_index is not None:
+            copy = self.page_index.processed_copy(file_path, models, job.annotations)
+        if copy is not None:
+            source, source_data, source_models = copy
+            file_data = copy_boxes(source_data, job.take_ids(len(source_data)))
+            job.manifest.mark(
+                file_path, "detected", models["detected"],
+                boxes=[list(box.coords) for box in file_data], duplicate_of=source,
+            )
+            # Already in order, and translated too if the source was with the same translator
+            pending.remove("arranged")
+            if "translated" in pending and source_models.get("translated") == models["translated"]:
+                pending.remove("translated")
+                done.append("translated")
+        elif "ocr" in pending:
+            boxes = self.detect(job, file_path, pending, models)
+            with timer("image_decode"):
+                img_np = np.array(Image.open(file_path))
+            all_results = self.ocr_engine.predict_batch([crop_box(img_np, box) for box in boxes])
+            file_data = [
+                {"id": box_id, "coords": coords, "lines": results if results else [], "user_lines": []}
+                for box_id, coords, results in zip(job.take_ids(len(boxes)), boxes, all_results)
+            ]
+            for box_info in file_data:
+                mark_ocr(box_info, self.ocr_engine.engine_name)
+        else:
+            file_data = job.annotations.get(file_path, [])
+
+        if "arranged" in pending:
+            file_data = self.arrange(file_data, file_path, job.direction)
+
+        if "translated" in pending:
+            translated = True
+            for box_info in file_data:
+                if not box_info["lines"]:
+                    continue
+                try:
+                    box_info["user_lines"] = [translate_text(self.ocr_engine.engine_name, " ".join(box_info["lines"]))]
+                except Exception as e:
+                    translated = False
+                    print(f"[{file_path} box {box_info['id']}] Translation error: {e}")
+            if translated:
+                done.append("translated")
+
+        job.write_page(file_path, file_data, done, models)
+        if self.page_index is not None:
+            finished = {stage: model for stage, model in models.items() if job.manifest.is_done(file_path, stage, model)}
+            self.page_index.add_processed(file_path, finished)
+        return len(file_data)
+
+
+class ChapterScheduler():
+    """
+    Priority queue of chapters drained by max_workers threads (the global concurrency budget).
+    on_page_done(job, file_path) and on_chapter_done(job) are called from worker threads.
+    """
+    def __init__(self, pipeline, max_workers=2, on_page_done=None, on_chapter_done=None):
+        self.pipeline = pipeline
+        self.max_workers = max(1, max_workers)
+        self.on_page_done = on_page_done
+        self.on_chapter_done = on_chapter_done
+        self.jobs = []
+        self._queue = []  # heap of ChapterJob with pages left to hand out
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = []
+
+    def submit(self, directory, priority=0, direction="RTL"):
+        job = ChapterJob(directory, priority, direction, next(self._seq))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ChapterScheduler is shut down")
+            self.jobs.append(job)
+            heapq.heappush(self._queue, job)
+            # Threads are started lazily, up to the budget
+            while len(self._threads) < self.max_workers:
+                thread = threading.Thread(target=self._worker, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._cond.notify_all()
+        return job
+
+    def active_job(self, directory):
+        """The queued or running job of 'directory', or None."""
+        with self._cond:
+            for job in self.jobs:
+                if not job.finished.is_set() and same_directory(job.directory, directory):
+                    return job
+        return None
+
+    def busy(self):
+        """True while any submitted chapter is queued or running."""
+        with self._cond:
+            return any(not job.finished.is_set() for job in self.jobs)
+
+    def cancel(self, job):
+        """Stop handing out pages of 'job'; pages in flight still finish."""
+        with self._cond:
+            job.pending.clear()
+            if job.state in ("queued", "running"):
+                job.state = "cancelled"
+            self._finish_if_done(job)
+
+    def _next_page(self):
+        with self._cond:
+            while True:
+                while self._queue and not self._queue[0].pending:
+                    heapq.heappop(self._queue)
+                if self._queue:
+                    job = self._queue[0]
+                    if job.state == "queued":
+                        job.state = "running"
+                        job.started_at = time.time()
+                    job.in_flight += 1
+                    return job, job.pending.pop(0)
+                if self._closed:
+                    return None, None
+                self._cond.wait()
+
+    def _worker(self):
+        while True:
+            job, file_path = self._next_page()
+            if job is None:
+                return
+            try:
+                boxes = self.pipeline.process_page(job, file_path)
+                error = None
+            except Exception as e:
+                boxes, error = None, repr(e)
+            with self._cond:
+                job.in_flight -= 1
+                if error is not None:
+                    job.errors[file_path] = error
+                elif boxes is None:
+                    job.skipped += 1
+                else:
+                    job.processed += 1
+                    job.boxes += boxes
+            if self.on_page_done is not None:
+                self.on_page_done(job, file_path)
+            with self._cond:
+                self._finish_if_done(job)
+
+    def _finish_if_done(self, job):
+        # Called with self._cond held
+        if job.pending or job.in_flight or job.finished.is_set():
+            return
+        if job.state != "cancelled":
+            job.state = "failed" if job.errors else "done"
+        job.export_annotations()
+        if self.pipeline.page_index is not None:
+            self.pipeline.page_index.save()
+        job.finished_at = time.time()
+        job.finished.set()
+        if self.on_chapter_done is not None:
+            self.on_chapter_done(job)
+        self._cond.notify_all()
+
+    def wait(self):
+        """Block until every submitted chapter is finished."""
+        for job in list(self.jobs):
+            job.finished.wait()
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._closed = True
+            for job in self.jobs:
+                job.pending.clear()
+                if job.state in ("queued", "running"):
+                    job.state = "cancelled"
+                self._finish_if_done(job)
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(
+        description="Detect, OCR and arrange chapter directories in the background. "
+                    "Chapters listed first get the highest priority."
+    )
+    parser.add_argument("directories", nargs="+")
+    parser.add_argument("--workers", type=int, default=2, help="pages processed at the same time, over all chapters")
+    parser.add_argument("--engine", default=os.getenv("OCR_ENGINE", "Chinese"), choices=["Chinese", "Japanese"])
+    parser.add_argument("--direction", default=os.getenv("READING_DIRECTION"), choices=["RTL", "LTR", "Strip"])
+    parser.add_argument("--order", default=os.getenv("ORDER_ENGINE", "ai"), choices=["ai", "geometric"])
+    parser.add_argument("--no-panels", action="store_true", help="skip the panel detector (geometric order only)")
+    parser.add_argument("--translate", action="store_true")
+    parser.add_argument("--no-dedup", action="store_true", help="process repeated pages again instead of copying their boxes")
+    parser.add_argument("--metrics", help="write stage timings here at the end (.json, or .prom for Prometheus text)")
+    args = parser.parse_args(argv)
+    direction = args.direction or ("RTL" if args.engine == "Japanese" else "LTR")
+
+    pipeline = ChapterPipeline(
+        args.engine, args.order, panels=not args.no_panels, translate=args.translate,
+        page_index=None if args.no_dedup else PageIndex(),
+    )
+    scheduler = ChapterScheduler(
+        pipeline, args.workers,
+        on_chapter_done=lambda job: print(json.dumps(job.report(), ensure_ascii=False), flush=True),
+    )
+    count = len(args.directories)
+    for n, directory in enumerate(args.directories):
+        scheduler.submit(directory, priority=count - n, direction=direction)
+    scheduler.wait()
+    scheduler.shutdown()
+    if args.metrics:
+        METRICS.write(args.metrics)
+    return 0 if all(job.state == "done" for job in scheduler.jobs) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import numpy as np
+from metrics import timed
+from boxRecords import coords_array
+
+# Zero-model reading order. Everything here is plain NumPy so it can run
+# headless (no torch, no Qt) and order thousands of pages per second.
+#
+# Boxes are (x, y, w, h) in page pixels, same as box_info["coords"].
+# Panels coming from YOLO are normalized (xc, yc, w, h), same as PanelDetection.
+
+DIRECTIONS = ("RTL", "LTR", "Strip")
+
+WHITE_LEVEL = 230         # gray value above which a pixel counts as paper
+GUTTER_INK_RATIO = 0.002  # max fraction of ink pixels in a gutter row/column
+MIN_GUTTER_PX = 3         # minimum gutter thickness at working resolution
+MIN_PANEL_PX = 24         # smaller regions are treated as noise
+WORK_SIZE = 512           # longest side of the raster used for gutter detection
+ROW_OVERLAP = 0.5         # vertical overlap (of the smaller box) to share a row
+
+
+def _as_boxes(coords):
+    return np.asarray(coords, dtype=np.float64).reshape(-1, 4)
+
+def cluster_rows(boxes, overlap=ROW_OVERLAP):
+    """
+    Group (x, y, w, h) boxes into rows by vertical overlap.
+    Returns a list of index arrays, top row first.
+    """
+    boxes = _as_boxes(boxes)
+    if len(boxes) == 0:
+        return []
+    top = boxes[:, 1]
+    bottom = boxes[:, 1] + boxes[:, 3]
+    rows = []
+    current = []
+    row_top = row_bottom = 0.0
+    for i in np.argsort(top, kind="stable"):
+        if current:
+            inter = min(bottom[i], row_bottom) - max(top[i], row_top)
+            smaller = max(min(boxes[i, 3], row_bottom - row_top), 1e-6)
+            if inter / smaller >= overlap:
+                current.append(i)
+                row_bottom = max(row_bottom, bottom[i])
+                continue
+            rows.append(np.array(current))
+        current = [i]
+        row_top, row_bottom = top[i], bottom[i]
+    rows.append(np.array(current))
+    return rows
+
+def order_boxes(coords, direction="RTL"):
+    """
+    Reading order of (x, y, w, h) boxes as a list of indices.
+      - RTL / LTR: rows top to bottom, boxes inside a row right-to-left / left-to-right.
+      - Strip: webtoon mode, plain top to bottom (left to right on ties).
+    """
+    boxes = _as_boxes(coords)
+    if len(boxes) == 0:
+        return []
+    cx = boxes[:, 0] + boxes[:, 2] / 2
+    if direction == "Strip":
+        return np.lexsort((cx, boxes[:, 1])).tolist()
+    order = []
+    for row in cluster_rows(boxes):
+        key = -cx[row] if direction == "RTL" else cx[row]
+        order.extend(row[np.argsort(key, kind="stable")].tolist())
+    return order
+
+###############################################################################
+# Gutter detection (XY-cut on projection profiles)
+###############################################################################
+
+def load_gray(page, work_size=WORK_SIZE):
+    """
+    Grayscale page downscaled so its longest side is about work_size.
+    Accepts a file path or a NumPy array (H, W) / (H, W, C).
+    Returns (gray uint8 array, scale) where scale maps work pixels back to page pixels.
+    """
+    if isinstance(page, str):
+        from PIL import Image
+        with Image.open(page) as img:
+            full_w, full_h = img.size
+            # JPEG can decode straight to a reduced size, which skips most of the work
+            img.draft("L", (max(1, full_w * work_size // max(full_w, full_h)),
+                            max(1, full_h * work_size // max(full_w, full_h))))
+            arr = np.asarray(img.convert("L"))
+    else:
+        arr = np.asarray(page)
+        full_h, full_w = arr.shape[:2]
+        if arr.ndim == 3:
+            arr = (arr[..., :3] @ np.array([0.299, 0.587, 0.114])).astype(np.uint8)
+    step = max(1, int(np.ceil(max(arr.shape[:2]) / work_size)))
+    if step > 1:
+        arr = _min_pool(arr, step)
+    return arr, full_w / arr.shape[1]
+
+def _min_pool(arr, step):
+    """
+    Downscale by 'step' keeping the darkest pixel of each block, so thin panel
+    borders survive. Strided np.minimum is much faster than reshape().min().
+    """
+    h, w = arr.shape[0] // step * step, arr.shape[1] // step * step
+    arr = arr[:h, :w]
+    rows = arr[0::step]
+    for i in range(1, step):
+        rows = np.minimum(rows, arr[i::step])
+    pooled = rows[:, 0::step]
+    for i in range(1, step):
+        pooled = np.minimum(pooled, rows[:, i::step])
+    return pooled
+
+def find_gutters(profile, max_ink=GUTTER_INK_RATIO, min_width=MIN_GUTTER_PX):
+    """(starts, ends) of runs in a projection profile that are blank enough to be gutters."""
+    empty = np.concatenate(([False], profile <= max_ink, [False]))
+    edges = np.diff(empty.astype(np.int8))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    keep = (ends - starts) >= min_width
+    return starts[keep], ends[keep]
+
+def _trim(ink, x0, y0, x1, y1):
+    sub = ink[y0:y1, x0:x1]
+    rows = np.flatnonzero(sub.any(axis=1))
+    cols = np.flatnonzero(sub.any(axis=0))
+    if rows.size == 0:
+        return None
+    return x0 + cols[0], y0 + rows[0], x0 + cols[-1] + 1, y0 + rows[-1] + 1
+
+def _cuts(starts, ends, length):
+    mids = ((starts + ends) // 2).tolist()
+    bounds = [0] + mids + [length]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def xy_cut(ink, direction="RTL", min_gutter=MIN_GUTTER_PX, min_panel=MIN_PANEL_PX):
+    """
+    Recursively split a boolean ink mask along blank rows/columns.
+    Returns [(x, y, w, h), ...] in work pixels, already in reading order
+    (horizontal gutters top to bottom, vertical gutters by direction).
+    """
+    panels = []
+
+    def split(x0, y0, x1, y1):
+        trimmed = _trim(ink, x0, y0, x1, y1)
+        if trimmed is None:
+            return
+        x0, y0, x1, y1 = trimmed
+        sub = ink[y0:y1, x0:x1]
+
+        starts, ends = find_gutters(sub.mean(axis=1), min_width=min_gutter)
+        if len(starts):
+            for a, b in _cuts(starts, ends, y1 - y0):
+                split(x0, y0 + a, x1, y0 + b)
+            return
+
+        starts, ends = find_gutters(sub.mean(axis=0), min_width=min_gutter)
+        if len(starts) and direction != "Strip":
+            columns = _cuts(starts, ends, x1 - x0)
+            if direction == "RTL":
+                columns = columns[::-1]
+            for a, b in columns:
+                split(x0 + a, y0, x0 + b, y1)
+            return
+
+        if (x1 - x0) >= min_panel and (y1 - y0) >= min_panel:
+            panels.append((x0, y0, x1 - x0, y1 - y0))
+
+    split(0, 0, ink.shape[1], ink.shape[0])
+    return panels
+
+def split_panels(page, direction="RTL", work_size=WORK_SIZE):
+    """
+    Panels of a page found from its white gutters, as normalized (xc, yc, w, h)
+    in reading order, i.e. the same format PanelDetection.predict returns.
+    """
+    gray, _ = load_gray(page, work_size)
+    ink = gray < WHITE_LEVEL
+    h, w = ink.shape
+    return [
+        [(x + pw / 2) / w, (y + ph / 2) / h, pw / w, ph / h]
+        for x, y, pw, ph in xy_cut(ink, direction)
+    ]
+
+###############################################################################
+# organize_bubbles counterpart
+###############################################################################
+
+class GeometricOrder():
+    """
+    Drop-in for SequencerTransformer when no model should be loaded.
+    'page' (path or array) lets organize_bubbles_geometric find gutters
+    when no panel detections are given.
+    """
+    def __init__(self, direction="RTL", page=None):
+        self.direction = direction
+        self.page = page
+        self.model_path = f"geometric:{direction}"
+
+    # Expects xc yc w h, like SequencerTransformer.predict
+    def predict(self, panels):
+        boxes = [(xc - w / 2, yc - h / 2, w, h) for xc, yc, w, h in panels]
+        return order_boxes(boxes, self.direction)
+
+@timed("organize_bubbles_geometric")
+def organize_bubbles_geometric(file_data, yolo_panels, model, image_size):
+    """
+    Same contract as panelWorker.organize_bubbles, but ordering comes from
+    geometry only. Returns bubbles in reading order (no reversal needed).
+    """
+    if len(file_data) <= 1:
+        return list(file_data)
+    direction = model.direction
+    bubbles = _as_boxes(coords_array(file_data))
+    if direction == "Strip":
+        return [file_data[i] for i in order_boxes(bubbles, direction)]
+
+    img_w, img_h = image_size
+    if yolo_panels:
+        normalized = np.asarray(yolo_panels, dtype=np.float64).reshape(-1, 4)
+        panel_order = model.predict(normalized.tolist())
+        normalized = normalized[panel_order]
+    elif model.page is not None:
+        normalized = np.asarray(split_panels(model.page, direction), dtype=np.float64).reshape(-1, 4)
+    else:
+        normalized = np.zeros((0, 4))
+
+    if len(normalized) == 0:
+        return [file_data[i] for i in order_boxes(bubbles, direction)]
+
+    # Panels in page pixels
+    px1 = (normalized[:, 0] - normalized[:, 2] / 2) * img_w
+    py1 = (normalized[:, 1] - normalized[:, 3] / 2) * img_h
+    px2 = px1 + normalized[:, 2] * img_w
+    py2 = py1 + normalized[:, 3] * img_h
+
+    # Assign each bubble to the panel holding its center, else the nearest panel
+    cx = (bubbles[:, 0] + bubbles[:, 2] / 2)[:, None]
+    cy = (bubbles[:, 1] + bubbles[:, 3] / 2)[:, None]
+    dx = np.maximum(np.maximum(px1 - cx, cx - px2), 0)
+    dy = np.maximum(np.maximum(py1 - cy, cy - py2), 0)
+    owner = np.argmin(dx * dx + dy * dy, axis=1)  # first (earliest read) panel wins ties
+
+    ordered = []
+    for panel_idx in range(len(normalized)):
+        members = np.flatnonzero(owner == panel_idx)
+        if members.size == 0:
+            continue
+        for i in order_boxes(bubbles[members], direction):
+            ordered.append(file_data[members[i]])
+    return ordered
@@ -0,0 +1,94 @@
+import os
+import json
+import urllib.request
+import urllib.error
+import numpy as np
+from inferenceServer import encode_array
+
+# Client side of inferenceServer.py. Each class mirrors the local model it
+# replaces (BoxDetection, PanelDetection, OCREngine, SequencerTransformer), so
+# MainWindow and ChapterPipeline use them without knowing where models live.
+
+
+class InferenceClient():
+    def __init__(self, url, timeout=300):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, request):
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            raise RuntimeError(f"Inference server error ({e.code}): {message}") from None
+
+    def get(self, endpoint):
+        return self._request(urllib.request.Request(self.url + endpoint))
+
+    def post(self, endpoint, payload):
+        request = urllib.request.Request(
+            self.url + endpoint,
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        return self._request(request)
+
+    def health(self):
+        return self.get("/health")
+
+
+def _image_payload(image):
+    # Server and GUI share the machine, so a path is cheaper than the pixels
+    if isinstance(image, str):
+        return {"path": os.path.abspath(image)}
+    return {"image": encode_array(np.asarray(image))}
+
+
+class RemoteBoxDetection():
+    def __init__(self, url, model="bubble.pt"):
+        self.client = InferenceClient(url)
+        self.model_path = f"{self.client.url}/detect:{model}"
+
+    def predict(self, image=None, **kwargs):
+        return [list(box) for box in self.client.post("/detect", _image_payload(image))["boxes"]]
+
+class RemotePanelDetection():
+    def __init__(self, url, model="panel.pt"):
+        self.client = InferenceClient(url)
+        self.model_path = f"{self.client.url}/panels:{model}"
+
+    def predict(self, image=None):
+        return self.client.post("/panels", _image_payload(image))["panels"]
+
+class RemoteOCREngine():
+    def __init__(self, url, engine_name):
+        self.client = InferenceClient(url)
+        self.engine_name = engine_name
+        self.model_path = f"{self.client.url}/ocr:{engine_name}"
+
+    def predict(self, np_image):
+        return self.predict_batch([np_image])[0]
+
+    def predict_batch(self, np_images, max_length=300):
+        if not np_images:
+            return []
+        payload = {"engine": self.engine_name, "crops": [encode_array(np.asarray(img)) for img in np_images]}
+        return self.client.post("/ocr", payload)["results"]
+
+    def cleanup(self):
+        pass  # the server owns the model
+
+class RemoteSequencer():
+    def __init__(self, url, direction, model_path):
+        self.client = InferenceClient(url)
+        self.direction = direction
+        self.model_path = model_path
+
+    # Expects xc yc w h, like SequencerTransformer.predict
+    def predict(self, panels):
+        panels = [[float(v) for v in panel] for panel in panels]
+        return self.client.post("/order", {"direction": self.direction, "panels": panels})["order"]
@@ -0,0 +1,219 @@
+import sys
+import json
+import base64
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from ocrBatcher import OCRBatcher
+from boxRecords import crop_box
+from metrics import METRICS, timer
+from modelManager import MODELS
+
+# Local inference service: loads BoxDetection, PanelDetection, OCREngine and the
+# reading order sequencers once, and serves them to any number of GUI instances
+# (INFERENCE_SERVER=http://127.0.0.1:8765 python main.py) over plain HTTP + JSON.
+#
+#   GET  /health                                   -> {"status": "ok", "models": {...}}
+#   GET  /metrics                                  -> stage timings, Prometheus text format
+#   POST /detect  {"path"} or {"image"}            -> {"boxes": [[x1, y1, x2, y2], ...]}
+#   POST /panels  {"path"} or {"image"}            -> {"panels": [[xc, yc, w, h], ...]}
+#   POST /ocr     {"engine", "crops": [image, ...]}
+#              or {"engine", "path", "boxes": [[x, y, w, h], ...]}
+#                                                  -> {"results": [lines or null, ...]}
+#   POST /order   {"direction", "panels": [[xc, yc, w, h], ...]} -> {"order": [i, ...]}
+#
+# "image" is an array as produced by encode_array. OCR crops from all clients go
+# through one OCRBatcher per engine and run as shared batches.
+
+DEFAULT_PORT = 8765
+
+
+def encode_array(arr):
+    arr = np.ascontiguousarray(arr)
+    return {"shape": list(arr.shape), "dtype": arr.dtype.str, "data": base64.b64encode(arr.tobytes()).decode("ascii")}
+
+def decode_array(obj):
+    data = base64.b64decode(obj["data"])
+    return np.frombuffer(data, dtype=np.dtype(obj["dtype"])).reshape(obj["shape"])
+
+
+class InferenceService():
+    """The models behind the HTTP handlers. Everything is loaded on first use."""
+    def __init__(self, window_ms=10, max_batch=16, panel_fast_path=True):
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.panel_fast_path = panel_fast_path
+        self.detector = None
+        self.panel_detector = None
+        self.batchers = {}  # engine name -> OCRBatcher
+        self._load_lock = threading.Lock()
+        self._detect_lock = threading.Lock()
+        self._panel_lock = threading.Lock()
+        self._order_lock = threading.Lock()
+
+    def _image(self, payload):
+        if "path" in payload:
+            return payload["path"]
+        # YOLO treats arrays as BGR, clients send RGB
+        image = decode_array(payload["image"])
+        return np.ascontiguousarray(image[..., ::-1]) if image.ndim == 3 else image
+
+    def ocr_batcher(self, engine_name):
+        with self._load_lock:
+            batcher = self.batchers.get(engine_name)
+            if batcher is None:
+                from OCRENGINE import OCREngine
+                batcher = OCRBatcher(OCREngine(engine_name), self.window_ms, self.max_batch)
+                self.batchers[engine_name] = batcher
+            return batcher
+
+    def detect(self, payload):
+        with self._load_lock:
+            if self.detector is None:
+                from yoloer import BoxDetection
+                self.detector = BoxDetection()
+        with self._detect_lock:
+            boxes = self.detector.predict(self._image(payload))
+        return {"boxes": boxes}
+
+    def panels(self, payload):
+        with self._load_lock:
+            if self.panel_detector is None:
+                from yoloer import PanelDetection
+                self.panel_detector = PanelDetection(fast_path=self.panel_fast_path)
+        with self._panel_lock:
+            panels = self.panel_detector.predict(self._image(payload))
+        return {"panels": panels}
+
+    def ocr(self, payload):
+        batcher = self.ocr_batcher(payload.get("engine", "Chinese"))
+        if "crops" in payload:
+            crops = [decode_array(crop) for crop in payload["crops"]]
+        else:
+            from PIL import Image
+            with timer("image_decode"):
+                page = np.array(Image.open(payload["path"]))
+            crops = [crop_box(page, box) for box in payload["boxes"]]
+        futures = batcher.submit_many(crops)
+        return {"results": [future.result() for future in futures]}
+
+    def order(self, payload):
+        from SequenceTransformer import get_sequencer, SEQUENCER_MODELS
+        from geometricOrder import GeometricOrder
+        direction = payload.get("direction", "RTL")
+        panels = payload["panels"]
+        if direction in SEQUENCER_MODELS:
+            model = get_sequencer(SEQUENCER_MODELS[direction])
+        else:
+            model = GeometricOrder(direction)
+        with self._order_lock:
+            order = model.predict(panels)
+        return {"order": [int(i) for i in order]}
+
+    def health(self):
+        from SequenceTransformer import is_sequencer_loaded, SEQUENCER_MODELS
+        return {
+            "status": "ok",
+            "models": {
+                "detector": getattr(self.detector, "model_path", None),
+                "panels": getattr(self.panel_detector, "model_path", None),
+                "ocr": sorted(self.batchers),
+                "sequencers": [d for d, path in SEQUENCER_MODELS.items() if is_sequencer_loaded(path)],
+            },
+            # What is in memory right now: models load on use and drop out when idle
+            "resident": MODELS.report(),
+            "batching": {
+                "window_ms": self.window_ms,
+                "max_batch": self.max_batch,
+                "batches": {name: b.batches for name, b in self.batchers.items()},
+                "crops": {name: b.crops for name, b in self.batchers.items()},
+            },
+        }
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.close()
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    service = None  # set by serve()
+    routes = {"/detect": "detect", "/panels": "panels", "/ocr": "ocr", "/order": "order"}
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, self.service.health())
+        elif self.path == "/metrics":
+            body = METRICS.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        name = self.routes.get(self.path)
+        if name is None:
+            self._send(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send(400, {"error": f"Bad request: {e}"})
+            return
+        try:
+            self._send(200, getattr(self.service, name)(payload))
+        except (KeyError, TypeError, ValueError, OSError) as e:
+            self._send(400, {"error": repr(e)})
+        except Exception as e:
+            self._send(500, {"error": repr(e)})
+
+    def log_message(self, format, *args):
+        pass  # one line per crop batch would drown the console
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, service=None):
+    """Create the server (not yet running); call serve_forever() on it."""
+    handler = type("Handler", (InferenceHandler,), {"service": service or InferenceService()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def main(argv=None):
+    from dotenv import load_dotenv
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Serve detection, OCR and reading order models over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--engines", nargs="*", default=[], help="OCR engines to load at startup (others load on first use)")
+    parser.add_argument("--window-ms", type=float, default=10, help="how long to wait for more crops before running a batch")
+    parser.add_argument("--max-batch", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    service = InferenceService(args.window_ms, args.max_batch)
+    for engine_name in args.engines:
+        service.ocr_batcher(engine_name)
+    server = serve(args.host, args.port, service)
+    print(f"Inference server on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
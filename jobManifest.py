@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import threading
+
+# Progress record of a chapter batch run, stored next to annotations.json.
+# For every page it keeps which stages are done and with which model, so an
+# interrupted "OCR All Images" resumes on the first unfinished page and a
+# model change only redoes the stages that depend on it.
+#
+# {
+#   "version": 1,
+#   "pages": {
+#     "<file_path>": {
+#       "detected":   {"model": "bubble.pt:5321:1700000000", "at": 1700000000.0, "boxes": [[x, y, w, h], ...]},
+#       "ocr":        {"model": "Japanese:model.safetensors:444000000:1700000000", "at": ...},
+#       "arranged":   {"model": "geometric:RTL", "at": ...},
+#       "translated": {"model": "DeepL", "at": ...}
+#     }
+#   }
+# }
+
+MANIFEST_NAME = "job_manifest.json"
+STAGES = ("detected", "ocr", "arranged", "translated")
+
+
+def model_version(model):
+    """
+    Version string for a model: file name + size + mtime for checkpoints on disk
+    (a retrained file with the same name counts as a new model), else the name itself.
+    """
+    if model and os.path.isfile(model):
+        st = os.stat(model)
+        return f"{os.path.basename(model)}:{st.st_size}:{st.st_mtime_ns}"
+    return str(model)
+
+def ocr_version(ocr_engine):
+    """Version of the "ocr" stage: the engine name and the model_version of its weights."""
+    model_path = getattr(ocr_engine, "model_path", None)
+    if model_path is None:
+        return ocr_engine.engine_name
+    return f"{ocr_engine.engine_name}:{model_version(model_path)}"
+
+
+class JobManifest():
+    def __init__(self, directory, name=MANIFEST_NAME):
+        self.path = os.path.join(directory, name)
+        self.pages = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.pages = json.load(f).get("pages", {})
+        except (OSError, ValueError):
+            # Missing or half-written manifest: everything counts as not done
+            self.pages = {}
+
+    def save(self):
+        # Write to a temp file and swap it in, so a crash never leaves a torn manifest
+        tmp_path = self.path + ".tmp"
+        with self._lock:
+            payload = {"version": 1, "pages": self.pages}
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def mark(self, page, stage, model, save=True, **extra):
+        """
+        Record 'stage' as finished for 'page' with 'model' (a model_version string).
+        Later stages are dropped, they were computed from the previous output.
+        """
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage: {stage}")
+        with self._lock:
+            record = {"model": model, "at": time.time()}
+            record.update(extra)
+            entry = self.pages.setdefault(page, {})
+            for later in STAGES[STAGES.index(stage) + 1:]:
+                entry.pop(later, None)
+            entry[stage] = record
+        if save:
+            self.save()
+
+    def reset(self, page, stages=STAGES, save=True):
+        """Forget 'stages' of a page (e.g. its boxes were redone by hand)."""
+        with self._lock:
+            entry = self.pages.get(page, {})
+            for stage in stages:
+                entry.pop(stage, None)
+        if save:
+            self.save()
+
+    def record(self, page, stage):
+        return self.pages.get(page, {}).get(stage)
+
+    def is_done(self, page, stage, model=None):
+        """True if 'stage' finished for 'page', and with 'model' when one is given."""
+        record = self.record(page, stage)
+        if record is None:
+            return False
+        return model is None or record.get("model") == model
+
+    def pending_stages(self, page, models):
+        """
+        Stages of 'page' that still have to run, given { stage: model_version }.
+        A stage is redone when any stage before it is redone, since its input changed.
+        """
+        pending = []
+        for stage in STAGES:
+            if stage not in models:
+                continue
+            if pending or not self.is_done(page, stage, models[stage]):
+                pending.append(stage)
+        return pending
+
+    def first_pending(self, pages, models):
+        """Index of the first page in 'pages' with work left, or None when all are done."""
+        for i, page in enumerate(pages):
+            if self.pending_stages(page, models):
+                return i
+        return None
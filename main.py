@@ -1,35 +1,67 @@
 import sys
 import os
-import json
+import threading
 import numpy as np
 import torch
 from PIL import Image
 from yoloer import BoxDetection, PanelDetection
 from OCRENGINE import OCREngine
-from translator import translate_chinese, translate_japanese
+from ocrPool import OCRPool
+from ocrBatcher import OCRBatcher
+from metrics import METRICS, timer, timed
+from translator import translate_chinese, translate_japanese, translator_version
 from dotenv import load_dotenv
-from SequenceTransformer import SequencerTransformer
-from panelWorker import organize_bubbles
+from SequenceTransformer import get_sequencer, preload_sequencers, SEQUENCER_MODELS
+from panelWorker import organize_bubbles, order_cache_key, apply_cached_order, quantize_coords
+from cacheUtils import LRUCache
+from geometricOrder import GeometricOrder, organize_bubbles_geometric
+from boxRecords import BoxRecord, PageBoxes, as_record, crop_box, mark_ocr, needs_ocr
+from textModel import PageTextStore
+from tiledImage import TiledPage, TileCache, tile_grid
+from jobManifest import JobManifest, model_version, ocr_version
+from pageFingerprint import PageIndex, copy_boxes
+from inferenceClient import RemoteBoxDetection, RemotePanelDetection, RemoteOCREngine, RemoteSequencer
+from chapterScheduler import ChapterPipeline, ChapterScheduler, list_chapter_images, load_annotations, same_directory
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QLabel, 
     QVBoxLayout, QHBoxLayout, QPushButton, QScrollArea, 
-    QSplitter, QListWidget, QListWidgetItem, QFileDialog, 
-    QSpinBox, QAbstractItemView, QListView, QComboBox, QPlainTextEdit
+    QSplitter, QListWidget, QListWidgetItem, QFileDialog, QListView,
+    QSpinBox, QAbstractItemView, QComboBox, QPlainTextEdit, QProgressBar
 )
 from PyQt6.QtGui import (
     QPixmap, QPainter, QPen, QMouseEvent, QIcon, QFont, QKeySequence , QShortcut, QDesktopServices, QColor, QBrush
 )
 from PyQt6.QtCore import (
-    Qt, QRect, QSize, QPoint, QUrl, QRunnable, QThreadPool, pyqtSignal, QObject, QThread, pyqtSlot
+    Qt, QRect, QSize, QPoint, QUrl, QRunnable, QThreadPool, pyqtSignal, QObject, QThread, pyqtSlot, QTimer,
+    QItemSelection, QItemSelectionModel
 )
 load_dotenv()
 
 engine_lists = ["Chinese", "Japanese"]
 engine_from_env = os.getenv("OCR_ENGINE", "Chinese")
-panel_flag = os.getenv("PANEL_DETECTOR", 1)
+panel_flag = str(os.getenv("PANEL_DETECTOR", 1)).lower() not in ("0", "false", "off", "")
 translator_flag = os.getenv("TRANSLATOR", False)
+# Try the gutter splitter before the YOLO panel model (clean layouts only)
+panel_fast_path = str(os.getenv("PANEL_FAST_PATH", 1)).lower() not in ("0", "false", "off", "")
+# Number of OCR worker processes for chapter runs, 0 keeps OCR in this process
+ocr_workers = int(os.getenv("OCR_WORKERS", 0))
+# Pages processed at the same time by the chapter queue, over all queued chapters
+chapter_workers = int(os.getenv("CHAPTER_WORKERS", 2))
+# URL of a shared inferenceServer.py (e.g. http://127.0.0.1:8765), empty runs models in this process
+inference_server = os.getenv("INFERENCE_SERVER", "")
+# Copy boxes and text from an already processed identical page (credits, banners) instead of redoing it
+page_dedup = str(os.getenv("PAGE_DEDUP", 1)).lower() not in ("0", "false", "off", "")
 print(engine_from_env)
 
+direction_lists = ["RTL", "LTR", "Strip"]
+# "ai" (panel detector + transformer) or "geometric" (no models at all)
+order_engine_from_env = os.getenv("ORDER_ENGINE", "ai")
+direction_from_env = os.getenv("READING_DIRECTION", "RTL" if engine_from_env == "Japanese" else "LTR")
+
+# Pages at least this many times taller than wide (webtoon strips) fit the screen width, not the whole page
+strip_aspect = float(os.getenv("STRIP_ASPECT", 3))
+MIN_ZOOM, MAX_ZOOM = 0.05, 8.0
+
 ###############################################################################
 # Translator
 ###############################################################################
@@ -60,25 +92,103 @@ class TranslatorWorker(QRunnable):
         except Exception as e:
             self.signals.error.emit(self.box_id, str(e))
 
+###############################################################################
+# Chapter Queue
+###############################################################################
+
+class ChapterQueueSignals(QObject):
+    # ChapterScheduler callbacks run on its worker threads, these hop back to the GUI thread
+    page_done = pyqtSignal(object, str)  # ChapterJob, file_path
+    chapter_done = pyqtSignal(object)    # ChapterJob
+
+###############################################################################
+# OCR Pool
+###############################################################################
+
+class OCRPoolSignals(QObject):
+    # Pool futures resolve on a background thread, these hop back to the GUI thread.
+    # page_done emits file_path and [(box_id, (x, y, w, h), lines), ...]
+    page_done = pyqtSignal(str, object)
+    page_error = pyqtSignal(str, str)
+
+###############################################################################
+# Page OCR Job
+###############################################################################
+
+class OCRJobSignals(QObject):
+    started = pyqtSignal(int)                      # number of boxes to OCR
+    box_done = pyqtSignal(object, object, object)  # box_id (None for new boxes), (x, y, w, h), lines
+    finished = pyqtSignal(bool)                    # True if cancelled
+    error = pyqtSignal(str)
+
+class OCRJobWorker(QRunnable):
+    """
+    Bubble detection (when a detector is given) plus OCR for one page, off the UI thread.
+    Every box is emitted as soon as its text is ready, so the page fills in
+    progressively; cancel() stops after the crop batch in flight.
+    """
+    def __init__(self, file_path, ocr_engine, boxes=None, detector=None, arrange=None, batch_size=4):
+        super().__init__()
+        self.file_path = file_path
+        self.ocr_engine = ocr_engine
+        self.boxes = boxes or []  # [(box_id, (x, y, w, h)), ...] when re-OCRing existing boxes
+        self.detector = detector
+        self.arrange = arrange    # optional callable ordering [{"id", "coords"}, ...]
+        self.batch_size = batch_size
+        self._cancel = threading.Event()
+        self.signals = OCRJobSignals()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            boxes = self.boxes
+            if self.detector is not None:
+                yolo_boxes = self.detector.predict(self.file_path)
+                detected = [
+                    {"id": i, "coords": (x1, y1, x2 - x1, y2 - y1)}
+                    for i, (x1, y1, x2, y2) in enumerate(yolo_boxes) if x2 > x1 and y2 > y1
+                ]
+                if self.arrange:
+                    detected = self.arrange(detected)
+                boxes = [(None, d["coords"]) for d in detected]
+            self.signals.started.emit(len(boxes))
+
+            with timer("image_decode"):
+                img_np = np.array(Image.open(self.file_path))
+            # First bubble on its own so something shows up right away, then batches
+            start, size = 0, 1
+            while start < len(boxes):
+                if self._cancel.is_set():
+                    self.signals.finished.emit(True)
+                    return
+                chunk = boxes[start:start + size]
+                results = self.ocr_engine.predict_batch([crop_box(img_np, coords) for _, coords in chunk])
+                for (box_id, coords), lines in zip(chunk, results):
+                    self.signals.box_done.emit(box_id, coords, lines if lines else [])
+                start += size
+                size = self.batch_size
+            self.signals.finished.emit(False)
+        except Exception as e:
+            self.signals.error.emit(str(e))
+
 ###############################################################################
 # ImageLabel
 ###############################################################################
 class ImageLabel(QLabel):
     """
     A QLabel for displaying an image and handling bounding boxes:
-      - Store bounding boxes in a list of dictionaries:
-        [
-           {"id": <int>, "coords": (x, y, w, h)},
-           ...
-        ]
+      - Store bounding boxes in a PageBoxes of BoxRecords (id, coords (x, y, w, h), ...),
+        the same records as the page in boxes_data.
       - Left-click on box => highlight text (callback).
       - Right-click on box => select for deletion (press Delete to remove).
       - Drawing new boxes is done with left-click & drag.
     """
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.original_pixmap = QPixmap()  # full-res
-        self.display_pixmap = QPixmap()   # scaled for display
+        self.page = None  # TiledPage, drawn tile by tile at scale_factor
         self.scale_factor = 1.0
 
         self.drawing = False
@@ -87,15 +197,19 @@ class ImageLabel(QLabel):
         self.start_point = None
         self.end_point = None
 
-        # bounding_boxes: list of dict: { "id": box_id, "coords": (x, y, w, h) }
+        # bounding_boxes: PageBoxes of BoxRecord, drawn from .id and .coords (x, y, w, h)
         self.bounding_boxes = []
         self.selected_box_id = None  # which bounding box is selected for deletion
+        self.selected_box_ids = set()  # boxes picked with a Shift-drag rubber band
+        self.rect_selecting = False   # current drag selects boxes instead of drawing one
         self.selected_box_id_delete = None
 
         # External callbacks
         self.new_box_callback = None       # called when a new box is created
         self.left_click_box_callback = None  # called when left-click on existing box
         self.right_click_box_callback = None  # called when right-click on existing box
+        self.rect_select_callback = None  # called with the box ids inside a Shift-drag rectangle
+        self.zoom_callback = None  # called with (factor, anchor point) on Ctrl+wheel
 
         self.next_box_id = 1  # to assign unique IDs to new boxes
 
@@ -104,22 +218,57 @@ class ImageLabel(QLabel):
         self.in_arrange_mode = False
         self.arrange_order = []
 
-    def set_image(self, pixmap_full: QPixmap, scale_factor: float):
-        """
-        Setup the image label with a full pixmap and a scale factor.
-        """
-        self.original_pixmap = pixmap_full
+        # Drawing layers: page tiles (TiledPage), boxes and numbers in cached
+        # transparent overlay tiles dropped only when they change, and selection
+        # highlights + the rubber band painted live on top. Only tiles under the
+        # exposed part of the scroll area are ever drawn.
+        self._overlay_tiles = TileCache()
+        self._overlay_key = None
+        self._box_numbers = {}   # box_id -> position in bounding_boxes, for show_box_numbers
+        self._arrange_index = {}  # box_id -> position in arrange_order
+        self.box_pen = QPen(Qt.GlobalColor.green, 2, Qt.PenStyle.SolidLine)
+        self.band_pen = QPen(Qt.GlobalColor.red, 2, Qt.PenStyle.DashLine)
+        self.select_pen = QPen(Qt.GlobalColor.blue, 5, Qt.PenStyle.SolidLine)
+        self.delete_pen = QPen(Qt.GlobalColor.yellow, 5, Qt.PenStyle.SolidLine)
+        select_color = QColor(Qt.GlobalColor.blue)
+        select_color.setAlphaF(0.2)
+        self.select_brush = QBrush(select_color)
+        delete_color = QColor(Qt.GlobalColor.yellow)
+        delete_color.setAlphaF(0.2)
+        self.delete_brush = QBrush(delete_color)
+        self.number_font = QFont()
+        self.number_font.setPointSize(20) # Change Here
+        self.number_color = QColor.fromRgb(255, 0, 102) # Red color for numbering
+
+    @property
+    def bounding_boxes(self):
+        return self._bounding_boxes
+
+    @bounding_boxes.setter
+    def bounding_boxes(self, boxes):
+        self._bounding_boxes = boxes if isinstance(boxes, PageBoxes) else PageBoxes.from_json(boxes)
+
+    def set_image(self, page: TiledPage, scale_factor: float):
+        """
+        Setup the image label with a page and a scale factor.
+        """
+        self.page = page
+        self.set_scale(scale_factor)
+
+    def set_scale(self, scale_factor: float):
+        """Zoom: the label takes the page's size at this scale, tiles are drawn as they scroll in."""
         self.scale_factor = scale_factor
-
-        w_disp = int(pixmap_full.width() * scale_factor)
-        h_disp = int(pixmap_full.height() * scale_factor)
-        self.display_pixmap = pixmap_full.scaled(
-            w_disp, h_disp,
-            Qt.AspectRatioMode.KeepAspectRatio,
-            Qt.TransformationMode.SmoothTransformation
-        )
-        self.setPixmap(self.display_pixmap)
-        self.setFixedSize(self.display_pixmap.size())
+        self.setFixedSize(self.page.display_size(scale_factor))
+        self.update()
+
+    def wheelEvent(self, event):
+        if event.modifiers() & Qt.KeyboardModifier.ControlModifier and self.zoom_callback:
+            steps = event.angleDelta().y() / 120
+            if steps:
+                self.zoom_callback(1.25 ** steps, event.position().toPoint())
+            event.accept()
+            return
+        super().wheelEvent(event)
 
     def _to_original_coords(self, rect: QRect):
         """
@@ -143,18 +292,20 @@ class ImageLabel(QLabel):
         )
 
     def mousePressEvent(self, event: QMouseEvent):
-        if self.display_pixmap.isNull():
+        if self.page is None:
             return
         clicked_point = event.position().toPoint()
         box_id = self._find_box_id_at_display_point(clicked_point)
         if event.button() == Qt.MouseButton.LeftButton:
             self.selected_box_id_delete = None
-            if box_id is not None:
+            shift = bool(event.modifiers() & Qt.KeyboardModifier.ShiftModifier)
+            if box_id is not None and not shift:
                 # We clicked on an existing box
                 if self.left_click_box_callback:
                     self.left_click_box_callback(box_id)
                     return
-            # Begin drawing a new box
+            # Begin drawing a new box, or a selection rectangle with Shift held
+            self.rect_selecting = shift
             self.drawing = True
             self.start_point = event.position().toPoint()
             self.end_point = self.start_point
@@ -171,25 +322,34 @@ class ImageLabel(QLabel):
                 self.selected_box_id_delete = None
             self.update()
 
+    def _band_rect(self):
+        """Area covered by the rubber band, pen included."""
+        return QRect(self.start_point, self.end_point).normalized().adjusted(-2, -2, 2, 2)
+
     def mouseMoveEvent(self, event: QMouseEvent):
         if self.drawing:
+            # Repaint only where the band was and where it is now
+            dirty = self._band_rect()
             self.end_point = event.position().toPoint()
-            self.update()
+            self.update(dirty.united(self._band_rect()))
 
     def mouseReleaseEvent(self, event: QMouseEvent):
         if event.button() == Qt.MouseButton.LeftButton and self.drawing:
             self.drawing = False
             rect = QRect(self.start_point, self.end_point).normalized()
-            if rect.width() > 5 and rect.height() > 5:
+            if self.rect_selecting:
+                self.rect_selecting = False
+                box_ids = self.find_box_ids_in_display_rect(rect)
+                self.selected_box_ids = set(box_ids)
+                if self.rect_select_callback:
+                    self.rect_select_callback(box_ids)
+            elif rect.width() > 5 and rect.height() > 5:
                 # It's a valid bounding box
                 coords = self._to_original_coords(rect)
                 box_id = self.next_box_id
                 self.next_box_id += 1
 
-                self.bounding_boxes.append({
-                    "id": box_id,
-                    "coords": coords
-                })
+                self.bounding_boxes.append(BoxRecord(box_id, coords))
                 self.update()
 
                 # If we have a callback, pass the new box_id and coords
@@ -213,14 +373,13 @@ class ImageLabel(QLabel):
     def _find_box_id_at_display_point(self, point: QPoint):
         """
         Return the box_id of the bounding box under 'point' (display coords),
-        or None if none found. We'll look from front to back in self.bounding_boxes.
+        or None if none found. The topmost (latest) box wins.
         """
-        for box_dict in reversed(self.bounding_boxes):
-            x, y, w, h = box_dict["coords"]
-            r = self._to_display_rect(x, y, w, h)
-            if r.contains(point):
-                return box_dict["id"]
-        return None
+        return self.bounding_boxes.index.at(point.x() / self.scale_factor, point.y() / self.scale_factor)
+
+    def find_box_ids_in_display_rect(self, rect: QRect):
+        """Ids of the boxes touching 'rect' (display coords), in list order."""
+        return self.bounding_boxes.index.query(*self._to_original_coords(rect))
 
     def mouseReleaseEvent_withLeftClickHighlight(self, event: QMouseEvent):
         """
@@ -251,7 +410,10 @@ class ImageLabel(QLabel):
             if self.selected_box_id_delete is not None:
                 # Remove that bounding box
                 removed_id = self.selected_box_id_delete
-                self.bounding_boxes = [b for b in self.bounding_boxes if b["id"] != removed_id]
+                box = next((b for b in self.bounding_boxes if b["id"] == removed_id), None)
+                if box is not None:
+                    # remove() keeps the PageBoxes (and its spatial index) instead of a plain list
+                    self.bounding_boxes.remove(box)
                 self.selected_box_id_delete = None
                 self.update()
 
@@ -261,91 +423,91 @@ class ImageLabel(QLabel):
         else:
             super().keyPressEvent(event)
 
+    def _current_overlay_key(self):
+        return (
+            self.bounding_boxes.version,
+            self.page,
+            self.scale_factor,
+            self.show_box_numbers,
+            self.in_arrange_mode,
+            tuple(self.arrange_order) if self.in_arrange_mode else (),
+        )
+
+    def _overlay_tile(self, tx, ty, tile_rect):
+        """Boxes (and numbers) crossing one tile, drawn once into a transparent pixmap."""
+        tile = self._overlay_tiles.get((tx, ty))
+        if tile is not None:
+            return tile
+        tile = QPixmap(tile_rect.size())
+        tile.fill(Qt.GlobalColor.transparent)
+        # Numbers can stick out of their box, look a little past the tile
+        box_ids = self.bounding_boxes.index.query(*self._to_original_coords(tile_rect.adjusted(-48, -48, 48, 48)))
+        painter = QPainter(tile)
+        painter.translate(-tile_rect.x(), -tile_rect.y())
+        display_rects = [(box_id, self._to_display_rect(*self.bounding_boxes.index.coords(box_id))) for box_id in box_ids]
+        painter.setPen(self.box_pen)
+        for _, dr in display_rects:
+            painter.drawRect(dr)
+
+        painter.setFont(self.number_font)
+        if self.show_box_numbers:
+            painter.setPen(self.number_color)
+            for box_id, dr in display_rects:
+                painter.drawText(dr.topRight() + QPoint(-15, 20), str(self._box_numbers[box_id] + 1))
+        if self.in_arrange_mode:
+            # Click order numbers
+            painter.setPen(Qt.GlobalColor.red)
+            for box_id, dr in display_rects:
+                idx = self._arrange_index.get(box_id)
+                if idx is not None:
+                    painter.drawText(dr.topLeft() + QPoint(5, 15), str(idx + 1))
+        painter.end()
+        self._overlay_tiles.put((tx, ty), tile)
+        return tile
+
     def paintEvent(self, event):
         """_summary_
         Will be used to paint all the events, highlight boxes, Deletion boxes, Numbers when arranging.
+        Only the damaged part of each layer is drawn, so scrolling a long strip or
+        dragging a new box stays cheap.
         Args:
             event (_type_): _description_
         """
-        super().paintEvent(event)
-        if self.display_pixmap.isNull():
+        if self.page is None:
             return
-    
-        painter = QPainter(self)
-        painter.drawPixmap(self.rect(), self.display_pixmap)
-    
-        pen = pen_reset = QPen(Qt.GlobalColor.green, 2, Qt.PenStyle.SolidLine)
-        painter.setPen(pen)
-    
-        # Draw bounding boxes
-        for index, box_dict in enumerate(self.bounding_boxes):
-            box_id = box_dict["id"]
-            x, y, w, h = box_dict["coords"]
-            dr = self._to_display_rect(x, y, w, h)
-
-            if self.show_box_numbers:
-                font = QFont()
-                font.setPointSize(20) # Change Here
-                painter.setFont(font)
-                painter.setPen(QColor.fromRgb(255, 0, 102)) # Red color for numbering
-                # painter.drawText(x + 5, y + 20, str(self.temp_numbers[i]))
-                painter.drawText(dr.topRight() + QPoint(-15, 20), str(index + 1))
-                painter.setPen(pen_reset)
-
-
-            # Box Select Highlighter
-            if box_id == self.selected_box_id:
-                blue_pen = QPen(Qt.GlobalColor.blue, 5, Qt.PenStyle.SolidLine)  # highlight selected
-                painter.setPen(blue_pen)
-
-                blue_color = QColor(Qt.GlobalColor.blue)
-                blue_color.setAlphaF(0.2)
-                blue_brush = QBrush(blue_color)
-                painter.setBrush(blue_brush)
 
-                painter.drawRect(dr)
-                #pen.setColor(Qt.GlobalColor.green)   # reset
-                painter.setBrush(Qt.BrushStyle.NoBrush)
-                painter.setPen(pen_reset)
-            else:
-                painter.drawRect(dr)
-
-            # Box Delete Highlighter
-            if box_id == self.selected_box_id_delete:  # Right-click selected
-                yellow_pen = QPen(Qt.GlobalColor.yellow, 5, Qt.PenStyle.SolidLine)
-                painter.setPen(yellow_pen)
-
-                yellow_color= QColor(Qt.GlobalColor.yellow)
-                yellow_color.setAlphaF(0.2)
-                yellow_brush = QBrush(yellow_color)
-                painter.setBrush(yellow_brush)
+        key = self._current_overlay_key()
+        if key != self._overlay_key:
+            self._overlay_tiles.clear()
+            self._box_numbers = {box_dict["id"]: i for i, box_dict in enumerate(self.bounding_boxes)}
+            self._arrange_index = {box_id: i for i, box_id in enumerate(self.arrange_order)} if self.in_arrange_mode else {}
+            self._overlay_key = key
 
-                painter.drawRect(dr)
-                painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter = QPainter(self)
+        dirty = event.rect()
+        self.page.draw(painter, dirty, self.scale_factor)
+        for tx, ty, tile_rect in tile_grid(dirty, self.size()):
+            painter.drawPixmap(tile_rect.topLeft(), self._overlay_tile(tx, ty, tile_rect))
+
+        # Box Select / Delete Highlighters
+        highlights = [(box_id, self.select_pen, self.select_brush) for box_id in self.selected_box_ids]
+        highlights.append((self.selected_box_id, self.select_pen, self.select_brush))
+        highlights.append((self.selected_box_id_delete, self.delete_pen, self.delete_brush))
+        for box_id, pen, brush in highlights:
+            coords = self.bounding_boxes.index.coords(box_id)
+            if coords is None:
+                continue
+            dr = self._to_display_rect(*coords)
+            if dr.intersects(dirty):
                 painter.setPen(pen)
-            else:
+                painter.setBrush(brush)
                 painter.drawRect(dr)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
 
-            # If in arrange mode, draw small numbering ***INSIDE THE LOOP***
-            if self.in_arrange_mode and box_id in self.arrange_order:
-                idx = self.arrange_order.index(box_id)
-                box_number = idx + 1
-                font1 = painter.font()
-                font1.setPointSize(20) # Change Here
-                painter.setFont(font1)
-                painter.setPen(Qt.GlobalColor.red)
-                #print(f"Drawing box_number={box_number} at box_id={box_id} in arrange mode") <- DEBUGGER
-                painter.drawText(dr.topLeft() + QPoint(5, 15), str(box_number))
-                pen.setColor(Qt.GlobalColor.green)
-                painter.setPen(pen)
-    
         # If user is drawing a new rectangle
         if self.drawing and self.start_point and self.end_point:
-            pen.setColor(Qt.GlobalColor.red)
-            pen.setStyle(Qt.PenStyle.DashLine)
-            painter.setPen(pen)
-            draw_rect = QRect(self.start_point, self.end_point).normalized()
-            painter.drawRect(draw_rect)
+            painter.setPen(self.band_pen)
+            painter.drawRect(QRect(self.start_point, self.end_point).normalized())
 
 ###############################################################################
 # MainWindow
@@ -362,21 +524,40 @@ class MainWindow(QMainWindow):
         self.image_directory = ""
         self.image_files = []
         self.current_image_index = -1
-        self.detector = BoxDetection()
+        self.detector = RemoteBoxDetection(inference_server) if inference_server else BoxDetection()
         self.panelDetector = None
         self.ocr_engine = None
-        self.panel_sequencer_model = None
         self.panel_model = None
-        if panel_flag:
-            self.panelDetector = PanelDetection()
-            if engine_from_env == "Japanese":
-                self.panel_sequencer_model = SequencerTransformer("./model/manga_transformerv1RTL_epoch50_lr1e4.pth")  
-            else:
-                self.panel_sequencer_model = SequencerTransformer("./model/manga_transformerv1LTR_epoch50_lr1e4.pth")
-            
+        # Reading direction chosen per chapter directory, e.g. { "C:/manga/ch1": "RTL" }
+        self.chapter_directions = {}
+        # Memoized reading orders, see arrange_file_data
+        self.arrange_cache = LRUCache(max_entries=2048)
+        if panel_flag and inference_server:
+            # Panels and sequencers live on the server, nothing to load here
+            self.panelDetector = RemotePanelDetection(inference_server)
+        elif panel_flag:
+            self.panelDetector = PanelDetection(fast_path=panel_fast_path)
+            # Load both directions (memory permitting) so switching is free; unused ones go idle, see modelManager.py
+            default_path = SEQUENCER_MODELS.get(direction_from_env, SEQUENCER_MODELS["RTL"])
+            other_paths = [path for path in SEQUENCER_MODELS.values() if path != default_path]
+            threading.Thread(
+                target=preload_sequencers, args=([default_path] + other_paths,), daemon=True
+            ).start()
+
         # For each image, we store a list of bounding_box dicts, each with:
         # { "id": box_id, "coords": (x, y, w, h), "lines": [line1, line2, ...], "user_texts": [...] }
         self.boxes_data = {}
+        # Box records of the page on screen, shown by text_list / user_text_list (see textModel.py)
+        self.text_store = PageTextStore(self)
+        self.text_store.edited.connect(self.on_user_text_changed)
+        self.text_store.boxes_moved.connect(self.on_text_list_reordered)
+        self._syncing_selection = False
+        # Per-page stage completion of batch runs, saved next to annotations.json
+        self.job_manifest = None
+        # Fingerprints of processed pages over all chapters, for repeated pages (see pageFingerprint.py)
+        self.page_index = PageIndex() if page_dedup else None
+        # Translation in flight for translate_current_image: (file_path, {box_id, ...}, failed)
+        self.translation_pending = None
         # Because YOLO or manual drawing can create new boxes with text, etc.
 
         ############################
@@ -415,8 +596,32 @@ class MainWindow(QMainWindow):
 
         self.reocr_button = QPushButton("Re-OCR with Current Engine")
         self.reocr_button.clicked.connect(self.perform_re_ocr)
+        self.reocr_button.setToolTip(
+            "Re-reads boxes that moved, have no text, or were read by another engine.\n"
+            "Shift+click re-reads every box on the page."
+        )
         left_vlayout.addWidget(self.reocr_button)
 
+        # Progress of the running page OCR job (hidden when idle)
+        self.ocr_job = None
+        self.ocr_job_path = None
+        self.ocr_progress = QProgressBar()
+        self.ocr_progress.setVisible(False)
+        left_vlayout.addWidget(self.ocr_progress)
+        self.cancel_ocr_button = QPushButton("Cancel OCR")
+        self.cancel_ocr_button.clicked.connect(self.cancel_ocr_job)
+        self.cancel_ocr_button.setVisible(False)
+        left_vlayout.addWidget(self.cancel_ocr_button)
+
+        # Background queue of whole chapters (see chapterScheduler.py)
+        self.chapter_scheduler = None
+        self.chapter_queue_signals = ChapterQueueSignals()
+        self.chapter_queue_signals.page_done.connect(self.on_queue_page_done)
+        self.chapter_queue_signals.chapter_done.connect(self.on_queue_chapter_done)
+        self.queue_button = QPushButton("Queue Chapter Directory")
+        self.queue_button.clicked.connect(self.queue_chapter)
+        left_vlayout.addWidget(self.queue_button)
+
         self.translate_button = QPushButton("Translate Current Image")
         self.translate_button.clicked.connect(self.translate_current_image)
         left_vlayout.addWidget(self.translate_button)
@@ -489,6 +694,8 @@ class MainWindow(QMainWindow):
         self.image_label.new_box_callback = self.on_new_box_created
         self.image_label.right_click_box_callback = self.on_right_click_box
         self.image_label.left_click_box_callback = self.on_left_click_box
+        self.image_label.rect_select_callback = self.on_boxes_rect_selected
+        self.image_label.zoom_callback = self.zoom_image
         self.image_label.delete_callback = self.on_box_deleted
         # If you want single left-click to highlight text, you could also set:
         # self.image_label.left_click_box_callback = self.on_left_click_box
@@ -501,67 +708,68 @@ class MainWindow(QMainWindow):
         # === Right Panel: text list on top, thumbnails on bottom ===
         right_panel = QSplitter(Qt.Orientation.Vertical)
         # 1) Text list
-        self.text_list = QListWidget()
-
+        self.text_list = QListView()
+        self.text_list.setModel(self.text_store.lines_model)
         self.text_list.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        self.text_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.text_list.setDefaultDropAction(Qt.DropAction.MoveAction)
-        self.text_list.model().rowsMoved.connect(self.on_text_list_reordered)
-        self.text_list.setEditTriggers(QListWidget.EditTrigger.DoubleClicked)
+        self.text_list.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked)
         
         self.text_list.setStyleSheet("""
-          QListWidget::item {
+          QListView::item {
               border-bottom: 1px solid #AAAAAA;
               margin-bottom: 2px;
               /* Optional: ensure a transparent or default background in normal state */
               background: transparent; 
           }
           /* When an item is selected, give it a visible highlight color */
-          QListWidget::item:selected {
+          QListView::item:selected {
               background-color: #6FA6E6; /* or any color you like */
               color: white;             /* text color on selection */
           }
           /* Active vs. inactive states can be styled too, if needed: */
-          QListWidget::item:selected:active {
+          QListView::item:selected:active {
               background-color: #6FA6E6;
               color: white;
           }
-          QListWidget::item:selected:!active {
+          QListView::item:selected:!active {
               background-color: #A7C7E7;
               color: black;
           }
       """)
-        self.text_list.itemSelectionChanged.connect(self.on_text_list_selection_changed)
+        self.text_list.selectionModel().selectionChanged.connect(self.on_text_list_selection_changed)
 
         # User Text list
-        self.user_text_list = QListWidget()
+        self.user_text_list = QListView()
+        self.user_text_list.setModel(self.text_store.user_model)
         self.user_text_list.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        self.user_text_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
         self.user_text_list.setDefaultDropAction(Qt.DropAction.MoveAction)
-        self.user_text_list.setEditTriggers(QListWidget.EditTrigger.DoubleClicked)
+        self.user_text_list.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked)
 
-        self.user_text_list.itemChanged.connect(self.on_user_text_changed)
         self.user_text_list.setStyleSheet("""
-          QListWidget::item {
+          QListView::item {
               border-bottom: 1px solid #AAAAAA;
               margin-bottom: 2px;
               /* Optional: ensure a transparent or default background in normal state */
               background: transparent; 
           }
           /* When an item is selected, give it a visible highlight color */
-          QListWidget::item:selected {
+          QListView::item:selected {
               background-color: #6FA6E6; /* or any color you like */
               color: white;             /* text color on selection */
           }
           /* Active vs. inactive states can be styled too, if needed: */
-          QListWidget::item:selected:active {
+          QListView::item:selected:active {
               background-color: #6FA6E6;
               color: white;
           }
-          QListWidget::item:selected:!active {
+          QListView::item:selected:!active {
               background-color: #A7C7E7;
               color: black;
           }
       """)
-        self.user_text_list.itemSelectionChanged.connect(self.on_user_text_list_selection_changed)
+        self.user_text_list.selectionModel().selectionChanged.connect(self.on_user_text_list_selection_changed)
 
         # 2) Thumbnails
         self.thumbnail_list = QListWidget()
@@ -637,8 +845,24 @@ class MainWindow(QMainWindow):
             self.engine_selector.setCurrentIndex(0)
         self.engine_selector.currentTextChanged.connect(self.on_engine_changed)
         left_vlayout.addWidget(self.engine_selector)
+
+        # Reading direction (per chapter), independent from the OCR engine
+        self.direction_selector = QComboBox()
+        for direction in direction_lists:
+            self.direction_selector.addItem(direction)
+        if direction_from_env in direction_lists:
+            self.direction_selector.setCurrentText(direction_from_env)
+        self.direction_selector.currentTextChanged.connect(self.on_direction_changed)
+        left_vlayout.addWidget(self.direction_selector)
         default_engine_name = self.engine_selector.currentText()
-        self.ocr_engine = OCREngine(default_engine_name)
+        self.ocr_engine = self.make_ocr_engine(default_engine_name)
+        # With a server, batching across clients already happens there
+        self.ocr_pool = OCRPool(default_engine_name, ocr_workers) if ocr_workers > 0 and not inference_server else None
+        self.ocr_pool_signals = OCRPoolSignals()
+        self.ocr_pool_signals.page_done.connect(self.on_pool_page_done)
+        self.ocr_pool_signals.page_error.connect(self.on_pool_page_error)
+        self.pool_queue = []
+        self.pool_models = {}
 
         # Shortcuts
         QShortcut(QKeySequence("Ctrl+O"), self, self.open_directory)
@@ -649,6 +873,10 @@ class MainWindow(QMainWindow):
         QShortcut(QKeySequence("A"), self, self.prev_image)
         QShortcut(QKeySequence("W"), self, self.perform_yolo_ocr)
         QShortcut(QKeySequence("Ctrl+S"), self, self.update_annotations_file)
+        QShortcut(QKeySequence("Ctrl+M"), self, self.save_timings)
+        QShortcut(QKeySequence("Ctrl+="), self, lambda: self.zoom_image(1.25))
+        QShortcut(QKeySequence("Ctrl+-"), self, lambda: self.zoom_image(0.8))
+        QShortcut(QKeySequence("Ctrl+0"), self, self.zoom_to_fit)
         self.arrange_button_shortcut = QShortcut(QKeySequence(Qt.Key.Key_Tab), self)
         self.arrange_button_shortcut.activated.connect(self.enable_arrange_mode)
         self.noarrange_button_shortcut = QShortcut(QKeySequence(Qt.Key.Key_Tab), self)
@@ -660,13 +888,14 @@ class MainWindow(QMainWindow):
     # DEBUG
     ########################################################################
     def print_items(self):
-        for i in range(self.text_list.count()):
-            print(self.text_list.item(i).text())
-            print(self.text_list.item(i).data(Qt.ItemDataRole.UserRole))
+        model = self.text_store.lines_model
+        for row in range(model.rowCount()):
+            print(model.index(row).data())
+            print(model.index(row).data(Qt.ItemDataRole.UserRole))
     ########################################################################
     # Change Engine
     ########################################################################
-    def on_user_text_changed(self, _):
+    def on_user_text_changed(self, *_):
         self.update_in_memory_annotations()
         self.save_current_annotations()  # 👈 add this line
 
@@ -674,18 +903,77 @@ class MainWindow(QMainWindow):
         """
         Called whenever the user selects a new engine from the drop-down.
         We instantiate a new OCREngine so future OCR calls go to the new engine.
-        """
+        The old engine is closed right away, so the switch is refused (and the
+        drop-down put back) while a page job, the pool or the chapter queue may
+        still be using it.
+        """
+        busy = self.ocr_engine_busy()
+        if busy:
+            self.log(f"Can't switch OCR engine while {busy} is running.")
+            self.engine_selector.blockSignals(True)
+            self.engine_selector.setCurrentText(self.ocr_engine.engine_name)
+            self.engine_selector.blockSignals(False)
+            return
         print(f"Selected engine: {engine_name}")
         old_engine = self.ocr_engine
-        self.ocr_engine = OCREngine(engine_name)
-        if engine_name == "Japanese":
-            self.panel_sequencer_model = SequencerTransformer("./model/manga_transformerv1RTL_epoch50_lr1e4.pth")
-        else:
-            self.panel_sequencer_model = SequencerTransformer("./model/manga_transformerv3v2_epoch40lr1e4.pth")
+        self.ocr_engine = self.make_ocr_engine(engine_name)
         if old_engine is not None:
             old_engine.cleanup()
             del old_engine
-        
+        if self.ocr_pool is not None:
+            self.ocr_pool.shutdown()
+            self.ocr_pool = OCRPool(engine_name, ocr_workers)
+        if self.chapter_scheduler is not None:
+            self.chapter_scheduler.pipeline.engine_name = engine_name
+            self.chapter_scheduler.pipeline.ocr_engine = self.ocr_engine
+
+    def ocr_engine_busy(self):
+        """What is using the OCR engine right now, or None."""
+        if self.ocr_job is not None:
+            return "page OCR"
+        if self.pool_queue or (self.ocr_pool is not None and self.ocr_pool.busy()):
+            return "OCR All Images"
+        if self.chapter_scheduler is not None and self.chapter_scheduler.busy():
+            return "the chapter queue"
+        return None
+
+    def make_ocr_engine(self, engine_name):
+        if inference_server:
+            return RemoteOCREngine(inference_server, engine_name)
+        # Every OCR call site goes through the batcher, so concurrent crops share one forward pass
+        return OCRBatcher(OCREngine(engine_name))
+
+    def on_direction_changed(self, direction):
+        """
+        Remember the reading direction for the open chapter.
+        The sequencer itself comes from the shared cache, so nothing is reloaded here.
+        """
+        self.chapter_directions[self.image_directory] = direction
+        self.log(f"Reading direction: {direction}")
+
+    def reading_direction(self):
+        return self.chapter_directions.get(self.image_directory, self.direction_selector.currentText())
+
+    def current_sequencer(self):
+        """Shared sequencer for the current chapter's reading direction (lazy loaded)."""
+        return self.sequencer_for(self.reading_direction())
+
+    def sequencer_for(self, direction):
+        if inference_server:
+            return RemoteSequencer(inference_server, direction, SEQUENCER_MODELS[direction])
+        return get_sequencer(SEQUENCER_MODELS[direction])
+
+    def use_geometric_order(self):
+        """
+        Geometry-only ordering when there's no panel detector, no checkpoint
+        for the direction (webtoon strips), or it was asked for explicitly.
+        """
+        return (
+            order_engine_from_env == "geometric"
+            or self.panelDetector is None
+            or self.reading_direction() not in SEQUENCER_MODELS
+        )
+
 
     ########################################################################
     # Loading/Saving Images & Annotations
@@ -698,18 +986,17 @@ class MainWindow(QMainWindow):
         self.log_console.appendPlainText(message)
 
     def on_box_deleted(self, removed_id):
-      # 1) Gather current UI data
-      self.update_in_memory_annotations()
+      # 1) Drop its rows from both text panes
+      self.text_store.remove_box(removed_id)
 
-      # 2) Remove from boxes_data
+      # 2) Store the page without it (the label already dropped the box)
       if 0 <= self.current_image_index < len(self.image_files):
           file_path = self.image_files[self.current_image_index]
-          old_data = self.boxes_data.get(file_path, [])
-          new_data = [d for d in old_data if d["id"] != removed_id]
-          self.boxes_data[file_path] = new_data
-
-          # 3) Re-populate text fields
-          self.populate_text_list(new_data, "Text Bubble Deleted")
+          self.update_in_memory_annotations()
+          # The manifest's boxes (and what came from them) no longer match the page
+          if self.job_manifest is not None:
+              self.job_manifest.reset(file_path)
+          self.log("Text Bubble Deleted")
 
           # 4) Optionally save
           # self.save_current_annotations()
@@ -747,23 +1034,24 @@ class MainWindow(QMainWindow):
         directory = QFileDialog.getExistingDirectory(self, "Open Directory", "")
         if not directory:
             return
+        if self.chapter_scheduler is not None and self.chapter_scheduler.active_job(directory) is not None:
+            # Its job owns annotations.json and job_manifest.json until it finishes
+            self.log(f"{os.path.basename(directory)} is in the chapter queue, open it once it is done.")
+            return
         self.image_directory = directory
-        self.image_files = []
-        for f in os.listdir(directory):
-            if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')):
-                self.image_files.append(os.path.join(directory, f))
-        self.image_files.sort()
+        self.job_manifest = JobManifest(directory)
+        # Restore this chapter's reading direction without re-triggering the handler
+        direction = self.chapter_directions.get(directory, self.direction_selector.currentText())
+        self.direction_selector.blockSignals(True)
+        self.direction_selector.setCurrentText(direction)
+        self.direction_selector.blockSignals(False)
+        self.chapter_directions[directory] = direction
+        self.image_files = list_chapter_images(directory)
         self.current_image_index = 0
 
         # Load JSON if it exists
-        json_path = os.path.join(directory, "annotations.json")
-        if os.path.exists(json_path):
-            with open(json_path, "r", encoding='utf-8') as f:
-                data = json.load(f)
-                # data: { file_path: [ { "id":..., "coords":..., "lines":[...] }, ... ], ... }
-                self.boxes_data = data
-        else:
-            self.boxes_data = {}
+        # data: { file_path: [ { "id":..., "coords":..., "lines":[...] }, ... ], ... }
+        self.boxes_data = load_annotations(directory)
 
         self.load_image()
         self.load_thumbnails()
@@ -773,98 +1061,117 @@ class MainWindow(QMainWindow):
             return
         
         file_path = self.image_files[self.current_image_index]
-        file_data = self.boxes_data.get(file_path, [])
-        self.populate_text_list(file_data, f"{file_path}")
         
-        pix = QPixmap(file_path)
-        if pix.isNull():
+        # Only the header is read here, tiles are decoded when they are painted
+        page = TiledPage(file_path)
+        if page.isNull():
             return
 
-        # Scale factor if bigger than screen
+        self.image_label.set_image(page, self.fit_scale(page))
+        self.image_label.selected_box_ids = set()
+
+        # If we have data for this file
+        file_data = self.boxes_data.get(file_path, [])
+        if file_data and not isinstance(file_data, PageBoxes):
+            # Boxes stored as plain dicts (OCR jobs, batch runs), make them records once
+            file_data = PageBoxes.from_json(file_data)
+            self.boxes_data[file_path] = file_data
+        # Boxes saved before their OCR source was recorded count as read by this
+        # engine where they are, so Re-OCR doesn't redo them (and drop their translations)
+        for box_info in file_data:
+            if box_info.get("lines") and "ocr" not in box_info:
+                self.mark_ocr_done(box_info)
+        # The label shares the page's records, it only needs its own list
+        self.image_label.bounding_boxes = PageBoxes(file_data)
+        # track the highest box_id so we continue from there
+        for box_info in file_data:
+            if box_info.id >= self.image_label.next_box_id:
+                self.image_label.next_box_id = box_info.id + 1
+        # Keep the saved order here, it is the user's arrangement
+        # Load text list
+        self.populate_text_list(file_data, f"{file_path}")
+
+        # Update thumbnail highlight
+        self.thumbnail_list.setCurrentRow(self.current_image_index)
+
+    def fit_scale(self, page):
+        """
+        Scale factor if bigger than screen. Strips (much taller than wide) fit
+        the screen width and scroll, shrinking them to the height makes text unreadable.
+        """
         screen_geo = QApplication.primaryScreen().geometry()
         sw, sh = screen_geo.width(), screen_geo.height()
-        iw, ih = pix.width(), pix.height()
+        iw, ih = page.width(), page.height()
 
+        if ih >= strip_aspect * iw:
+            return min(1.0, sw / iw)
         scale_factor = 1.0
         if iw > sw or ih > sh:
             scale_w = sw / iw
             scale_h = sh / ih
             scale_factor = min(scale_w, scale_h)
+        return scale_factor
 
-        self.image_label.set_image(pix, scale_factor)
-        # Clear existing bounding boxes from the label
-        self.image_label.bounding_boxes.clear()
-
-        # If we have data for this file
-        file_data = self.boxes_data.get(file_path, [])
-        # Example: [ { "id":..., "coords":(x,y,w,h), "lines":["...","..."] }, ... ]
-        # Populate bounding boxes
-        for box_info in file_data:
-            self.image_label.bounding_boxes.append({
-                "id": box_info["id"],
-                "coords": tuple(box_info["coords"])  # (x, y, w, h)
-            })
-            # track the highest box_id so we continue from there
-            if box_info["id"] >= self.image_label.next_box_id:
-                self.image_label.next_box_id = box_info["id"] + 1
-        self.image_label.bounding_boxes = self.arrange_bounding_box_sequence(
-            self.image_label.bounding_boxes
-        )
-        # Load text list
-        self.populate_text_list(file_data)
-
-        # Update thumbnail highlight
-        self.thumbnail_list.setCurrentRow(self.current_image_index)
+    def zoom_image(self, factor, anchor=None):
+        """
+        Zoom the page by 'factor', keeping the point under 'anchor' (label
+        coordinates, default the middle of the view) where it is on screen.
+        """
+        label = self.image_label
+        if label.page is None:
+            return
+        old = label.scale_factor
+        new = min(max(old * factor, MIN_ZOOM), MAX_ZOOM)
+        if new == old:
+            return
+        hbar = self.scroll_area.horizontalScrollBar()
+        vbar = self.scroll_area.verticalScrollBar()
+        viewport = self.scroll_area.viewport()
+        if anchor is None:
+            anchor = QPoint(hbar.value() + viewport.width() // 2, vbar.value() + viewport.height() // 2)
+        offset = anchor - QPoint(hbar.value(), vbar.value())
+        label.set_scale(new)
+        hbar.setValue(int(anchor.x() * new / old) - offset.x())
+        vbar.setValue(int(anchor.y() * new / old) - offset.y())
+        self.log(f"Zoom {new * 100:.0f}%")
+
+    def zoom_to_fit(self):
+        if self.image_label.page is not None:
+            self.image_label.set_scale(self.fit_scale(self.image_label.page))
 
     def populate_text_list(self, file_data, intent = None):
         """
-        Clear text_list and re-populate from file_data (per-box).
-        We store each line as a separate QListWidgetItem with bounding_box_id in .UserRole
+        Show file_data (per-box) in text_list and user_text_list.
+        Both are views over self.text_store, one row per line with the box id in .UserRole
         This is a main Function along with some others for memory management and proper rendering of texts on the screen.
         """
         if intent: # <- DEBUGGER
             #print(intent)
             self.log(intent)
-        self.text_list.clear()
-        self.user_text_list.clear()
         for box_info in file_data:
-            box_id = box_info["id"]
-            # print(f"[DEBUG]   Box {box_id}")
-            for line in box_info["lines"]:
-                item = QListWidgetItem(line)
-                # store bounding box id
-                item.setData(Qt.ItemDataRole.UserRole, box_id)
-                # allow editing
-                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-                self.text_list.addItem(item)
-
-            user_lines = box_info.get("user_lines", [])
-            # If user_lines is empty, insert a placeholder
-            # if not user_lines:
-            #     placeholder = self.get_user_placeholder_text(box_info)
-            #     user_lines = [placeholder]
-            #     box_info["user_lines"] = user_lines
-
-            # for line in user_lines:
-            #     # print(f"[DEBUG]     -> adding user text: {line}")  # <-- debugging
-            #     item = QListWidgetItem(line)
-            #     item.setData(Qt.ItemDataRole.UserRole, box_id)
-            #     item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-            #     self.user_text_list.addItem(item)
-            if translator_flag and (not user_lines or user_lines[0] == ""):
-                self.update_user_lines(box_info)
-
-            if not translator_flag and not user_lines:
-                # If translator is off, we can use the placeholder text
-                placeholder = self.get_user_placeholder_text(box_info)
-                user_lines = [placeholder]
-                box_info["user_lines"] = user_lines
-
-            for line in user_lines:
-                item = QListWidgetItem(line)
-                item.setData(Qt.ItemDataRole.UserRole, box_id)
-                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-                self.user_text_list.addItem(item)
+            self._prepare_user_lines(box_info)
+        self.text_store.set_records(file_data)
+
+    def _append_box_items(self, box_info):
+        """Add one box's OCR lines and user lines at the end of both text lists."""
+        self._prepare_user_lines(box_info)
+        self.text_store.append_box(box_info)
+
+    def _refresh_box_items(self, box_info):
+        """Swap one box's rows in both text lists for its current data, keeping their position."""
+        self._prepare_user_lines(box_info)
+        self.text_store.update_box(box_info["id"], lines=box_info["lines"], user_lines=box_info["user_lines"])
+
+    def _prepare_user_lines(self, box_info):
+        """User text for a box that has none: a translation request, or a placeholder if the translator is off."""
+        user_lines = box_info.get("user_lines", [])
+        if translator_flag and (not user_lines or user_lines[0] == ""):
+            self.update_user_lines(box_info)
+
+        if not translator_flag and not user_lines:
+            # If translator is off, we can use the placeholder text
+            placeholder = self.get_user_placeholder_text(box_info)
+            box_info["user_lines"] = [placeholder]
 
     def translate_current_image(self):
         """Run translation on all boxes of the current image and update UI."""
@@ -880,8 +1187,12 @@ class MainWindow(QMainWindow):
             return
 
         # For each box, trigger translation
-        self.user_text_list.clear()
+        self.translation_pending = (
+            file_path, {box_info["id"] for box_info in file_data}, False,
+            translator_version(self.engine_selector.currentText()),
+        )
         for box_info in file_data:
+            self.text_store.update_box(box_info["id"], user_lines=[""])
             self.update_user_lines(box_info)
 
         self.log(f"Triggered translation for {len(file_data)} boxes in {os.path.basename(file_path)}")
@@ -889,19 +1200,14 @@ class MainWindow(QMainWindow):
 
     def update_user_lines(self, box_info):
         """
-        Replaces your manual QListWidget population with:
-        1) immediate placeholder
-        2) async translation that updates the item later
+        1) immediate empty placeholder line for the box
+        2) async translation that updates the line later
         """
         box_id = box_info["id"]
         # 1) immediate placeholder
-        placeholder = None
+        placeholder = ""
         if not box_info.get("user_lines"):
             box_info["user_lines"] = [placeholder]
-        item = QListWidgetItem(placeholder)
-        item.setData(Qt.ItemDataRole.UserRole, box_id)
-        item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-        self.user_text_list.addItem(item)
 
         # 2) kick off background translation
         text   = " ".join(box_info["lines"])
@@ -912,16 +1218,33 @@ class MainWindow(QMainWindow):
         QThreadPool.globalInstance().start(worker)
 
     def update_translation_result(self, box_id: int, translated_text: str):
-        """Find the QListWidgetItem by box_id and set its text."""
-        for i in range(self.user_text_list.count()):
-            item = self.user_text_list.item(i)
-            if item.data(Qt.ItemDataRole.UserRole) == box_id:
-                item.setText(translated_text)
-                break
+        """Put the translation in the box's first user line (only that row repaints)."""
+        record = self.text_store.box(box_id)
+        if record is not None:
+            user_lines = record["user_lines"] or [""]
+            self.text_store.update_box(box_id, user_lines=[translated_text] + user_lines[1:])
+        self.translation_done(box_id)
 
     def handle_translation_error(self, box_id: int, error_message: str):
         """Handle/report translation errors (e.g. log or show a message)."""
         self.log(f"[Box {box_id}] Translation error: {error_message}")
+        self.translation_done(box_id, failed=True)
+
+    def translation_done(self, box_id, failed=False):
+        """Mark the page translated in the job manifest once all its boxes came back fine."""
+        if self.translation_pending is None:
+            return
+        file_path, box_ids, any_failed, version = self.translation_pending
+        box_ids.discard(box_id)
+        any_failed = any_failed or failed
+        self.translation_pending = (file_path, box_ids, any_failed, version)
+        if box_ids:
+            return
+        self.translation_pending = None
+        if self._is_current_page(file_path):
+            self.save_current_annotations()
+        if not any_failed and self.job_manifest is not None:
+            self.job_manifest.mark(file_path, "translated", version)
 
     def get_user_placeholder_text(self, box_info):
         """_summary_
@@ -945,51 +1268,19 @@ class MainWindow(QMainWindow):
     def gather_file_data_from_ui(self):
         """
         Gather the bounding boxes & lines from the UI for the current image,
-        and return a list of box-info dict:
-           { "id": box_id, 
-           "coords":(x,y,w,h), 
-           "lines":[...], 
-           "user_lines": [...]}
+        and return them as a PageBoxes of BoxRecord (id, coords (x,y,w,h), lines, user_lines).
         We'll read the bounding boxes from self.image_label, 
-        then read the text lines from self.text_list (group by box_id).
-        """
-        file_data = []
-        # Create a dict from box_id => (x,y,w,h)
-        box_dict_map = {}
-        for box_dict in self.image_label.bounding_boxes:
-            box_id = box_dict["id"]
-            box_dict_map[box_id] = box_dict["coords"]
-
-        # Create a dict from box_id => list_of_lines
-        lines_map = {}
-        for i in range(self.text_list.count()):
-            item = self.text_list.item(i)
-            line = item.text()
-            box_id = item.data(Qt.ItemDataRole.UserRole)
-            if box_id is not None:
-                if box_id not in lines_map:
-                    lines_map[box_id] = []
-                lines_map[box_id].append(line)
-
-        user_lines_map = {}
-        for i in range(self.user_text_list.count()):
-            item = self.user_text_list.item(i)
-            line = item.text()
-            b_id = item.data(Qt.ItemDataRole.UserRole)
-            if b_id not in user_lines_map:
-                user_lines_map[b_id] = []
-            user_lines_map[b_id].append(line)
-
-        # Combine
-        for box_id, coords in box_dict_map.items():
-            lines = lines_map.get(box_id, [])
-            user_lines = user_lines_map.get(box_id, [])
-            file_data.append({
-                "id": box_id,
-                "coords": coords,
-                "lines": lines,
-                "user_lines": user_lines,
-            })
+        then the text lines of each box from self.text_store.
+        Boxes whose text wasn't edited are reused as they are, not copied.
+        """
+        file_data = PageBoxes()
+        for box in self.image_label.bounding_boxes:
+            record = self.text_store.box(box.id)
+            lines = record.lines if record else []
+            user_lines = record.user_lines if record else []
+            if box.lines != lines or box.user_lines != user_lines:
+                box = BoxRecord(box.id, box.coords, list(lines), list(user_lines), box.extra)
+            file_data.append(box)
         return file_data
     
     def update_annotations_file(self):
@@ -998,14 +1289,16 @@ class MainWindow(QMainWindow):
         """
         self.log("File Saved")
         self.save_current_annotations()
+        if self.image_directory:
+            self.boxes_data.export_json()
         # Optionally print a message or show a message box:
         # print("Annotations file updated successfully.")
 
+    @timed("save_annotations")
     def save_current_annotations(self):
         """
-        Loads the existing annotations.json (if any),
-        updates ONLY the current image data,
-        then re-writes the entire file so we don't end up with duplications.
+        Stores the current image data in the directory's annotations
+        and writes them to annotations.json (other pages are copied as they are).
         """
         if not (0 <= self.current_image_index < len(self.image_files)):
             return
@@ -1013,23 +1306,30 @@ class MainWindow(QMainWindow):
         file_path = self.image_files[self.current_image_index]
         file_data = self.gather_file_data_from_ui()  # your custom function
         # file_data = [ { "id":..., "coords":..., "lines": [...] }, ... ]
+        self.write_annotations({file_path: file_data})
 
+    def write_annotations(self, pages):
+        """
+        Merge { file_path: file_data } into annotations.json and rewrite it.
+        Used for the current page and for pages finished in the background.
+        """
         if self.image_directory:
-            json_path = os.path.join(self.image_directory, "annotations.json")
-
-            # 1) Load existing data if file exists
-            if os.path.exists(json_path):
-                with open(json_path, "r", encoding='utf-8') as f:
-                    overall_data = json.load(f)
-            else:
-                overall_data = {}
+            # boxes_data is the directory's AnnotationStore: only these pages
+            # (and any others changed since the last flush) are serialized
+            self.boxes_data.update(pages)
+            self.boxes_data.flush()
 
-            # 2) Update the data for this specific file_path
-            overall_data[file_path] = file_data
-
-            # 3) Rewrite the entire file
-            with open(json_path, "w", encoding='utf-8') as f:
-                json.dump(overall_data, f, indent=4, ensure_ascii=False)
+    def save_timings(self):
+        """
+        Write the stage timings (detection, OCR, ordering, decode, saving) next to
+        annotations.json as timings.json and timings.prom, and log the slowest stages.
+        """
+        if not self.image_directory:
+            return
+        for name in ("timings.json", "timings.prom"):
+            METRICS.write(os.path.join(self.image_directory, name))
+        for line in METRICS.report(top=3):
+            self.log(line)
 
     def load_thumbnails(self):
         self.thumbnail_list.clear()
@@ -1077,190 +1377,83 @@ class MainWindow(QMainWindow):
     ########################################################################
     # Callbacks from ImageLabel
     ########################################################################
-    def on_text_list_reordered(self):
-        """
-        Called when the user finishes dragging in self.user_text_list.
-        We read the new item order, rebuild a 'file_data' that matches it,
-        then we store file_data in self.boxes_data[file_path],
-        and repopulate so the UI is consistent with memory.
-        """
-        if not (0 <= self.current_image_index < len(self.image_files)):
+    def _selected_box_ids(self, view):
+        """Box ids of the selected rows of a text pane, top to bottom."""
+        model = view.model()
+        rows = sorted(index.row() for index in view.selectionModel().selectedRows())
+        return list(dict.fromkeys(model.box_id_at(row) for row in rows))
+
+    def _select_box_rows(self, view, box_ids):
+        """Select every row of the given boxes in a text pane, replacing its selection."""
+        model = view.model()
+        selection = QItemSelection()
+        for box_id in box_ids:
+            first, count = model.box_rows(box_id)
+            if count:
+                selection.select(model.index(first), model.index(first + count - 1))
+        view.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.ClearAndSelect)
+
+    def _sync_selection(self, source, other):
+        if self._syncing_selection:
             return
+        box_ids = self._selected_box_ids(source)
 
-        file_path = self.image_files[self.current_image_index]
-        # The original data (list of bounding boxes)
-        old_file_data = self.boxes_data.get(file_path, [])
-
-        # 1) Read the new order from the user_text_list
-        # We'll build a dict from box_id => list_of_user_lines
-        new_user_map = {}
-        for i in range(self.user_text_list.count()):
-            item = self.user_text_list.item(i)
-            line = item.text()
-            box_id = item.data(Qt.ItemDataRole.UserRole)
-            if box_id not in new_user_map:
-                new_user_map[box_id] = []
-            new_user_map[box_id].append(line)
-
-        # 2) Now build a *new* file_data that has the same bounding boxes
-        # but with 'user_lines' in the newly dragged order. Typically,
-        # you only reorder lines within the same box_id, or you might reorder boxes themselves.
-        # We'll assume here you're just reordering lines *within* the same box ID.
-
-        # If you want to reorder entire boxes, you'd track each item as one "box".
-        # But if you want to reorder lines *within a single box*, you'd need a different approach.
-        # Let's assume each item = one line belonging to the box_id => so each box can have multiple lines.
-
-        new_file_data = []
-        for box_info in old_file_data:
-            b_id = box_info["id"]
-            # lines remain the same
-            box_lines = box_info.get("lines", [])
-            # user_lines become the new order from new_user_map
-            new_user_lines = new_user_map.get(b_id, [])
-            new_file_data.append({
-                "id": b_id,
-                "coords": box_info["coords"],
-                "lines": box_lines,
-                "user_lines": new_user_lines
-            })
-
-        # 3) Overwrite the old data with the new
-        self.boxes_data[file_path] = new_file_data
-
-        # 4) (Optional) Re-populate to ensure UI matches the final data
-        #    If you trust that the 'QListWidget' is already showing the correct final order,
-        #    you might skip this. But to ensure no mismatch, you can do:
-        self.populate_text_list(new_file_data)
-
-    def on_text_list_selection_changed(self):
+        # 1) Highlight the bounding boxes
+        self.image_label.selected_box_id = box_ids[0] if box_ids else None
+        self.image_label.selected_box_ids = set(box_ids)
+        self.image_label.update()
+
+        # 2) Also highlight the same box_ids in the other pane
+        self._syncing_selection = True  # avoid infinite loop
+        try:
+            self._select_box_rows(other, box_ids)
+        finally:
+            self._syncing_selection = False
+
+    def on_text_list_selection_changed(self, *_):
         """
         Called when the selection in self.text_list changes.
         We'll highlight the corresponding bounding box in blue
         and also select items in the other text list (user_text_list).
         """
-        selected_items = self.text_list.selectedItems()
-        if not selected_items:
-            # If nothing is selected, maybe reset or do nothing
-            self.image_label.selected_box_id = None
-            self.image_label.update()
-            return
-
-        # For simplicity, let's consider the first selected item only
-        item = selected_items[0]
-        box_id = item.data(Qt.ItemDataRole.UserRole)
-
-        # 1) Highlight the bounding box
-        self.image_label.selected_box_id = box_id
-        self.image_label.update()
-
-        # 2) Also highlight the same box_id in the user_text_list
-        self.user_text_list.blockSignals(True)  # avoid infinite loop
-        self.user_text_list.clearSelection()
-        for i in range(self.user_text_list.count()):
-            u_item = self.user_text_list.item(i)
-            if u_item.data(Qt.ItemDataRole.UserRole) == box_id:
-                u_item.setSelected(True)
-        self.user_text_list.blockSignals(False)
+        self._sync_selection(self.text_list, self.user_text_list)
 
     def on_text_list_reordered(self):
         """
-        After user drags items in self.text_list, we read the new order and
-        update self.boxes_data so it reflects the new line order.
+        After the user drags a box in self.text_list the store already holds
+        the new order; apply it to the bounding boxes and save.
         """
-        # self.log("on_text_list_reordered called.")
-    
         if not (0 <= self.current_image_index < len(self.image_files)):
             self.log("No valid image loaded.")
             return
 
-        file_path = self.image_files[self.current_image_index]
-        file_data = self.boxes_data.get(file_path, [])
-
-        # Create a mapping from box_id to box_info for quick access
-        box_map = {box['id']: box for box in file_data}
-
-        reordered_data = []
-
-        # Iterate over the QListWidget items in their new order
-        for i in range(self.text_list.count()):
-            item = self.text_list.item(i)
-            box_id = item.data(Qt.ItemDataRole.UserRole)
-
-            if box_id in box_map:
-                reordered_data.append(box_map[box_id])
-            else:
-                self.log(f"Warning: box_id {box_id} not found in box_map.")
-
-        # Update self.boxes_data with the reordered list
-        self.boxes_data[file_path] = reordered_data
-
-        # Optionally update ImageLabel's bounding_boxes if necessary
-        self.image_label.bounding_boxes = [
-            {"id": box["id"], "coords": box["coords"]}
-            for box in reordered_data
-        ]
-
-        # Re-populate both text lists to reflect the new order
-        self.populate_text_list(reordered_data)
+        boxes = {box.id: box for box in self.image_label.bounding_boxes}
+        self.image_label.bounding_boxes = [boxes.get(record.id, record) for record in self.text_store.records]
+        self.update_in_memory_annotations()
         self.update_annotations_file()
         self.log("boxes_data updated with new order from text_list.")
 
-    def on_user_text_list_reordered(self): # Don't Add functionaly for this rn
-        """
-        After user drags items in self.user_text_list, we read the new order and
-        update self.boxes_data so it reflects the new user_text order.
-        """
-        if not (0 <= self.current_image_index < len(self.image_files)):
-            return
-
-        file_path = self.image_files[self.current_image_index]
-        file_data = self.boxes_data.get(file_path, [])
-
-        new_user_map = {}
-        for i in range(self.user_text_list.count()):
-            item = self.user_text_list.item(i)
-            line = item.text()
-            box_id = item.data(Qt.ItemDataRole.UserRole)
-            if box_id not in new_user_map:
-                new_user_map[box_id] = []
-            new_user_map[box_id].append(line)
-
-        for box_info in file_data:
-            box_id = box_info["id"]
-            if box_id in new_user_map:
-                box_info["user_lines"] = new_user_map[box_id]
-
-        self.boxes_data[file_path] = file_data
-        # optional: self.populate_text_list(file_data)
-
-    def on_user_text_list_selection_changed(self):
+    def on_user_text_list_selection_changed(self, *_):
         """
         Called when the selection in self.user_text_list changes.
         We do the same logic but in reverse (highlight box + text_list).
         """
-        selected_items = self.user_text_list.selectedItems()
-        if not selected_items:
-            self.image_label.selected_box_id = None
-            self.image_label.update()
-            return
-
-        item = selected_items[0]
-        box_id = item.data(Qt.ItemDataRole.UserRole)
+        self._sync_selection(self.user_text_list, self.text_list)
 
-        # 1) Highlight bounding box
-        self.image_label.selected_box_id = box_id
+    def on_boxes_rect_selected(self, box_ids):
+        """
+        Shift-drag on the image: select the lines of every box inside the
+        rectangle, in both text lists.
+        """
+        self._syncing_selection = True
+        try:
+            for view in (self.text_list, self.user_text_list):
+                self._select_box_rows(view, box_ids)
+        finally:
+            self._syncing_selection = False
+        self.image_label.selected_box_id = None
         self.image_label.update()
 
-        # 2) Also highlight the same box_id in text_list
-        self.text_list.blockSignals(True)
-        self.text_list.clearSelection()
-        for i in range(self.text_list.count()):
-            o_item = self.text_list.item(i)
-            if o_item.data(Qt.ItemDataRole.UserRole) == box_id:
-                o_item.setSelected(True)
-        self.text_list.blockSignals(False)
-
     def on_left_click_box(self, box_id):
       """
       If we're in arrange mode, record the click order (box_id).
@@ -1278,21 +1471,17 @@ class MainWindow(QMainWindow):
           return
       
       """
-      Highlight text lines in self.text_list that belong to the bounding box with 'box_id'.
+      Highlight text lines in both text lists that belong to the bounding box with 'box_id'.
       """
-      # 1) Clear all selection in the text_list
-      self.text_list.clearSelection()
-      # 2) Iterate through items, select those that match box_id
-      for i in range(self.text_list.count()):
-          item = self.text_list.item(i)
-          item_box_id = item.data(Qt.ItemDataRole.UserRole)
-          if item_box_id == box_id:
-              item.setSelected(True)
-      self.user_text_list.clearSelection()
-      for i in range(self.user_text_list.count()):
-          item = self.user_text_list.item(i)
-          if item.data(Qt.ItemDataRole.UserRole) == box_id:
-              item.setSelected(True)
+      self._syncing_selection = True
+      try:
+          for view in (self.text_list, self.user_text_list):
+              self._select_box_rows(view, [box_id])
+      finally:
+          self._syncing_selection = False
+      self.image_label.selected_box_id = box_id
+      self.image_label.selected_box_ids = {box_id}
+      self.image_label.update()
 
     def on_new_box_created(self, box_id, coords):
       """
@@ -1313,37 +1502,29 @@ class MainWindow(QMainWindow):
           return
 
       # 2) Crop the region from the original image for OCR
-      pil_img = Image.open(file_path)
-      roi = pil_img.crop((x, y, x + w, y + h))
+      with timer("image_decode"):
+          roi = crop_box(np.array(Image.open(file_path)), coords)
 
       # 3) Run OCR with the chosen engine
-      results = self.ocr_engine.predict(np.array(roi))  # <-- CHANGED
+      results = self.ocr_engine.predict(roi)  # <-- CHANGED
 
       # 4) Create or retrieve the existing data for this image
       file_data = self.boxes_data.get(file_path, [])
 
-      # 5) Build a new dict for the newly drawn box
-      new_box_dict = {
-          "id": box_id,
-          "coords": (x, y, w, h),
-          "lines": results if results else [],
-          "user_lines": []  # placeholder list for user text
-      }
-      file_data = [d for d in file_data if d["id"] != box_id]
-      # 6) Append the new box dict to the existing data
-      updated_data = file_data + [new_box_dict]
-      self.boxes_data[file_path] = updated_data
+      # 5) Build a new record for the newly drawn box
+      new_box_dict = BoxRecord(box_id, (x, y, w, h), results if results else [], [])  # user_lines: placeholder
+      self.mark_ocr_done(new_box_dict)
+      file_data = PageBoxes(as_record(d) for d in file_data if d["id"] != box_id)
+      # 6) Append the new box record to the existing data
+      file_data.append(new_box_dict)
+      self.boxes_data[file_path] = file_data
 
       # 7) Update the ImageLabel's bounding_boxes (so it can draw the new box)
-      self.image_label.bounding_boxes.clear()
-      for box_info in updated_data:
-          self.image_label.bounding_boxes.append({
-              "id": box_info["id"],
-              "coords": box_info["coords"]
-          })
+      self.image_label.bounding_boxes = PageBoxes(file_data)
 
-      # 8) Re-populate both text widgets (OCR + user text) with updated_data
-      self.populate_text_list(updated_data, "new_box_created")  # <-- ADDED
+      # 8) Add its rows to both text widgets (OCR + user text)
+      self._append_box_items(new_box_dict)
+      self.log("new_box_created")
 
       # 9) Finally, update the label so the new box appears immediately
       self.image_label.update()
@@ -1355,14 +1536,8 @@ class MainWindow(QMainWindow):
         to remove that box's text items.
         """
         if delete:
-            # remove all items from text_list with this box_id
-            i = 0
-            while i < self.text_list.count():
-                item = self.text_list.item(i)
-                if item.data(Qt.ItemDataRole.UserRole) == box_id:
-                    self.text_list.takeItem(i)  # remove
-                else:
-                    i += 1
+            # remove the box's rows from both text lists
+            self.text_store.remove_box(box_id)
         else:
             # The user just right-clicked to select. 
             # If you want to highlight the text or something, do it here.
@@ -1374,12 +1549,14 @@ class MainWindow(QMainWindow):
     def clear_all(self):
         """
         Remove all bounding boxes and all text from the current image only.
+        Its stages are dropped from the job manifest, so OCR All does the page again.
         """
         if not (0 <= self.current_image_index < len(self.image_files)):
             return
+        if self.job_manifest is not None:
+            self.job_manifest.reset(self.image_files[self.current_image_index])
         self.image_label.bounding_boxes.clear()
-        self.text_list.clear()
-        self.user_text_list.clear()
+        self.text_store.clear()
         self.image_label.update()
 
     def change_text_size(self):
@@ -1392,47 +1569,133 @@ class MainWindow(QMainWindow):
     ########################################################################
     # YOLO
     ########################################################################
-    def perform_re_ocr(self):
+    def perform_re_ocr(self, *_, force=None):
+        """
+        OCR the boxes of the current page that need it (see needs_ocr), or all
+        of them with force (Shift+click on the button).
+        """
+        if force is None:
+            force = bool(QApplication.keyboardModifiers() & Qt.KeyboardModifier.ShiftModifier)
         if not (0 <= self.current_image_index < len(self.image_files)):
             self.log("No valid image loaded for re-OCR.")
             return
+        if self.ocr_job is not None:
+            self.log("OCR is already running on a page.")
+            return
 
+        self.update_in_memory_annotations()
         file_path = self.image_files[self.current_image_index]
         file_data = self.boxes_data.get(file_path, [])
         if not file_data:
             self.log("No bounding boxes found for re-OCR.")
             return
 
-        pil_img = Image.open(file_path)
-        new_data = []
+        # Only boxes whose geometry/engine changed or that have no text yet
+        targets = file_data if force else self.dirty_boxes(file_data)
+        boxes = [(box_info["id"], tuple(box_info["coords"])) for box_info in targets]
+        if not boxes:
+            self.log("Re-OCR: no changed or new boxes on this page.")
+            return
+        self.log(f"Re-OCR for {len(boxes)} of {len(file_data)} boxes.")
+        self.start_ocr_job(OCRJobWorker(file_path, self.ocr_engine, boxes=boxes), file_path)
 
-        for box_info in file_data:
-            x, y, w, h = box_info["coords"]
-            roi = pil_img.crop((x, y, x + w, y + h))
-            results = self.ocr_engine.predict(np.array(roi))
-
-            new_data.append({
-                "id": box_info["id"],
-                "coords": box_info["coords"],
-                "lines": results if results else [],
-                # "user_lines": box_info.get("user_lines", [])
-                "user_lines": []
-            })
+    def mark_ocr_done(self, box_info):
+        """Record the geometry and engine a box's lines were OCR'd with (saved with the box)."""
+        mark_ocr(box_info, self.ocr_engine.engine_name)
 
-        self.boxes_data[file_path] = new_data
+    def dirty_boxes(self, file_data):
+        """
+        Boxes that need OCR: no lines yet, coords changed since their last OCR,
+        OCR'd by another engine, or not known to be OCR'd by this one.
+        """
+        engine_name = self.ocr_engine.engine_name
+        return [box_info for box_info in file_data if needs_ocr(box_info, engine_name)]
 
-        self.image_label.bounding_boxes.clear()
-        for b in new_data:
-            self.image_label.bounding_boxes.append({
-                "id": b["id"],
-                "coords": b["coords"]
-            })
+    ########################################################################
+    # Background page OCR (progress, cancel, streamed boxes)
+    ########################################################################
+    def start_ocr_job(self, worker, file_path):
+        self.ocr_job = worker
+        self.ocr_job_path = file_path
+        worker.setAutoDelete(False)  # we keep it around to be able to cancel it
+        worker.signals.started.connect(self.on_ocr_job_started)
+        worker.signals.box_done.connect(self.on_ocr_job_box_done)
+        worker.signals.finished.connect(self.on_ocr_job_finished)
+        worker.signals.error.connect(self.on_ocr_job_error)
+        self.ocr_progress.setRange(0, 0)  # busy until the box count is known
+        self.ocr_progress.setVisible(True)
+        self.cancel_ocr_button.setVisible(True)
+        QThreadPool.globalInstance().start(worker)
 
-        self.populate_text_list(new_data)
-        self.image_label.update()
+    def cancel_ocr_job(self):
+        if self.ocr_job is not None:
+            self.ocr_job.cancel()
+            self.log("Cancelling OCR...")
+
+    def _is_current_page(self, file_path):
+        return (0 <= self.current_image_index < len(self.image_files)
+                and self.image_files[self.current_image_index] == file_path)
+
+    def on_ocr_job_started(self, total):
+        self.ocr_progress.setRange(0, max(total, 1))
+        self.ocr_progress.setValue(0)
+
+    def on_ocr_job_box_done(self, box_id, coords, lines):
+        """One crop finished: store it and show it right away if its page is on screen."""
+        file_path = self.ocr_job_path
+        file_data = self.boxes_data.setdefault(file_path, [])
+        on_screen = self._is_current_page(file_path)
+        coords = tuple(coords)
+
+        if box_id is None:
+            # Freshly detected box
+            box_id = self.image_label.next_box_id
+            self.image_label.next_box_id += 1
+            box_info = BoxRecord(box_id, coords, lines, [])
+            self.mark_ocr_done(box_info)
+            file_data.append(box_info)
+            if on_screen:
+                self.image_label.bounding_boxes.append(box_info)
+                self._append_box_items(box_info)
+                self.image_label.update()
+        else:
+            box_info = next((b for b in file_data if b["id"] == box_id), None)
+            if box_info is not None:  # the user may have deleted it meanwhile
+                box_info["lines"] = lines
+                self.mark_ocr_done(box_info)
+                box_info["user_lines"] = []
+                if on_screen:
+                    self._refresh_box_items(box_info)
+        self.ocr_progress.setValue(self.ocr_progress.value() + 1)
+
+    def on_ocr_job_finished(self, cancelled):
+        file_path = self.ocr_job_path
+        full_page = self.ocr_job.detector is not None
+        done = self.ocr_progress.value()
+        self._end_ocr_job()
+        if self._is_current_page(file_path):
+            self.save_current_annotations()
+        else:
+            self.write_annotations({file_path: self.boxes_data.get(file_path, [])})
+        if full_page and not cancelled and self.job_manifest is not None:
+            # A whole-page run counts for the batch too, so "OCR All" won't redo it
+            models = self.stage_models()
+            models["arranged"] = f"geometric:{self.reading_direction()}"
+            self.mark_page_stages(file_path, ("detected", "ocr", "arranged"), models)
+        if cancelled:
+            self.log(f"OCR cancelled after {done} boxes.")
+        else:
+            self.log(f"OCR done for {done} boxes.")
 
-        self.log(f"Re-OCR with current engine completed for {len(new_data)} boxes.")
+    def on_ocr_job_error(self, error_message):
+        self._end_ocr_job()
+        self.log(f"OCR failed: {error_message}")
 
+    def _end_ocr_job(self):
+        self.ocr_job = None
+        self.ocr_job_path = None
+        self.ocr_progress.setVisible(False)
+        self.cancel_ocr_button.setVisible(False)
 
     def perform_yolo_all_images_old(self):
         """
@@ -1479,7 +1742,7 @@ class MainWindow(QMainWindow):
                 box_id = max_id
 
                 # OCR on the cropped region
-                cropped = img_np[y1:y2, x1:x2]
+                cropped = crop_box(img_np, (x1, y1, w, h))
                 results = self.ocr_engine.predict(cropped)  # or self.reader.readtext if not using engine
                 new_boxes.append({
                     "id": box_id,
@@ -1502,143 +1765,278 @@ class MainWindow(QMainWindow):
     def perform_yolo_all_images(self):
         """
         Runs YOLO detection + OCR on all images starting from
-        the CURRENT image index, removing all bounding boxes and texts
-        for each image first, then performing YOLO OCR.
+        the CURRENT image index.
+        Pages the job manifest already lists as done (with the current models)
+        are skipped, so an interrupted run resumes where it stopped; the others
+        are redone from their first unfinished stage.
         """
         if not self.image_files:
             self.log("No images loaded.")
             return
+        if self.ocr_pool is not None:
+            self.perform_yolo_all_images_pooled()
+            return
 
-        start_index = max(0, self.current_image_index)
-        end_index = len(self.image_files)
-        #detector = BoxDetection()
-        detector = self.detector
-        for i in range(start_index, end_index):
+        models = self.stage_models()
+        pages = self.pending_batch_pages(models)
+        for i, file_path, pending in pages:
             self.current_image_index = i
-            file_path = self.image_files[i]
 
-            # 1) Load the image into the UI
-            self.load_image()  # so we can clear or reference bounding boxes if needed
-
-            # 2) Clear all bounding boxes & text for this image
-            self.clear_all()   # removes bounding boxes and text from UI, not from self.boxes_data
-
-            self.boxes_data[file_path] = []
-            yolo_boxes = detector.predict(file_path)  # returns [(x1, y1, x2, y2), ...]
-
-            # Convert to a new list of bounding boxes with OCR lines
-            pil_img = Image.open(file_path)
-            img_np = np.array(pil_img)
-            new_data = []
-            max_id = self.image_label.next_box_id
-
-            for (x1, y1, x2, y2) in yolo_boxes:
-                w, h = x2 - x1, y2 - y1
-                if w <= 0 or h <= 0:
-                    continue
+            copied = self.copy_duplicate_page(file_path, models) if "ocr" in pending else None
+            if copied is not None:
+                # 1-2) Same picture as a page done before, its boxes and text are already in order
+                new_data = copied
+            elif "ocr" in pending:
+                # 1) Boxes, from the manifest when only OCR has to be redone
+                boxes = self.detect_page_boxes(file_path, pending, models)
+
+                # 2) OCR all cropped regions of the page in one batch
+                with timer("image_decode"):
+                    img_np = np.array(Image.open(file_path))
+                all_results = self.ocr_engine.predict_batch([crop_box(img_np, box) for box in boxes])
+                new_data = []
+                for (x, y, w, h), results in zip(boxes, all_results):
+                    new_data.append({
+                        "id": self.image_label.next_box_id,
+                        "coords": (x, y, w, h),
+                        "lines": results if results else [],
+                        "user_lines": []
+                    })
+                    self.image_label.next_box_id += 1
+                for box_info in new_data:
+                    self.mark_ocr_done(box_info)
+            else:
+                # Only the reading order is out of date, keep the text (and translations)
+                new_data = self.boxes_data.get(file_path, [])
 
-                box_id = max_id
-                max_id += 1
+            # 3) Arrange, save, and show the page
+            self.finish_batch_page(file_path, new_data, pending, models, arrange=copied is None)
+            self.load_image()
+            self.log(f"{file_path} with {len(new_data)} boxes detected.")
+        if self.page_index is not None:
+            self.page_index.save()
+
+    def stage_models(self):
+        """{ stage: model version } for the stages a batch run performs."""
+        direction = self.reading_direction()
+        if self.use_geometric_order():
+            arranged = f"geometric:{direction}"
+        else:
+            arranged = model_version(SEQUENCER_MODELS[direction])
+        return {
+            "detected": model_version(self.detector.model_path),
+            "ocr": ocr_version(self.ocr_engine),
+            "arranged": arranged,
+        }
+
+    def pending_batch_pages(self, models):
+        """[(index, file_path, pending stages), ...] from the current page on, logging what is skipped."""
+        start_index = max(0, self.current_image_index)
+        pages = []
+        for i in range(start_index, len(self.image_files)):
+            file_path = self.image_files[i]
+            pending = self.job_manifest.pending_stages(file_path, models)
+            if pending:
+                pages.append((i, file_path, pending))
+        skipped = len(self.image_files) - start_index - len(pages)
+        if skipped:
+            self.log(f"Resuming: {skipped} pages already done, {len(pages)} left.")
+        if not pages:
+            self.log("All pages are already processed with the current models.")
+        return pages
+
+    def detect_page_boxes(self, file_path, pending, models):
+        """Bubble boxes (x, y, w, h) of a page, reusing the manifest's when detection is done."""
+        record = self.job_manifest.record(file_path, "detected")
+        if "detected" not in pending and record is not None and "boxes" in record:
+            return [tuple(box) for box in record["boxes"]]
+        yolo_boxes = self.detector.predict(file_path)  # returns [(x1, y1, x2, y2), ...]
+        boxes = [(x1, y1, x2 - x1, y2 - y1) for (x1, y1, x2, y2) in yolo_boxes if x2 > x1 and y2 > y1]
+        self.job_manifest.mark(file_path, "detected", models["detected"], boxes=[list(box) for box in boxes])
+        return boxes
+
+    def finish_batch_page(self, file_path, new_data, pending, models, arrange=True):
+        """Arrange a processed page, write it to annotations.json, then record it in the manifest."""
+        if new_data and arrange:
+            new_data = self.arrange_file_data(new_data, file_path)
+        self.boxes_data[file_path] = new_data
+        self.write_annotations({file_path: new_data})
+        # Only after the annotations are on disk, so a crash in between just redoes the page
+        self.mark_page_stages(file_path, [stage for stage in ("ocr", "arranged") if stage in pending], models)
+        if self.page_index is not None:
+            self.page_index.add_processed(file_path, models)
+
+    def copy_duplicate_page(self, file_path, models):
+        """
+        Boxes and text (with new ids) of an already processed page that looks the
+        same as this one, or None. Detection and OCR are recorded as done.
+        """
+        if self.page_index is None:
+            return None
+        copy = self.page_index.processed_copy(file_path, models, self.boxes_data)
+        if copy is None:
+            return None
+        source, source_data, _ = copy
+        box_ids = list(range(self.image_label.next_box_id, self.image_label.next_box_id + len(source_data)))
+        self.image_label.next_box_id += len(source_data)
+        new_data = copy_boxes(source_data, box_ids)
+        self.job_manifest.mark(
+            file_path, "detected", models["detected"],
+            boxes=[list(box.coords) for box in new_data], duplicate_of=source,
+        )
+        for box_info in new_data:
+            self.mark_ocr_done(box_info)
+        self.log(f"{file_path} repeats {source}, reusing its {len(new_data)} boxes.")
+        return new_data
 
-                # OCR on the cropped region
-                cropped = img_np[y1:y2, x1:x2]
-                results = self.ocr_engine.predict(cropped)  # or self.reader.readtext if you had a direct approach
+    def mark_page_stages(self, file_path, stages, models):
+        for stage in stages:
+            self.job_manifest.mark(file_path, stage, models[stage], save=False)
+        self.job_manifest.save()
 
-                new_data.append({
-                    "id": box_id,
-                    "coords": (x1, y1, w, h),
-                    "lines": results if results else [],
-                    "user_lines": []
-                })
+    def perform_yolo_all_images_pooled(self):
+        """
+        perform_yolo_all_images with OCR spread over the worker pool.
+        Detection runs one page per event-loop turn (so the window stays responsive)
+        and each page goes to the pool as soon as its boxes are known.
+        Finished pages come back through on_pool_page_done.
+        """
+        self.update_in_memory_annotations()
+        self.pool_models = self.stage_models()
+        self.pool_queue = [(file_path, pending) for _, file_path, pending in self.pending_batch_pages(self.pool_models)]
+        if not self.pool_queue:
+            return
+        self.log(f"OCR queued for {len(self.pool_queue)} pages on {self.ocr_pool.workers} workers.")
+        QTimer.singleShot(0, self._pool_detect_next)
 
-            self.image_label.next_box_id = max_id
+    def _pool_detect_next(self):
+        if not self.pool_queue:
+            return
+        file_path, pending = self.pool_queue.pop(0)
+        if "ocr" not in pending:
+            self.finish_batch_page(file_path, self.boxes_data.get(file_path, []), pending, self.pool_models)
+            QTimer.singleShot(0, self._pool_detect_next)
+            return
+        # Only pages whose OCR already came back can be copied, not ones still in the pool
+        copied = self.copy_duplicate_page(file_path, self.pool_models)
+        if copied is not None:
+            self.finish_batch_page(file_path, copied, pending, self.pool_models, arrange=False)
+            QTimer.singleShot(0, self._pool_detect_next)
+            return
+        boxes = self.detect_page_boxes(file_path, pending, self.pool_models)
+        box_ids = list(range(self.image_label.next_box_id, self.image_label.next_box_id + len(boxes)))
+        self.image_label.next_box_id += len(boxes)
+
+        with timer("image_decode"):
+            page = np.array(Image.open(file_path))
+        future = self.ocr_pool.submit_page(page, boxes)
+        future.add_done_callback(
+            lambda f, fp=file_path, b=boxes, ids=box_ids: self._emit_pool_result(f, fp, b, ids)
+        )
+        QTimer.singleShot(0, self._pool_detect_next)
 
-            # 4) Store the new bounding boxes in self.boxes_data
-            self.boxes_data[file_path] = new_data
+    def _emit_pool_result(self, future, file_path, boxes, box_ids):
+        # Runs on the pool's collector thread: only emit, never touch widgets here
+        error = future.exception()
+        if error is not None:
+            self.ocr_pool_signals.page_error.emit(file_path, str(error))
+        else:
+            self.ocr_pool_signals.page_done.emit(file_path, list(zip(box_ids, boxes, future.result())))
 
-            # 5) Update the UI bounding boxes and text
-            self.image_label.bounding_boxes.clear()
-            for box_dict in new_data:
-                self.image_label.bounding_boxes.append({
-                    "id": box_dict["id"],
-                    "coords": box_dict["coords"]
-                })
-            self.on_arrange_button() # Arrange According to AI #Here
-            # Re-populate the text boxes
-            self.populate_text_list(new_data)
-            self.image_label.update()
+    def on_pool_page_done(self, file_path, entries):
+        new_data = PageBoxes(
+            BoxRecord(box_id, coords, results if results else [], [])
+            for box_id, coords, results in entries
+        )
+        for box_info in new_data:
+            self.mark_ocr_done(box_info)
+        self.finish_batch_page(file_path, new_data, ("ocr", "arranged"), self.pool_models)
+        if 0 <= self.current_image_index < len(self.image_files) and self.image_files[self.current_image_index] == file_path:
+            self.load_image()
+        self.log(f"{file_path} with {len(new_data)} boxes detected.")
 
-            # 6) Optionally save annotations for each image
-            self.save_current_annotations()
-            self.log(f"{file_path} with {len(new_data)} boxes detected.")
+    def on_pool_page_error(self, file_path, error_message):
+        self.log(f"OCR failed for {file_path}: {error_message}")
 
+    ########################################################################
+    # Chapter Queue
+    ########################################################################
+    def queue_chapter(self):
+        """
+        Add a chapter directory to the background queue. Chapters run in the order
+        they were queued, sharing this window's detector, OCR engine and panel model.
+        The chapter open in the window can't be queued: both would write its
+        annotations and manifest.
+        """
+        directory = QFileDialog.getExistingDirectory(self, "Queue Chapter Directory", "")
+        if not directory:
+            return
+        if self.image_directory and same_directory(directory, self.image_directory):
+            self.log(f"{os.path.basename(directory)} is open here, use OCR All Images or open another chapter first.")
+            return
+        if self.chapter_scheduler is not None and self.chapter_scheduler.active_job(directory) is not None:
+            self.log(f"{os.path.basename(directory)} is already in the queue.")
+            return
+        if self.chapter_scheduler is None:
+            pipeline = ChapterPipeline(
+                self.ocr_engine.engine_name, order_engine_from_env,
+                panels=self.panelDetector is not None,
+                translate=bool(translator_flag),
+                detector=self.detector,
+                ocr_engine=self.ocr_engine,
+                panel_detector=self.panelDetector,
+                sequencer_for=self.sequencer_for,
+                page_index=self.page_index,
+            )
+            self.chapter_scheduler = ChapterScheduler(
+                pipeline, chapter_workers,
+                on_page_done=self.chapter_queue_signals.page_done.emit,
+                on_chapter_done=self.chapter_queue_signals.chapter_done.emit,
+            )
+        direction = self.chapter_directions.get(directory, self.reading_direction())
+        job = self.chapter_scheduler.submit(directory, direction=direction)
+        self.log(f"Queued {os.path.basename(directory)} ({len(job.pages)} pages).")
+
+    def on_queue_page_done(self, job, file_path):
+        done = job.processed + job.skipped + len(job.errors)
+        self.log(f"{os.path.basename(job.directory)}: {done}/{len(job.pages)} pages")
+
+    def on_queue_chapter_done(self, job):
+        report = job.report()
+        self.log(
+            f"{os.path.basename(job.directory)} {report['state']}: {report['processed']} pages, "
+            f"{report['boxes']} boxes, {len(report['errors'])} errors in {report['seconds']}s"
+        )
+        if job.directory == self.image_directory:
+            # The open chapter was written behind our back, show what's on disk now
+            self.boxes_data = load_annotations(job.directory)
+            self.load_image()
 
     def perform_yolo_ocr(self):
         """_summary_
         Performs YOLO Bubble Detection.
+        Detection and OCR run in the background, boxes appear one by one in reading order.
         Major Issue: There's a scenario where it detects same bubble multiple times with the exact bouding box coords.
         """
         if not (0 <= self.current_image_index < len(self.image_files)):
             return
+        if self.ocr_job is not None:
+            self.log("OCR is already running on a page.")
+            return
 
-        # 1) Clear the old bounding boxes/text from the current image
+        # 1) Clear the old bounding boxes/text from the current image (and its manifest stages,
+        #    marked again once the new run finishes)
         self.clear_all()
 
         file_path = self.image_files[self.current_image_index]
-        #detector = BoxDetection()
-        detector = self.detector
-        yolo_boxes = detector.predict(file_path)  # each is (x1, y1, x2, y2)
-
-        pil_img = Image.open(file_path)
-        img_np = np.array(pil_img)
-
-        # 2) Build a single new_data list for all YOLO boxes
-        new_data = []
-        current_box_id = self.image_label.next_box_id
-        #print("loop in")
-        for (x1, y1, x2, y2) in yolo_boxes:
-            w = x2 - x1
-            h = y2 - y1
-            if w <= 0 or h <= 0:
-                continue
-
-            box_id = current_box_id
-            current_box_id += 1
-
-            # OCR for this bounding box
-            cropped = img_np[y1:y2, x1:x2]
-            results = self.ocr_engine.predict(cropped)
-
-            # Add to new_data
-            new_data.append({
-                "id": box_id,
-                "coords": (x1, y1, w, h),
-                "lines": results if results else [],
-                "user_lines": []
-            })
-        #print("loop out")
-        # 3) Update next_box_id once after processing all boxes
-        self.image_label.next_box_id = current_box_id
-
-        # 4) (Optional) Reorder them if you have custom logic
-        new_data = self.arrange_bounding_box_sequence(new_data)
-
-        # 5) Update self.boxes_data for this file
-        self.boxes_data[file_path] = new_data
-
-        # 6) Set bounding boxes in the ImageLabel
-        self.image_label.bounding_boxes.clear()
-        for box_dict in new_data:
-            self.image_label.bounding_boxes.append({
-                "id": box_dict["id"],
-                "coords": box_dict["coords"]
-            })
-
-        # 7) Finally, populate the text widgets once
-        self.populate_text_list(new_data, "Text Bubble Detection Done.")
-
-        # 8) Update the image label
-        self.image_label.update()
+        self.boxes_data[file_path] = []
+        self.log("Text Bubble Detection started.")
+        worker = OCRJobWorker(
+            file_path, self.ocr_engine,
+            detector=self.detector,
+            arrange=self.geometric_arranger(file_path),
+        )
+        self.start_ocr_job(worker, file_path)
 
     ########################################################################
     # Arrange Modes
@@ -1718,10 +2116,22 @@ class MainWindow(QMainWindow):
       Takes a list of bounding boxes (each is a dict with 'id' and 'coords')
       and returns a new list in the desired order.
       
-      For now, it's just a placeholder that returns the list unchanged.
+      Uses the geometric engine (rows + reading direction), so it is cheap enough
+      to run on every fresh detection without loading any model.
       """
-      # TODO: implement your custom reordering logic in the future.
-      return box_dicts
+      if not (0 <= self.current_image_index < len(self.image_files)):
+          return box_dicts
+      return self.geometric_arranger(self.image_files[self.current_image_index])(box_dicts)
+
+    def geometric_arranger(self, image_path):
+      """
+      Geometric ordering bound to one page, safe to call from worker threads
+      (it doesn't touch the window once created).
+      """
+      with Image.open(image_path) as img:
+          image_size = img.size
+      model = GeometricOrder(self.reading_direction(), page=image_path)
+      return lambda box_dicts: organize_bubbles_geometric(box_dicts, None, model, image_size)
     
     def on_arrange_button(self):
         """
@@ -1738,38 +2148,43 @@ class MainWindow(QMainWindow):
         # for now, arrange_file_data will just return the same sequence
 
         # 3) Update the image_label.bounding_boxes
-        self.image_label.bounding_boxes = [
-            {"id": d["id"], "coords": d["coords"]}
-            for d in new_data
-        ]
+        self.image_label.bounding_boxes = new_data
 
-        # 4) Re-populate the text_list
-        self.text_list.clear()
-        self.user_text_list.clear()
-        for d in new_data:
-            for line in d["lines"]:
-                item = QListWidgetItem(line)
-                item.setData(Qt.ItemDataRole.UserRole, d["id"])
-                item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-                self.text_list.addItem(item)
-            for user_line in d.get("user_lines", []):
-                item2 = QListWidgetItem(user_line)
-                item2.setData(Qt.ItemDataRole.UserRole, d["id"])
-                item2.setFlags(item2.flags() | Qt.ItemFlag.ItemIsEditable)
-                self.user_text_list.addItem(item2)           
+        # 4) Move the rows of both text lists into the same order
+        self.text_store.reorder([d["id"] for d in new_data])
 
         # 5) Update the display if needed
         self.image_label.update()
 
-    def arrange_file_data(self, file_data):
+    def arrange_file_data(self, file_data, image_path=None):
         def get_image_size(image_path):
             """Returns (width, height) of an image"""
             with Image.open(image_path) as img:
                 return img.size  # returns (width, height)
-        image_path = self.image_files[self.current_image_index]
-        panels = self.panelDetector.predict(image_path)
-        ordered_data = organize_bubbles(file_data,panels,self.panel_sequencer_model, get_image_size(image_path))
-        return ordered_data[::-1]
+        if image_path is None:
+            image_path = self.image_files[self.current_image_index]
+        direction = self.reading_direction()
+        if self.use_geometric_order():
+            sequencer = GeometricOrder(direction, page=image_path)
+        else:
+            sequencer = self.current_sequencer()
+
+        # Same page + same box geometry + same model/direction => same order
+        key = order_cache_key(image_path, file_data, sequencer.model_path, direction)
+        cached_order = self.arrange_cache.get(key)
+        if cached_order is not None:
+            ordered_data = apply_cached_order(file_data, cached_order)
+            if ordered_data is not None:
+                return ordered_data
+
+        panels = self.panelDetector.predict(image_path) if self.panelDetector else None
+        if isinstance(sequencer, GeometricOrder):
+            ordered_data = organize_bubbles_geometric(file_data, panels, sequencer, get_image_size(image_path))
+        else:
+            ordered_data = organize_bubbles(file_data,panels,sequencer, get_image_size(image_path))
+            ordered_data = ordered_data[::-1]
+        self.arrange_cache.put(key, [quantize_coords(d["coords"]) for d in ordered_data])
+        return ordered_data
     
     def reorder_boxes_and_text_by_click_order(self, file_data):
       # print("first One")
@@ -1800,27 +2215,10 @@ class MainWindow(QMainWindow):
       new_data.extend(leftover)
   
       # 6) Update the image_label.bounding_boxes with the new order
-      self.image_label.bounding_boxes.clear()
-      for d in new_data:
-          self.image_label.bounding_boxes.append({
-              "id": d["id"],
-              "coords": d["coords"]
-          })
+      self.image_label.bounding_boxes = new_data
   
-      # 7) Re-populate self.text_list and user_text_list in the same new order
-      self.text_list.clear()
-      self.user_text_list.clear()
-      for d in new_data:
-          for line in d["lines"]:
-            item = QListWidgetItem(line)
-            item.setData(Qt.ItemDataRole.UserRole, d["id"])
-            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-            self.text_list.addItem(item)
-          for user_line in d.get("user_lines", []):
-            item2 = QListWidgetItem(user_line)
-            item2.setData(Qt.ItemDataRole.UserRole, d["id"])
-            item2.setFlags(item2.flags() | Qt.ItemFlag.ItemIsEditable)
-            self.user_text_list.addItem(item2)
+      # 7) Move the rows of self.text_list and user_text_list into the same new order
+      self.text_store.reorder([d["id"] for d in new_data])
               
       # 8) Save it back to self.boxes_data for this image
       file_path = self.image_files[self.current_image_index]
@@ -1858,27 +2256,10 @@ class MainWindow(QMainWindow):
       new_data.extend(leftover)
   
       # 6) Update the image_label.bounding_boxes with the new order
-      self.image_label.bounding_boxes.clear()
-      for d in new_data:
-          self.image_label.bounding_boxes.append({
-              "id": d["id"],
-              "coords": d["coords"]
-          })
+      self.image_label.bounding_boxes = new_data
   
-      # 7) Re-populate self.text_list and user_text_list in the same new order
-      self.text_list.clear()
-      self.user_text_list.clear()
-      for d in new_data:
-          for line in d["lines"]:
-            item = QListWidgetItem(line)
-            item.setData(Qt.ItemDataRole.UserRole, d["id"])
-            item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-            self.text_list.addItem(item)
-          for user_line in d.get("user_lines", []):
-            item2 = QListWidgetItem(user_line)
-            item2.setData(Qt.ItemDataRole.UserRole, d["id"])
-            item2.setFlags(item2.flags() | Qt.ItemFlag.ItemIsEditable)
-            self.user_text_list.addItem(item2)
+      # 7) Move the rows of self.text_list and user_text_list into the same new order
+      self.text_store.reorder([d["id"] for d in new_data])
               
       # 8) Save it back to self.boxes_data for this image
       file_path = self.image_files[self.current_image_index]
@@ -1962,6 +2343,15 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         self.save_current_annotations()
+        if self.image_directory:
+            self.boxes_data.export_json()
+        if self.page_index is not None:
+            self.page_index.save()
+        if self.ocr_pool is not None:
+            self.ocr_pool.shutdown()
+        if self.chapter_scheduler is not None:
+            # Pages in flight finish on their own; the manifests let the rest resume later
+            self.chapter_scheduler.shutdown(wait=False)
         super().closeEvent(event)
 
 
@@ -0,0 +1,149 @@
+import json
+import time
+import random
+import threading
+import functools
+
+# Timing of the hot paths (detection, OCR, ordering, image decode, saving).
+#
+#   with timer("image_decode"):
+#       img = np.array(Image.open(path))
+#
+#   @timed("bubble_detect")
+#   def predict(self, image): ...
+#
+# Every stage keeps a count, a total and a uniform random sample of RESERVOIR_SIZE
+# of its durations (reservoir sampling, Algorithm R: the n-th call replaces a
+# random slot with probability RESERVOIR_SIZE/n), so p50/p95/p99 cover the whole
+# run, not just the last calls, at a cost of one perf_counter pair per call.
+# snapshot() / to_json() / to_prometheus() export the current state.
+
+RESERVOIR_SIZE = 2048
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Histogram():
+    def __init__(self, size=RESERVOIR_SIZE):
+        self.size = size
+        self.samples = []
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        if len(self.samples) < self.size:
+            self.samples.append(seconds)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.size:
+                self.samples[slot] = seconds
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q, ordered=None):
+        ordered = ordered if ordered is not None else sorted(self.samples)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        summary = {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+        }
+        for q in QUANTILES:
+            summary[f"p{int(q * 100)}"] = self.quantile(q, ordered)
+        return summary
+
+
+class Metrics():
+    """Named histograms of durations in seconds. Thread-safe."""
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def snapshot(self):
+        """{ stage: {count, sum, mean, max, p50, p95, p99} }, slowest total first."""
+        with self._lock:
+            items = [(name, histogram.summary()) for name, histogram in self._histograms.items()]
+        items.sort(key=lambda item: item[1]["sum"], reverse=True)
+        return dict(items)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def to_json(self, indent=2):
+        return json.dumps({"timestamp": time.time(), "stages": self.snapshot()}, indent=indent)
+
+    def to_prometheus(self, metric="setsu_stage_seconds"):
+        """Prometheus text exposition format, one summary per stage."""
+        lines = [
+            f"# HELP {metric} Time spent per pipeline stage.",
+            f"# TYPE {metric} summary",
+        ]
+        for name, summary in self.snapshot().items():
+            for q in QUANTILES:
+                lines.append(f'{metric}{{stage="{name}",quantile="{q}"}} {summary[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {summary["sum"]:.6f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {summary["count"]}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the snapshot to 'path' (.prom gets the Prometheus format, anything else JSON)."""
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def report(self, top=5):
+        """One line per stage with the largest total time, for logs."""
+        return [
+            f"{name}: {s['count']}x p50 {s['p50'] * 1000:.1f}ms p95 {s['p95'] * 1000:.1f}ms total {s['sum']:.2f}s"
+            for name, s in list(self.snapshot().items())[:top]
+        ]
+
+
+# Process-wide registry used by timer/timed
+METRICS = Metrics()
+
+
+class timer():
+    """Context manager adding the duration of its block to stage 'name'."""
+    __slots__ = ("name", "metrics", "start")
+
+    def __init__(self, name, metrics=METRICS):
+        self.name = name
+        self.metrics = metrics
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+def timed(name, metrics=METRICS):
+    """Decorator version of timer."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metrics.observe(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
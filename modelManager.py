@@ -0,0 +1,243 @@
+import os
+import gc
+import sys
+import time
+import ctypes
+import itertools
+import threading
+from contextlib import contextmanager
+from metrics import timer
+
+# Model weights under one memory budget, dropped when idle and loaded again on
+# the next use.
+#
+#   detector = MODELS.register("bubble ./model/bubble.pt", lambda: YOLO(path))
+#   with detector.use() as model:     # loads it if needed, can't be dropped inside
+#       results = model(image)
+#   MODELS.report()                   # { name: {"loaded", "mb", "idle_s", "loads"} }
+#
+# The detectors, the sequencers and the OCR engines register a loader instead
+# of holding their weights for the whole session. A model unused for
+# MODEL_IDLE_SECONDS is dropped by a background thread, and loading one that
+# would take the resident total over MODEL_MEMORY_MB first drops the least
+# recently used models nobody is inside use() of. A model's size is the bytes
+# of the torch parameters and buffers found on what its loader returns (or, for
+# anything else, how much the process grew while loading), measured on load.
+#
+# Dropping the last reference isn't enough on CPU: glibc keeps the freed pages
+# in its arenas, so after an unload the allocator is asked to hand them back
+# (malloc_trim), and CUDA's cache is emptied when there is one.
+
+MODEL_MEMORY_MB = float(os.getenv("MODEL_MEMORY_MB", 0))           # 0: no budget
+MODEL_IDLE_SECONDS = float(os.getenv("MODEL_IDLE_SECONDS", 600))   # 0: keep idle models
+
+
+def _rss_mb():
+    """Resident memory of this process in MB, or None."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def torch_size_mb(obj):
+    """Bytes of the torch tensors of obj (a module, or an object holding modules) in MB, or None."""
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return None
+    if isinstance(obj, torch.nn.Module):
+        modules = [obj]
+    else:
+        modules = [value for value in getattr(obj, "__dict__", {}).values() if isinstance(value, torch.nn.Module)]
+    if not modules:
+        return None
+    tensors = {}
+    for module in modules:
+        for tensor in itertools.chain(module.parameters(), module.buffers()):
+            tensors[tensor.data_ptr()] = tensor.numel() * tensor.element_size()  # tied weights once
+    return sum(tensors.values()) / (1024 * 1024)
+
+def release_memory():
+    """Give memory freed by dropped models back to the system."""
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    if sys.platform.startswith("linux"):
+        try:
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        except (OSError, AttributeError):
+            pass  # not glibc
+
+
+class ResidentModel():
+    """A registered model; 'model' is None while it isn't loaded."""
+    def __init__(self, manager, name, loader):
+        self.manager = manager
+        self.name = name
+        self.loader = loader
+        self.model = None
+        self.size_mb = None  # known after the first load
+        self.users = 0       # threads inside use()
+        self.loads = 0
+        self.last_used = time.monotonic()
+        self._load_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    @contextmanager
+    def use(self):
+        """The loaded model, kept in memory until the block ends."""
+        model = self.manager._acquire(self)
+        try:
+            yield model
+        finally:
+            self.manager._release(self)
+
+    def load(self):
+        """Load now (to warm it up) without holding on to it."""
+        with self.use():
+            pass
+
+    def unload(self):
+        self.manager.unload(self)
+
+
+class ModelManager():
+    def __init__(self, budget_mb=MODEL_MEMORY_MB, idle_seconds=MODEL_IDLE_SECONDS):
+        self.budget_mb = budget_mb
+        self.idle_seconds = idle_seconds
+        self.models = []
+        self._lock = threading.Lock()
+        self._reaper = None
+
+    def register(self, name, loader):
+        """A handle for the model loader() returns; nothing is loaded yet."""
+        handle = ResidentModel(self, name, loader)
+        with self._lock:
+            self.models.append(handle)
+            if self.idle_seconds > 0 and self._reaper is None:
+                self._reaper = threading.Thread(target=self._reap, daemon=True)
+                self._reaper.start()
+        return handle
+
+    def unregister(self, handle):
+        """Forget a model for good (e.g. the OCR engine after switching language)."""
+        self.unload(handle)
+        with self._lock:
+            if handle in self.models:
+                self.models.remove(handle)
+
+    def resident_mb(self):
+        return sum(handle.size_mb or 0 for handle in self.models if handle.loaded)
+
+    ####################################################################
+    # Loading
+    ####################################################################
+    def _acquire(self, handle):
+        with self._lock:
+            handle.users += 1
+            handle.last_used = time.monotonic()
+        try:
+            with handle._load_lock:
+                if handle.model is None:
+                    self._make_room(handle.size_mb or 0)
+                    self._load(handle)
+                    self._make_room(0)  # now that its real size is known
+                return handle.model
+        except BaseException:
+            self._release(handle)
+            raise
+
+    def _release(self, handle):
+        with self._lock:
+            handle.users -= 1
+            handle.last_used = time.monotonic()
+
+    def _load(self, handle):
+        before = _rss_mb()
+        with timer("model_load"):
+            model = handle.loader()
+        size_mb = torch_size_mb(model)
+        if size_mb is None and before is not None:
+            size_mb = max(0.0, (_rss_mb() or before) - before)
+        handle.size_mb = size_mb
+        handle.loads += 1
+        handle.model = model
+
+    ####################################################################
+    # Unloading
+    ####################################################################
+    def _drop_and_release(self, handles, reason):
+        with self._lock:
+            # Checked again under the lock: a handle in use (users > 0) is never dropped
+            handles = [handle for handle in handles if handle.loaded and handle.users == 0]
+            models = [handle.model for handle in handles]
+            for handle in handles:
+                handle.model = None
+        if handles:
+            del models
+            release_memory()
+            names = ", ".join(handle.name for handle in handles)
+            mb = sum(handle.size_mb or 0 for handle in handles)
+            print(f"Unloaded {names} ({mb:.0f} MB, {reason})")
+
+    def _make_room(self, size_mb):
+        """Drop least recently used idle models until size_mb more fits the budget."""
+        if self.budget_mb <= 0:
+            return
+        with self._lock:
+            resident = self.resident_mb()
+            victims = []
+            for handle in sorted(self.models, key=lambda handle: handle.last_used):
+                if resident + size_mb <= self.budget_mb:
+                    break
+                if handle.loaded and handle.users == 0:
+                    victims.append(handle)
+                    resident -= handle.size_mb or 0
+        if victims:
+            self._drop_and_release(victims, f"over MODEL_MEMORY_MB={self.budget_mb:.0f}")
+
+    def unload(self, handle):
+        self._drop_and_release([handle], "released")
+
+    def unload_idle(self, idle_seconds=None):
+        """Drop every model unused for idle_seconds (default MODEL_IDLE_SECONDS)."""
+        idle_seconds = self.idle_seconds if idle_seconds is None else idle_seconds
+        now = time.monotonic()
+        with self._lock:
+            victims = [
+                handle for handle in self.models
+                if handle.loaded and handle.users == 0 and now - handle.last_used >= idle_seconds
+            ]
+        if victims:
+            self._drop_and_release(victims, f"idle for {idle_seconds:.0f}s")
+
+    def _reap(self):
+        while True:
+            time.sleep(min(max(self.idle_seconds / 4, 1.0), 30.0))
+            self.unload_idle()
+
+    def report(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                handle.name: {
+                    "loaded": handle.loaded,
+                    "mb": round(handle.size_mb, 1) if handle.size_mb is not None else None,
+                    "idle_s": round(now - handle.last_used, 1),
+                    "loads": handle.loads,
+                }
+                for handle in self.models
+            }
+
+
+# Shared by every model of the process
+MODELS = ModelManager()
@@ -0,0 +1,221 @@
+import os
+import math
+import time
+import queue
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import Future
+
+# Request coalescer in front of an OCREngine. Crops arrive one at a time from
+# many places (page jobs, re-OCR, freshly drawn boxes, chapter queue threads,
+# server requests); the batcher thread collects whatever arrives within a short
+# window, or until max_batch crops, and runs them as one predict_batch call.
+#
+# OCRBatcher has the same predict / predict_batch / engine_name / cleanup
+# surface as OCREngine, so callers don't change. A lone crop waits at most
+# window_ms before it runs.
+#
+# For token decoders (Japanese) a collected batch is split by crop shape before
+# it runs: generate() keeps stepping until the longest text in the batch is done,
+# so a tall 20-character column batched with three one-character SFX makes all
+# four pay for 20 decoder steps. Crops with a similar aspect ratio and area read
+# to similar lengths, and each such bucket learns how long its texts get, so its
+# max_length can be cut well below 300. Texts that hit the cut are redone at 300.
+# A max_length given by the caller is a hard limit: such crops are batched only
+# with crops of the same limit, and never redone past it.
+
+BATCH_WINDOW_MS = float(os.getenv("OCR_BATCH_WINDOW_MS", 5))
+MAX_BATCH = int(os.getenv("OCR_MAX_BATCH", 16))
+MAX_LENGTH = 300        # OCREngine's default, and the ceiling for every bucket
+MIN_SAMPLES = 8         # texts a bucket must have seen before it gets its own max_length
+LENGTH_HEADROOM = 1.25  # margin over the longest text seen in the bucket
+LENGTH_HISTORY = 64     # recent lengths kept per bucket
+MIN_GROUP = 4           # smallest run of crops split off into its own generate() call
+
+
+def bucket_key(crop):
+    """(aspect class, area class) of a crop: log2 steps of h/w and of sqrt(area)."""
+    h, w = crop.shape[:2]
+    h, w = max(h, 1), max(w, 1)
+    aspect = max(-3, min(3, round(math.log2(h / w))))
+    area = max(0, min(8, int(math.log2(math.sqrt(h * w)))))
+    return aspect, area
+
+
+class OCRBatcher():
+    def __init__(self, engine, window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH):
+        self.engine = engine
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.batches = 0  # predict_batch calls made, for stats
+        self.crops = 0    # crops OCR'd
+        self.retries = 0  # crops redone at MAX_LENGTH after hitting their bucket's limit
+        self.lengths = defaultdict(lambda: deque(maxlen=LENGTH_HISTORY))  # bucket -> token counts
+        self._queue = queue.Queue()
+        self._closed = False
+        self._submit_lock = threading.Lock()  # nothing is queued after close()'s sentinel
+        self._cleanup_engine = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def engine_name(self):
+        return self.engine.engine_name
+
+    @property
+    def model_path(self):
+        return self.engine.model_path
+
+    def submit(self, crop, max_length=None):
+        """Queue one crop, returns a Future resolving to its OCREngine.predict result."""
+        future = Future()
+        with self._submit_lock:
+            if self._closed:
+                raise RuntimeError("OCRBatcher is closed")
+            self._queue.put((crop, future, max_length))
+        return future
+
+    def submit_many(self, crops, max_length=None):
+        return [self.submit(crop, max_length) for crop in crops]
+
+    def predict(self, np_image):
+        return self.submit(np_image).result()
+
+    def predict_batch(self, np_images, max_length=None):
+        return [future.result() for future in self.submit_many(np_images, max_length)]
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._fail_queued()
+                if self._cleanup_engine:
+                    self.engine.cleanup()
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                try:
+                    # Drain what's already queued without waiting, then wait out the window
+                    timeout = deadline - time.monotonic()
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)  # finish this batch, stop on the next loop
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _fail_queued(self):
+        """Fail whatever is still queued behind the sentinel, so no caller waits forever."""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not None:
+                item[1].set_exception(RuntimeError("OCRBatcher is closed"))
+
+    def max_length_for(self, bucket):
+        """Decoder step limit for a bucket, MAX_LENGTH until it has enough history."""
+        seen = self.lengths.get(bucket)
+        if not seen or len(seen) < MIN_SAMPLES:
+            return MAX_LENGTH
+        return min(MAX_LENGTH, int(max(seen) * LENGTH_HEADROOM) + 8)
+
+    def expected_length(self, bucket):
+        seen = self.lengths.get(bucket)
+        if not seen or len(seen) < MIN_SAMPLES:
+            return None
+        return sum(seen) / len(seen)
+
+    def _groups(self, batch):
+        """
+        Split a batch into runs of similar expected length, shortest first.
+        A new group starts when lengths more than double, as long as the current
+        one has MIN_GROUP crops (splitting smaller ones costs more than it saves).
+        Crops from buckets without history form one group at MAX_LENGTH.
+        """
+        known, unknown = [], []
+        for crop, future, _ in batch:
+            bucket = bucket_key(crop)
+            expected = self.expected_length(bucket)
+            if expected is None:
+                unknown.append((crop, future, bucket))
+            else:
+                known.append((expected, crop, future, bucket))
+        known.sort(key=lambda item: item[0])
+        groups = []
+        current, start = [], None
+        for expected, crop, future, bucket in known:
+            if current and expected > 2 * start and len(current) >= MIN_GROUP:
+                groups.append(current)
+                current = []
+            if not current:
+                start = expected
+            current.append((crop, future, bucket))
+        if current:
+            groups.append(current)
+        if unknown:
+            groups.append(unknown)
+        return groups
+
+    def _run_batch(self, batch):
+        # Crops with a caller's max_length only run with crops of the same limit
+        by_limit = {}
+        for item in batch:
+            by_limit.setdefault(item[2], []).append(item)
+        for limit, items in by_limit.items():
+            if not hasattr(self.engine, "predict_batch_with_lengths"):
+                self._run_group([(crop, future, None) for crop, future, _ in items], limit)
+                continue
+            for group in self._groups(items):
+                self._run_group(group, limit)
+
+    def _run_group(self, group, limit=None):
+        crops = [crop for crop, _, _ in group]
+        buckets = [bucket for _, _, bucket in group]
+        ceiling = min(limit, MAX_LENGTH) if limit is not None else MAX_LENGTH
+        try:
+            if buckets[0] is None:
+                results = self.engine.predict_batch(crops) if limit is None else self.engine.predict_batch(crops, limit)
+            else:
+                max_length = min(ceiling, max(self.max_length_for(bucket) for bucket in buckets))
+                results, lengths = self.engine.predict_batch_with_lengths(crops, max_length)
+                if lengths is not None:
+                    # Cut off by the group's limit: redo those at the full length (or the caller's)
+                    cut = [i for i, n in enumerate(lengths) if n >= max_length < ceiling]
+                    if cut:
+                        redone, redone_lengths = self.engine.predict_batch_with_lengths(
+                            [crops[i] for i in cut], ceiling
+                        )
+                        for i, result, n in zip(cut, redone, redone_lengths or [None] * len(cut)):
+                            results[i] = result
+                            lengths[i] = n if n is not None else ceiling
+                        self.retries += len(cut)
+                    if limit is None:
+                        # Lengths under a caller's limit may be cut short, they'd shrink the bucket's
+                        for bucket, n in zip(buckets, lengths):
+                            self.lengths[bucket].append(n)
+        except Exception as e:
+            for _, future, _ in group:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.crops += len(group)
+        for (_, future, _), result in zip(group, results):
+            future.set_result(result)
+
+    def close(self):
+        """Stop taking crops; the ones already queued still run."""
+        with self._submit_lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(None)
+
+    def cleanup(self):
+        # The engine is released by the batcher thread once the queue is drained,
+        # so crops submitted before an engine switch still get their text
+        self._cleanup_engine = True
+        self.close()
@@ -0,0 +1,211 @@
+import os
+import time
+import queue
+import itertools
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from concurrent.futures import Future
+import numpy as np
+from boxRecords import crop_box
+
+# OCR service made of N worker processes, each owning its own OCREngine.
+# A page is copied once into shared memory; workers slice crops out of it
+# without copying, run OCREngine.predict_batch and send back only text.
+# Workers say which task they took before running it, so when one dies (say
+# OOM-killed) the page of the task it held fails right away instead of
+# waiting forever; the others keep serving the queue.
+
+
+def _attach(name):
+    """
+    Attach to a shared memory block owned (and unlinked) by the parent.
+    Spawned workers share the parent's resource tracker, so on older Pythons
+    the extra registration is harmless; newer ones can skip tracking entirely.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return shared_memory.SharedMemory(name=name)
+
+def _worker_main(worker, engine_name, task_queue, result_queue, torch_threads):
+    if torch_threads:
+        try:
+            import torch
+            torch.set_num_threads(torch_threads)
+        except ImportError:
+            pass
+    from OCRENGINE import OCREngine
+    engine = OCREngine(engine_name)
+    while True:
+        task = task_queue.get()
+        if task is None:
+            break
+        task_id, shm_name, shape, dtype, boxes = task
+        result_queue.put(("taken", worker, task_id, None, None))
+        try:
+            shm = _attach(shm_name)
+            try:
+                page = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+                crops = [crop_box(page, box) for box in boxes]
+                results = engine.predict_batch(crops)
+                del crops, page
+            finally:
+                shm.close()
+            result_queue.put(("done", worker, task_id, results, None))
+        except Exception as e:
+            result_queue.put(("done", worker, task_id, None, repr(e)))
+
+
+class _PageJob():
+    def __init__(self, future, shm, n_boxes, n_tasks):
+        self.future = future
+        self.shm = shm
+        self.results = [None] * n_boxes
+        self.remaining = n_tasks
+
+
+class OCRPool():
+    """
+    Multi-process OCR. submit_page returns a concurrent.futures.Future that
+    resolves to one result per box (same shape as OCREngine.predict), in order.
+    """
+    def __init__(self, engine_name, workers=None, chunk_size=8):
+        self.engine_name = engine_name
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.chunk_size = chunk_size
+        # Split the cores between workers so they don't oversubscribe each other
+        torch_threads = max(1, (os.cpu_count() or 1) // self.workers)
+
+        ctx = mp.get_context("spawn")
+        self._task_queue = ctx.Queue()
+        self._result_queue = ctx.Queue()
+        self._processes = [
+            ctx.Process(
+                target=_worker_main,
+                args=(worker, engine_name, self._task_queue, self._result_queue, torch_threads),
+                daemon=True,
+            )
+            for worker in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+        self._ids = itertools.count()
+        self._jobs = {}   # page job id -> _PageJob
+        self._tasks = {}  # task id -> (page job id, first box index)
+        self._held = {}   # worker index -> task id it is running
+        self._lock = threading.Lock()
+        self._closed = False
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def submit_page(self, page, boxes):
+        """
+        page: NumPy image (H, W[, C]); boxes: [(x, y, w, h), ...] in page pixels.
+        """
+        future = Future()
+        boxes = [tuple(int(v) for v in box) for box in boxes]
+        if not boxes:
+            future.set_result([])
+            return future
+        if self._closed:
+            raise RuntimeError("OCRPool is shut down")
+
+        page = np.ascontiguousarray(page)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, page.nbytes))
+        np.ndarray(page.shape, dtype=page.dtype, buffer=shm.buf)[...] = page
+
+        chunks = [boxes[i:i + self.chunk_size] for i in range(0, len(boxes), self.chunk_size)]
+        job_id = next(self._ids)
+        with self._lock:
+            self._jobs[job_id] = _PageJob(future, shm, len(boxes), len(chunks))
+            for n, chunk in enumerate(chunks):
+                task_id = next(self._ids)
+                self._tasks[task_id] = (job_id, n * self.chunk_size)
+                self._task_queue.put((task_id, shm.name, page.shape, page.dtype.str, chunk))
+        return future
+
+    def busy(self):
+        """True while a submitted page hasn't come back."""
+        with self._lock:
+            return bool(self._jobs)
+
+    def _finish(self, job_id, error=None):
+        job = self._jobs.pop(job_id)
+        job.shm.close()
+        job.shm.unlink()
+        if error is not None:
+            job.future.set_exception(RuntimeError(error))
+        else:
+            job.future.set_result(job.results)
+
+    def _collect(self):
+        next_check = time.monotonic()
+        while True:
+            try:
+                message = self._result_queue.get(timeout=1.0)
+            except queue.Empty:
+                message = False
+            if time.monotonic() >= next_check:
+                # Also while other workers keep the queue busy
+                next_check = time.monotonic() + 1.0
+                self._fail_dead_workers()
+            if message is False:
+                if self._closed:
+                    return
+                if not any(p.is_alive() for p in self._processes):
+                    self._fail_all("All OCR workers exited")
+                    return
+                continue
+            if message is None:
+                return
+            kind, worker, task_id, results, error = message
+            with self._lock:
+                if kind == "taken":
+                    self._held[worker] = task_id
+                    continue
+                self._held.pop(worker, None)
+                job_id, start = self._tasks.pop(task_id, (None, 0))
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                if error is not None:
+                    self._finish(job_id, error)
+                    continue
+                job.results[start:start + len(results)] = results
+                job.remaining -= 1
+                if job.remaining == 0:
+                    self._finish(job_id)
+
+    def _fail_dead_workers(self):
+        """Fail the page of every task held by a worker that exited."""
+        with self._lock:
+            for worker, process in enumerate(self._processes):
+                if process.is_alive() or worker not in self._held:
+                    continue
+                task_id = self._held.pop(worker)
+                job_id, _ = self._tasks.pop(task_id, (None, 0))
+                if job_id in self._jobs:
+                    print(f"OCR worker {worker} exited (code {process.exitcode}) during a page")
+                    self._finish(job_id, f"OCR worker exited with code {process.exitcode}")
+
+    def _fail_all(self, error):
+        with self._lock:
+            for job_id in list(self._jobs):
+                self._finish(job_id, error)
+            self._tasks.clear()
+
+    def shutdown(self):
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._processes:
+            self._task_queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._result_queue.put(None)
+        self._collector.join(timeout=5)
+        self._fail_all("OCRPool shut down")
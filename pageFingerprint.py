@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from PIL import Image
+from metrics import timer
+from boxRecords import PageBoxes, as_record, crop_box
+from annotationStore import AnnotationStore, replacing
+
+# Repeated pages (credits, recruitment banners, a scan that appears twice)
+# recognised by perceptual hashes, so a batch run copies the boxes of the first
+# processed copy instead of detecting and OCR'ing the page again.
+#
+#   index = PageIndex()                                   # shared by all chapters
+#   copy = index.processed_copy(file_path, models, annotations)
+#   if copy is not None:
+#       source, file_data, source_models = copy           # boxes of an identical page
+#   ...
+#   index.add_processed(file_path, models)                # once its annotations are written
+#
+# A fingerprint is the page size plus a 64-bit dHash (brightness steps between
+# neighbours of a 9x8 thumbnail) and a 64-bit pHash (signs of the lowest 8x8 DCT
+# terms of a 32x32 thumbnail), taken from a reduced grayscale decode (JPEG
+# draft mode decodes at 1/8 scale). Two pages match when they have the same
+# size and both hashes are within a few bits: re-encoding and scan noise pass,
+# a different page with the same panel layout doesn't. A page with the same art
+# and other text in a bubble hashes the same, though, so before a match is used
+# the source's boxes are compared pixel by pixel in both images: any box with
+# more than PAGE_DEDUP_BOX_CHANGED of its pixels changed by more than
+# INK_DIFFERENCE grey levels (new ink, not noise) rejects it.
+#
+# Fingerprints are stored per file (path + mtime + size) in PAGE_FINGERPRINT_INDEX,
+# so each image is decoded for this once, and the index is shared by every
+# chapter: a banner processed in chapter 3 is reused in chapter 40. A page is
+# only reused when it was processed with the same detection/OCR/ordering models,
+# and its boxes are read from its chapter's annotations when needed, so hand
+# corrections made there carry over. The window and a chapterScheduler run may
+# share the index: save() writes through its own temp file and merges the
+# pages another process saved in the meantime (ours win for pages we changed).
+
+DHASH_DISTANCE = int(os.getenv("PAGE_DEDUP_DHASH", 4))  # max differing bits out of 64
+PHASH_DISTANCE = int(os.getenv("PAGE_DEDUP_PHASH", 6))
+BOX_CHANGED = float(os.getenv("PAGE_DEDUP_BOX_CHANGED", 0.001))  # fraction of a box's pixels
+INK_DIFFERENCE = 64
+INDEX_PATH = os.getenv(
+    "PAGE_FINGERPRINT_INDEX",
+    os.path.join(os.path.expanduser("~"), ".cache", "setsu", "page_fingerprints.json"),
+)
+SAVE_INTERVAL = 5.0  # s between automatic saves while pages are being added
+REUSED_STAGES = ("detected", "ocr", "arranged")
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    m[0] /= np.sqrt(2)
+    return m
+
+_DCT32 = _dct_matrix(32)
+
+def _bits_to_int(bits):
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+def fingerprint(path):
+    """(width, height, dhash, phash) of an image file."""
+    with timer("page_fingerprint"):
+        with Image.open(path) as img:
+            width, height = img.size
+            img.draft("L", (64, 64))
+            gray = img.convert("L")
+        tiny = np.asarray(gray.resize((9, 8), Image.Resampling.BOX), dtype=np.float32)
+        small = np.asarray(gray.resize((32, 32), Image.Resampling.BOX), dtype=np.float32)
+    dhash = _bits_to_int(tiny[:, 1:] > tiny[:, :-1])
+    low = (_DCT32 @ small @ _DCT32.T)[:8, :8].ravel()
+    phash = _bits_to_int(low > np.median(low[1:]))
+    return width, height, dhash, phash
+
+def _signature(path):
+    st = os.stat(path)
+    return [st.st_mtime_ns, st.st_size]
+
+def same_boxes(path, source_path, file_data):
+    """True if every box of file_data (boxes of source_path) shows the same thing in path."""
+    with timer("page_dedup_verify"):
+        with Image.open(path) as img:
+            page = np.asarray(img.convert("L"), dtype=np.int16)
+        with Image.open(source_path) as img:
+            source = np.asarray(img.convert("L"), dtype=np.int16)
+        if page.shape != source.shape:
+            return False
+        for box in file_data:
+            changed = np.abs(crop_box(page, box["coords"]) - crop_box(source, box["coords"])) > INK_DIFFERENCE
+            if changed.size and changed.mean() > BOX_CHANGED:
+                return False
+    return True
+
+def copy_boxes(file_data, box_ids):
+    """Boxes of another page with new ids, text (and what it was read with) included."""
+    copies = PageBoxes()
+    for box_id, box in zip(box_ids, file_data):
+        record = as_record(box).copy()
+        record.id = box_id
+        copies.append(record)
+    return copies
+
+
+class PageIndex():
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        # abspath -> {"key": path as used in annotations, "signature": [mtime_ns, size],
+        #             "size": [w, h], "dhash": hex, "phash": hex, "models": {stage: version}}
+        self.pages = {}
+        self._by_size = {}  # (w, h) -> {abspath, ...}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._changed = set()  # abspaths set or updated since the last save
+        self._saved_at = time.monotonic()
+        self.load()
+
+    def _read_pages(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("pages", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _set_pages(self, pages):
+        # Called with self._lock held
+        self.pages = pages
+        self._by_size = {}
+        for name, entry in pages.items():
+            self._by_size.setdefault(tuple(entry["size"]), set()).add(name)
+
+    def load(self):
+        pages = self._read_pages()
+        with self._lock:
+            self._set_pages(pages)
+            self._changed.clear()
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            # Pages another process saved since we read the file are kept
+            pages = dict(self.pages)
+            pages.update(self._read_pages())
+            pages.update((name, self.pages[name]) for name in self._changed if name in self.pages)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with replacing(self.path, "w", encoding="utf-8") as f:
+                json.dump({"version": 1, "pages": pages}, f, ensure_ascii=False)
+            self._set_pages(pages)
+            self._changed.clear()
+            self._dirty = False
+            self._saved_at = time.monotonic()
+
+    def _entry(self, path):
+        """Fingerprint entry of 'path', (re)computed if the file is new or changed."""
+        name = os.path.abspath(path)
+        signature = _signature(path)
+        with self._lock:
+            entry = self.pages.get(name)
+            if entry is not None and entry["signature"] == signature:
+                return name, entry
+        width, height, dhash, phash = fingerprint(path)
+        entry = {"key": path, "signature": signature, "size": [width, height],
+                 "dhash": f"{dhash:016x}", "phash": f"{phash:016x}"}
+        with self._lock:
+            old = self.pages.get(name)
+            if old is not None:
+                self._by_size.get(tuple(old["size"]), set()).discard(name)
+            self.pages[name] = entry
+            self._by_size.setdefault((width, height), set()).add(name)
+            self._changed.add(name)
+            self._dirty = True
+        return name, entry
+
+    def find(self, path, models=None):
+        """
+        Entries of the other pages that look like 'path' (and, with 'models',
+        were processed with the same detection/OCR/ordering models), closest first.
+        """
+        name, entry = self._entry(path)
+        dhash, phash = int(entry["dhash"], 16), int(entry["phash"], 16)
+        matches = []
+        with self._lock:
+            candidates = [(other, self.pages[other]) for other in self._by_size.get(tuple(entry["size"]), ())]
+        for other, candidate in candidates:
+            if other == name:
+                continue
+            if models is not None:
+                done = candidate.get("models") or {}
+                if any(done.get(stage) != models.get(stage) for stage in REUSED_STAGES if stage in models):
+                    continue
+            d = (int(candidate["dhash"], 16) ^ dhash).bit_count()
+            if d > DHASH_DISTANCE:
+                continue
+            p = (int(candidate["phash"], 16) ^ phash).bit_count()
+            if p > PHASH_DISTANCE:
+                continue
+            matches.append((d + p, candidate["key"], candidate))
+        return [candidate for _, _, candidate in sorted(matches, key=lambda match: match[:2])]
+
+    def processed_copy(self, path, models, annotations):
+        """
+        (source path, its boxes, its models) for an already processed page that
+        looks the same as 'path', or None. 'annotations' is the AnnotationStore
+        of path's chapter, whose unsaved pages are the freshest.
+        """
+        for source in self.find(path, models):
+            key = source["key"]
+            try:
+                if _signature(key) != source["signature"]:
+                    continue  # changed since it was processed
+            except OSError:
+                continue
+            same_chapter = os.path.abspath(os.path.dirname(key)) == os.path.abspath(annotations.directory)
+            store = annotations if same_chapter else AnnotationStore(os.path.dirname(key), read_only=True)
+            file_data = store.get(key)
+            # An empty page (cleared since) has nothing to copy
+            if file_data and same_boxes(path, key, file_data):
+                return key, file_data, source["models"]
+        return None
+
+    def add_processed(self, path, models):
+        """Offer a page whose annotations are written as a source for its duplicates."""
+        name, entry = self._entry(path)
+        with self._lock:
+            entry["models"] = dict(models)
+            self._changed.add(name)
+            self._dirty = True
+            due = time.monotonic() - self._saved_at > SAVE_INTERVAL
+        if due:
+            self.save()
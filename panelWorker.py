@@ -1,6 +1,9 @@
 # There is Error in Normalize coords or Is Inside
+from cacheUtils import stable_hash, file_signature
+from metrics import timed
 
 SIZE = 1024
+ORDER_QUANT_STEP = 4  # px, boxes nudged by less than this keep their cached order
 
 def normalize_coords(coords, img_w=1024, img_h=1024):
     """Convert absolute coordinates to YOLO format (normalized x_center,y_center, width, height)"""
@@ -42,6 +45,7 @@ def ai_sort_bubble(model,bubbles): # L to R
     order_mapping = {idx: seq_idx for seq_idx, idx in enumerate(sequence)}
     return sorted(bubbles, key= lambda x: order_mapping[bubbles.index(x)]) 
 
+@timed("organize_bubbles")
 def organize_bubbles(file_data, yolo_panels, model, image_size):
     
     def is_inside( id, bubble_coords, panel_coords, image_size):
@@ -99,4 +103,34 @@ def organize_bubbles(file_data, yolo_panels, model, image_size):
     for panel in sorted_panels:
         sorted_bubbles.extend(panel["lines"])
     
-    return sorted_bubbles
\ No newline at end of file
+    return sorted_bubbles
+
+def quantize_coords(coords, step=ORDER_QUANT_STEP):
+    return tuple(int(round(c / step)) for c in coords)
+
+def order_cache_key(page_path, file_data, checkpoint, direction, step=ORDER_QUANT_STEP):
+    """
+    Stable key for a page's reading order: (page file, quantized box coords,
+    model checkpoint, direction). Text and box ids are left out on purpose so
+    editing lines or re-arranging an already arranged page hits the cache.
+    """
+    boxes = sorted(quantize_coords(b["coords"], step) for b in file_data)
+    return stable_hash([file_signature(page_path), boxes, checkpoint, direction])
+
+def apply_cached_order(file_data, ordered_coords, step=ORDER_QUANT_STEP):
+    """
+    Reorder file_data following a memoized list of quantized coords.
+    Returns None if the boxes don't match the cached entry.
+    """
+    by_coords = {}
+    for bubble in file_data:
+        by_coords.setdefault(quantize_coords(bubble["coords"], step), []).append(bubble)
+    ordered = []
+    for coords in ordered_coords:
+        bucket = by_coords.get(tuple(coords))
+        if not bucket:
+            return None
+        ordered.append(bucket.pop(0))
+    if len(ordered) != len(file_data):
+        return None
+    return ordered
@@ -0,0 +1,179 @@
+import os
+import json
+from json.decoder import scanstring
+from boxRecords import BoxRecord, max_box_id
+
+# How annotation pages are encoded on disk, with the fastest library installed.
+#
+#   codec = get_codec()               # from ANNOTATIONS_FORMAT and what's importable
+#   data = codec.dumps(file_data)     # bytes of one page
+#   file_data = codec.loads(data)     # list of box dicts
+#
+# AnnotationStore writes the pages one after the other between codec.begin()
+# and codec.end(), each preceded by codec.key(), and reads them back one at a
+# time from their byte spans, so a codec only has to encode a single page.
+#
+#   json     annotations.json, compact (one page per line) through orjson or
+#            msgspec when installed, json.dump(indent=4) otherwise
+#   pretty   annotations.json exactly as older versions wrote it (json module)
+#   msgpack  annotations.msgpack, a msgpack map with the same schema; this is
+#            what gets saved, annotations.json is only written by
+#            AnnotationStore.export_json() (Save button, closing the window, end
+#            of a chapter run) for the tools that read it
+#
+# Every JSON codec reads every JSON layout, so switching is always safe.
+
+ANNOTATIONS_FORMAT = os.getenv("ANNOTATIONS_FORMAT", "json")  # json, pretty or msgpack
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+def _encode_hook(obj):
+    # BoxRecords, and PageBoxes for the libraries that only take exact lists
+    if isinstance(obj, BoxRecord):
+        return obj.to_json()
+    if isinstance(obj, (list, tuple)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not serializable")
+
+def _skip_whitespace(text, i):
+    while i < len(text) and text[i] in " \t\r\n":
+        i += 1
+    return i
+
+
+class JsonCodec():
+    """annotations.json, pages as the json module writes them with indent=4."""
+    name = "json"
+    file_name = "annotations.json"
+    index_name = "annotations.index.json"
+    layout = "indent4"
+    is_json = True
+
+    def dumps(self, file_data):
+        # Exactly what json.dump(annotations, indent=4) writes under the page's key
+        text = json.dumps(file_data, indent=4, ensure_ascii=False, default=_encode_hook)
+        return text.replace("\n", "\n    ").encode("utf-8")
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def begin(self, count):
+        return b"{"
+
+    def key(self, key, first):
+        return ("\n    " if first else ",\n    ").encode("utf-8") + self.dumps(key) + b": "
+
+    def end(self, count):
+        return b"\n}" if count else b"}"
+
+    def scan(self, f):
+        """[key, offset, length, max id] of every page of an annotations.json without an index."""
+        text = f.read().decode("utf-8")
+        decoder = json.JSONDecoder()
+        entries = []
+        i = _skip_whitespace(text, 0)
+        if text[i:i + 1] != "{":
+            raise ValueError(f"{f.name}: expected an object of pages")
+        i = _skip_whitespace(text, i + 1)
+        # Offsets are in bytes; walk the text once, converting as we go
+        char_pos, byte_pos = 0, 0
+        while text[i:i + 1] != "}":
+            if text[i:i + 1] != '"':
+                raise ValueError(f"{f.name}: bad page key at {i}")
+            key, i = scanstring(text, i + 1)
+            i = _skip_whitespace(text, i)
+            if text[i:i + 1] != ":":
+                raise ValueError(f"{f.name}: expected ':' at {i}")
+            start = _skip_whitespace(text, i + 1)
+            file_data, end = decoder.raw_decode(text, start)
+            byte_pos += len(text[char_pos:start].encode("utf-8"))
+            length = len(text[start:end].encode("utf-8"))
+            entries.append([key, byte_pos, length, max_box_id(file_data)])
+            char_pos, byte_pos = end, byte_pos + length
+            i = _skip_whitespace(text, end)
+            if text[i:i + 1] == ",":
+                i = _skip_whitespace(text, i + 1)
+            elif text[i:i + 1] != "}":
+                raise ValueError(f"{f.name}: expected ',' or '}}' at {i}")
+        return entries
+
+
+class CompactJsonCodec(JsonCodec):
+    """annotations.json with one compact page per line, through orjson or msgspec."""
+    layout = "compact"
+
+    def __init__(self):
+        if orjson is not None:
+            self.name = "orjson"
+            self._dumps = lambda obj: orjson.dumps(obj, default=_encode_hook)
+            self.loads = orjson.loads
+        else:
+            self.name = "msgspec"
+            self._dumps = msgspec.json.Encoder(enc_hook=_encode_hook).encode
+            self.loads = msgspec.json.Decoder().decode
+
+    def dumps(self, file_data):
+        return self._dumps(file_data)
+
+    def key(self, key, first):
+        return (b"\n" if first else b",\n") + self.dumps(key) + b":"
+
+
+class MsgpackCodec():
+    """annotations.msgpack: a map of page path -> list of box maps."""
+    name = "msgpack"
+    file_name = "annotations.msgpack"
+    index_name = "annotations.msgpack.index.json"
+    layout = "msgpack"
+    is_json = False
+
+    def dumps(self, file_data):
+        return msgpack.packb(file_data, default=_encode_hook, use_bin_type=True)
+
+    def loads(self, data):
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    def begin(self, count):
+        return msgpack.Packer().pack_map_header(count)
+
+    def key(self, key, first):
+        return self.dumps(key)
+
+    def end(self, count):
+        return b""
+
+    def scan(self, f):
+        unpacker = msgpack.Unpacker(f, raw=False, strict_map_key=False)
+        entries = []
+        for _ in range(unpacker.read_map_header()):
+            key = unpacker.unpack()
+            start = unpacker.tell()
+            file_data = unpacker.unpack()
+            entries.append([key, start, unpacker.tell() - start, max_box_id(file_data)])
+        return entries
+
+
+def json_codec(pretty=False):
+    """The fastest JSON codec installed (pretty: the indent=4 layout, json module)."""
+    if pretty or (orjson is None and msgspec is None):
+        return JsonCodec()
+    return CompactJsonCodec()
+
+def get_codec(name=ANNOTATIONS_FORMAT):
+    if name == "msgpack":
+        if msgpack is not None:
+            return MsgpackCodec()
+        print("ANNOTATIONS_FORMAT=msgpack but msgpack isn't installed, using JSON")
+    return json_codec(pretty=(name == "pretty"))
@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+# Uniform grid over box rectangles in original image coordinates, for mouse
+# hit-tests and rubber band selection on pages with hundreds of boxes.
+#
+#   index = SpatialIndex()
+#   index.build(bounding_boxes)        # [{"id", "coords": (x, y, w, h)}, ...]
+#   index.at(x, y)                     # topmost box under a point, or None
+#   index.query(x, y, w, h)            # ids of boxes touching a rectangle
+#
+# A box is registered in every cell it overlaps, so a point lookup only looks
+# at the handful of boxes sharing its cell. Each box keeps its rank (position
+# in the list it was built from); later boxes are drawn on top and win ties,
+# like the old reversed() scan. Removing a box keeps the others' ranks in order,
+# so append/remove are incremental; anything that reorders needs a build().
+
+CELL_SIZE = 128  # px in original coordinates, about one speech bubble
+
+
+class SpatialIndex():
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = defaultdict(list)  # (cx, cy) -> [box_id, ...]
+        self._boxes = {}                 # box_id -> (x, y, w, h, rank)
+        self._next_rank = 0
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __contains__(self, box_id):
+        return box_id in self._boxes
+
+    def _cell_range(self, x, y, w, h):
+        c = self.cell_size
+        x0, y0 = int(x // c), int(y // c)
+        x1, y1 = int((x + max(w, 1) - 1) // c), int((y + max(h, 1) - 1) // c)
+        return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+
+    def build(self, boxes):
+        self._cells.clear()
+        self._boxes.clear()
+        self._next_rank = 0
+        for box_dict in boxes:
+            self.insert(box_dict["id"], box_dict["coords"])
+
+    def insert(self, box_id, coords):
+        """Add a box on top of all the others."""
+        if box_id in self._boxes:
+            self.remove(box_id)
+        x, y, w, h = coords
+        self._boxes[box_id] = (x, y, w, h, self._next_rank)
+        self._next_rank += 1
+        for cell in self._cell_range(x, y, w, h):
+            self._cells[cell].append(box_id)
+
+    def remove(self, box_id):
+        entry = self._boxes.pop(box_id, None)
+        if entry is None:
+            return
+        x, y, w, h, _ = entry
+        for cell in self._cell_range(x, y, w, h):
+            members = self._cells.get(cell)
+            if members is not None:
+                members.remove(box_id)
+                if not members:
+                    del self._cells[cell]
+
+    def coords(self, box_id):
+        entry = self._boxes.get(box_id)
+        return entry[:4] if entry is not None else None
+
+    def at(self, px, py):
+        """Topmost box containing the point, or None."""
+        c = self.cell_size
+        best, best_rank = None, -1
+        for box_id in self._cells.get((int(px // c), int(py // c)), ()):
+            x, y, w, h, rank = self._boxes[box_id]
+            if rank > best_rank and x <= px < x + w and y <= py < y + h:
+                best, best_rank = box_id, rank
+        return best
+
+    def query(self, x, y, w, h, contained=False):
+        """
+        Ids of the boxes overlapping the rectangle (or lying fully inside it
+        with contained=True), bottom to top.
+        """
+        found, seen = {}, set()
+        for cell in self._cell_range(x, y, w, h):
+            for box_id in self._cells.get(cell, ()):
+                if box_id in seen:
+                    continue
+                seen.add(box_id)
+                bx, by, bw, bh, rank = self._boxes[box_id]
+                if contained:
+                    hit = bx >= x and by >= y and bx + bw <= x + w and by + bh <= y + h
+                else:
+                    hit = bx < x + w and x < bx + bw and by < y + h and y < by + bh
+                if hit:
+                    found[box_id] = rank
+        return sorted(found, key=found.get)
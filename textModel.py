@@ -0,0 +1,271 @@
+from PyQt6.QtCore import Qt, QObject, QModelIndex, QAbstractListModel, pyqtSignal
+from boxRecords import as_record
+
+# The two text panes (OCR lines and user/translated lines) as views over one
+# list of box records:
+#
+#   store = PageTextStore()
+#   ocr_view.setModel(store.lines_model)
+#   user_view.setModel(store.user_model)
+#   store.set_records(file_data)    # BoxRecords (or {"id", "coords", "lines", "user_lines"} dicts)
+#
+# Every line is a row. Changes go through the store, which updates the records
+# and tells both models exactly which rows moved, appeared, disappeared or
+# changed, so views keep their selection and only repaint the affected rows.
+# Editing a row in a view writes straight into the record.
+#
+# Dragging in the OCR pane moves the whole box (that is how boxes are
+# reordered by hand); dragging in the user pane reorders lines within a box.
+#
+# Each model keeps box id -> (first row, row count) and the store keeps
+# box id -> record / position, rebuilt when rows are added, removed or moved.
+# Finding a box's rows (translation results, selection sync between the panes,
+# clicks on the image) is a dict lookup, not a walk over all rows.
+
+
+class BoxTextModel(QAbstractListModel):
+    """Rows are the 'field' lines ("lines" or "user_lines") of the store's records, in box order."""
+    def __init__(self, store, field, moves_boxes=False):
+        super().__init__(store)
+        self.store = store
+        self.field = field
+        self.moves_boxes = moves_boxes
+        self._rows = []   # row -> (record, line index)
+        self._spans = {}  # box_id -> (first row, row count)
+
+    def _rebuild(self):
+        self._rows = []
+        self._spans = {}
+        for record in self.store.records:
+            self._append_record(record)
+
+    def _append_record(self, record):
+        n = len(getattr(record, self.field))
+        self._spans[record.id] = (len(self._rows), n)
+        self._rows.extend((record, i) for i in range(n))
+
+    def box_rows(self, box_id):
+        """(first row, row count) of a box; first is where its rows would go if it has none."""
+        return self._spans.get(box_id, (len(self._rows), 0))
+
+    def _insert_row(self, position):
+        """Row where lines of the box at 'position' (in store.records) start."""
+        records = self.store.records
+        if position >= len(records):
+            return len(self._rows)
+        return self._spans[records[position].id][0]
+
+    def box_id_at(self, row):
+        return self._rows[row][0].id
+
+    # Qt model interface
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        record, i = self._rows[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            line = getattr(record, self.field)[i]
+            return "" if line is None else str(line)
+        if role == Qt.ItemDataRole.UserRole:
+            return record.id
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not index.isValid():
+            return False
+        record, i = self._rows[index.row()]
+        getattr(record, self.field)[i] = value
+        self.dataChanged.emit(index, index, [Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole])
+        self.store.edited.emit(record.id, self.field)
+        return True
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.ItemIsDropEnabled
+        return (Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+                | Qt.ItemFlag.ItemIsEditable | Qt.ItemFlag.ItemIsDragEnabled)
+
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    def moveRows(self, sourceParent, sourceRow, count, destinationParent, destinationChild):
+        # QListView's internal move calls this once per dragged row
+        if count != 1 or not (0 <= sourceRow < len(self._rows)):
+            return False
+        record, line = self._rows[sourceRow]
+        box_id = record.id
+        if self.moves_boxes:
+            if destinationChild >= len(self._rows):
+                position = len(self.store.records)
+            else:
+                position = self.store.position(self.box_id_at(destinationChild))
+            return self.store.move_box(box_id, position)
+        first, n = self.box_rows(box_id)
+        to_line = min(max(destinationChild - first, 0), n)
+        return self.store.move_line(self.field, box_id, line, to_line)
+
+
+class PageTextStore(QObject):
+    edited = pyqtSignal(int, str)  # box_id, field: a line was edited in a view
+    boxes_moved = pyqtSignal()     # box order changed by a drag in the OCR pane
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.records = []
+        self._by_id = {}      # box_id -> record
+        self._positions = {}  # box_id -> index in records
+        self.lines_model = BoxTextModel(self, "lines", moves_boxes=True)
+        self.user_model = BoxTextModel(self, "user_lines")
+        self.models = (self.lines_model, self.user_model)
+
+    def box(self, box_id):
+        return self._by_id.get(box_id)
+
+    def position(self, box_id):
+        return self._positions.get(box_id, len(self.records))
+
+    def _rebuild(self):
+        self._by_id = {record.id: record for record in self.records}
+        self._positions = {record.id: i for i, record in enumerate(self.records)}
+        for model in self.models:
+            model._rebuild()
+
+    @staticmethod
+    def _record(box_info):
+        # The store keeps its own lists, box_info can be changed freely afterwards
+        return as_record(box_info).copy()
+
+    def set_records(self, file_data):
+        """Show a new page (models are reset)."""
+        for model in self.models:
+            model.beginResetModel()
+        self.records = [self._record(box_info) for box_info in file_data]
+        self._rebuild()
+        for model in self.models:
+            model.endResetModel()
+
+    def clear(self):
+        self.set_records([])
+
+    def append_box(self, box_info):
+        record = self._record(box_info)
+        inserting = []
+        for model in self.models:
+            n = len(record[model.field])
+            if n:
+                model.beginInsertRows(QModelIndex(), model.rowCount(), model.rowCount() + n - 1)
+                inserting.append(model)
+        # Appending only adds to the indexes, nothing before it moves
+        self._by_id[record.id] = record
+        self._positions[record.id] = len(self.records)
+        self.records.append(record)
+        for model in self.models:
+            model._append_record(record)
+        for model in inserting:
+            model.endInsertRows()
+
+    def remove_box(self, box_id):
+        if box_id not in self._by_id:
+            return
+        removing = []
+        for model in self.models:
+            first, n = model.box_rows(box_id)
+            if n:
+                model.beginRemoveRows(QModelIndex(), first, first + n - 1)
+                removing.append(model)
+        self.records = [record for record in self.records if record.id != box_id]
+        self._rebuild()
+        for model in removing:
+            model.endRemoveRows()
+
+    def update_box(self, box_id, **fields):
+        """
+        Replace a box's "lines" and/or "user_lines". Rows that still exist get a
+        dataChanged, extra ones are inserted or removed at the end of the box.
+        """
+        record = self._by_id.get(box_id)
+        if record is None:
+            return
+        for model in self.models:
+            if model.field not in fields:
+                continue
+            new_lines = list(fields[model.field])
+            old_lines = getattr(record, model.field)
+            first, old_n = model.box_rows(box_id)
+            new_n = len(new_lines)
+            # Rows are added/dropped at the end of the box first, the rest is a plain data change
+            if new_n > old_n:
+                model.beginInsertRows(QModelIndex(), first + old_n, first + new_n - 1)
+                setattr(record, model.field, old_lines + new_lines[old_n:])
+                model._rebuild()
+                model.endInsertRows()
+            elif new_n < old_n:
+                model.beginRemoveRows(QModelIndex(), first + new_n, first + old_n - 1)
+                setattr(record, model.field, old_lines[:new_n])
+                model._rebuild()
+                model.endRemoveRows()
+            setattr(record, model.field, new_lines)
+            if min(old_n, new_n):
+                model.dataChanged.emit(model.index(first), model.index(first + min(old_n, new_n) - 1))
+
+    def move_box(self, box_id, position):
+        """Move a box (all its rows in both panes) before the box now at 'position'."""
+        old = self.position(box_id)
+        if old >= len(self.records) or position in (old, old + 1):
+            return False
+        moving = []
+        for model in self.models:
+            first, n = model.box_rows(box_id)
+            if n:
+                destination = model._insert_row(position)
+                if model.beginMoveRows(QModelIndex(), first, first + n - 1, QModelIndex(), destination):
+                    moving.append(model)
+        record = self.records.pop(old)
+        self.records.insert(position - 1 if position > old else position, record)
+        self._rebuild()
+        for model in moving:
+            model.endMoveRows()
+        self.boxes_moved.emit()
+        return True
+
+    def move_line(self, field, box_id, line, to_line):
+        """Move one line of a box before its line 'to_line' (same box)."""
+        if to_line in (line, line + 1):
+            return False
+        model = self.lines_model if field == "lines" else self.user_model
+        first, _ = model.box_rows(box_id)
+        if not model.beginMoveRows(QModelIndex(), first + line, first + line, QModelIndex(), first + to_line):
+            return False
+        lines = getattr(self._by_id[box_id], field)
+        lines.insert(to_line - 1 if to_line > line else to_line, lines.pop(line))
+        model._rebuild()
+        model.endMoveRows()
+        return True
+
+    def reorder(self, box_ids):
+        """
+        Put the boxes in the order of box_ids (unknown ids are skipped, boxes
+        not listed keep their relative order at the end). Views keep their selection.
+        """
+        position = {box_id: i for i, box_id in enumerate(box_ids)}
+        ordered = sorted(self.records, key=lambda record: position.get(record.id, len(position)))
+        if [r.id for r in ordered] == [r.id for r in self.records]:
+            return
+        for model in self.models:
+            model.layoutAboutToBeChanged.emit()
+        saved = []
+        for model in self.models:
+            persistent = model.persistentIndexList()
+            saved.append((persistent, [model._rows[index.row()] for index in persistent]))
+        self.records = ordered
+        self._rebuild()
+        for model, (persistent, rows) in zip(self.models, saved):
+            row_of = {(id(record), i): row for row, (record, i) in enumerate(model._rows)}
+            model.changePersistentIndexList(
+                persistent, [model.index(row_of[(id(record), i)]) for record, i in rows]
+            )
+        for model in self.models:
+            model.layoutChanged.emit()
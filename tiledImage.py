@@ -0,0 +1,145 @@
+import os
+from collections import OrderedDict
+from PyQt6.QtCore import Qt, QRect, QRectF, QSize
+from PyQt6.QtGui import QImage, QImageReader, QPainter, QPixmap
+from metrics import timer
+
+# Page images for ImageLabel, drawn in tiles so very tall pages (webtoon
+# strips) can be shown at a readable zoom.
+#
+#   page = TiledPage("ch1/01.png")           # reads the size from the header only
+#   page.draw(painter, dirty_rect, scale)    # renders/caches the tiles under dirty_rect
+#
+# The display is cut into TILE_SIZE squares at the current zoom. A tile is
+# rendered from the decoded page the first time it is painted and kept in a
+# TileCache bounded by TILE_CACHE_MB, so a 800x40000 strip never becomes one
+# giant (or one giant scaled) pixmap. The page itself is decoded once, on the
+# first paint: PNG and JPEG can't be decoded by region without reading
+# everything above it, so re-decoding per tile would cost more than it saves.
+#
+# Tile (tx, ty) at zoom s covers display pixels [tx*T, (tx+1)*T) and is drawn
+# from the source rect x/s .. (x+T)/s, so neighbouring tiles meet exactly and
+# display <-> original coordinates stay x_display = int(x_original * s), as in
+# ImageLabel._to_display_rect.
+
+TILE_SIZE = 512
+TILE_CACHE_MB = int(os.getenv("TILE_CACHE_MB", 192))
+# Larger than Qt's default 256 MB decode limit, a long strip is bigger than that
+DECODE_LIMIT_MB = int(os.getenv("IMAGE_DECODE_LIMIT_MB", 2048))
+
+
+def tile_grid(rect: QRect, size: QSize, tile_size=TILE_SIZE):
+    """(tx, ty, tile rect) for every tile of a size-sized surface that intersects rect."""
+    rect = rect.intersected(QRect(0, 0, size.width(), size.height()))
+    if rect.isEmpty():
+        return
+    for ty in range(rect.top() // tile_size, rect.bottom() // tile_size + 1):
+        for tx in range(rect.left() // tile_size, rect.right() // tile_size + 1):
+            x, y = tx * tile_size, ty * tile_size
+            yield tx, ty, QRect(x, y, min(tile_size, size.width() - x), min(tile_size, size.height() - y))
+
+
+class TileCache():
+    """LRU of QPixmaps bounded by their total size in bytes."""
+    def __init__(self, max_bytes=TILE_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._tiles = OrderedDict()
+
+    def get(self, key):
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+        return tile
+
+    def put(self, key, tile):
+        old = self._tiles.pop(key, None)
+        if old is not None:
+            self.bytes -= old.width() * old.height() * 4
+        self._tiles[key] = tile
+        self.bytes += tile.width() * tile.height() * 4
+        while self.bytes > self.max_bytes and len(self._tiles) > 1:
+            _, evicted = self._tiles.popitem(last=False)
+            self.bytes -= evicted.width() * evicted.height() * 4
+
+    def clear(self):
+        self._tiles.clear()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._tiles)
+
+
+class TiledPage():
+    def __init__(self, path, tile_size=TILE_SIZE, cache=None):
+        self.path = path
+        self.tile_size = tile_size
+        self.tiles = cache if cache is not None else TileCache()
+        self._image = None
+        self._scale = None
+        reader = QImageReader(path)
+        self._size = reader.size()
+        if not self._size.isValid() and reader.canRead():
+            # Format without the size in its header, decode now
+            self._decode()
+
+    def isNull(self):
+        return not self._size.isValid() or self._size.isEmpty()
+
+    def width(self):
+        return self._size.width()
+
+    def height(self):
+        return self._size.height()
+
+    def size(self):
+        return QSize(self._size)
+
+    def display_size(self, scale):
+        return QSize(int(self.width() * scale), int(self.height() * scale))
+
+    def _decode(self):
+        previous_limit = QImageReader.allocationLimit()
+        QImageReader.setAllocationLimit(DECODE_LIMIT_MB)
+        try:
+            with timer("image_decode_display"):
+                image = QImageReader(self.path).read()
+        finally:
+            QImageReader.setAllocationLimit(previous_limit)
+        if image.isNull():
+            image = QImage(max(self.width(), 1), max(self.height(), 1), QImage.Format.Format_RGB32)
+            image.fill(Qt.GlobalColor.white)
+        self._image = image
+        self._size = image.size()
+        return image
+
+    def tile(self, scale, tx, ty, rect):
+        """The display tile (tx, ty) at zoom 'scale', rect being its display rect."""
+        if scale != self._scale:
+            # Tiles of another zoom level won't be shown again soon
+            self.tiles.clear()
+            self._scale = scale
+        key = (tx, ty)
+        tile = self.tiles.get(key)
+        if tile is None:
+            source = self._image if self._image is not None else self._decode()
+            image = QImage(rect.size(), QImage.Format.Format_ARGB32_Premultiplied)
+            image.fill(Qt.GlobalColor.transparent)
+            painter = QPainter(image)
+            painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+            painter.drawImage(
+                QRectF(0, 0, rect.width(), rect.height()),
+                source,
+                QRectF(rect.x() / scale, rect.y() / scale, rect.width() / scale, rect.height() / scale),
+            )
+            painter.end()
+            tile = QPixmap.fromImage(image)
+            self.tiles.put(key, tile)
+        return tile
+
+    def draw(self, painter, rect, scale):
+        """Paint the part of the page inside rect (display coordinates at zoom 'scale')."""
+        if self.isNull():
+            return
+        for tx, ty, tile_rect in tile_grid(rect, self.display_size(scale), self.tile_size):
+            painter.drawPixmap(tile_rect.topLeft(), self.tile(scale, tx, ty, tile_rect))
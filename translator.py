@@ -1,6 +1,13 @@
 import deepl
 
 TARGET = "EN"
+SOURCE_LANGUAGES = {"Chinese": "ZH", "Japanese": "JA"}
+
+def translator_version(engine_name):
+    """
+    What translates the text of 'engine_name' (an OCR engine), as recorded in the job manifest.
+    """
+    return f"deepl:{SOURCE_LANGUAGES.get(engine_name, engine_name)}-{TARGET}"
 
 def translate_japanese(text):
     """
@@ -1,28 +1,116 @@
+import threading
+import numpy as np
 from ultralytics import YOLO
+from cacheUtils import LRUCache, file_signature
+from geometricOrder import load_gray, xy_cut, WHITE_LEVEL
+from metrics import timed
+from modelManager import MODELS
 
 class BoxDetection():
   def __init__(self, model="bubble.pt"):
     self.model_path = f"./model/{model}"
-    self.model = YOLO(self.model_path)
+    # Loaded on first use and dropped again when idle, see modelManager.py
+    self.model = MODELS.register(f"bubble {self.model_path}", lambda: YOLO(self.model_path))
+    # YOLO isn't thread-safe; the window, its OCR jobs and the chapter queue share one detector
+    self._lock = threading.Lock()
   
+  @timed("bubble_detect")
   def predict(self, image=None, *, conf =0.5, iou =0.4 ) -> tuple:
-    results = self.model(image, conf=conf, iou=iou)
+    with self._lock, self.model.use() as model:
+      results = model(image, conf=conf, iou=iou)
     detections = results[0].boxes
     output = []
     for box in detections:
       output.append([int(x) for x in box.xyxy[0].tolist()])
     return output
+
+class GutterPanelDetection():
+  """
+  Model-free panel splitter for clean layouts with white gutters.
+  Works on a small grayscale copy of the page (row/column projection profiles)
+  and reports how much it trusts its own split, so callers can fall back to YOLO.
+  """
+  def __init__(self, work_size=256, min_panel_area=0.02):
+    self.work_size = work_size
+    self.min_panel_area = min_panel_area  # fraction of the page
+
+  @timed("panel_gutter")
+  def predict_with_confidence(self, image):
+    gray, _ = load_gray(image, self.work_size)
+    ink = gray < WHITE_LEVEL
+    h, w = ink.shape
+    rects = xy_cut(ink, min_gutter=2, min_panel=8)
+    if len(rects) < 2:
+      return [], 0.0
+
+    areas = np.array([pw * ph for _, _, pw, ph in rects], dtype=np.float64)
+    if areas.min() < self.min_panel_area * w * h:
+      return [], 0.0
+
+    # Panels should cover most of the inked page...
+    rows = np.flatnonzero(ink.any(axis=1))
+    cols = np.flatnonzero(ink.any(axis=0))
+    content = (rows[-1] - rows[0] + 1) * (cols[-1] - cols[0] + 1)
+    coverage = min(1.0, areas.sum() / content)
+
+    # ...and have drawn borders: ink along the outer ring of each rect
+    border = []
+    for x, y, pw, ph in rects:
+      sub = ink[y:y + ph, x:x + pw]
+      ring = np.concatenate((sub[:2].any(axis=0), sub[-2:].any(axis=0),
+                             sub[:, :2].any(axis=1), sub[:, -2:].any(axis=1)))
+      border.append(ring.mean())
+    confidence = float(min(coverage, np.mean(border)))
+
+    panels = [[(x + pw / 2) / w, (y + ph / 2) / h, pw / w, ph / h] for x, y, pw, ph in rects]
+    return panels, confidence
+
+  def predict(self, image=None):
+    panels, _ = self.predict_with_confidence(image)
+    return panels
   
 class PanelDetection():
-  def __init__(self, model="panel.pt"):
+  def __init__(self, model="panel.pt", fast_path=True, min_confidence=0.85):
     self.model_path = f"./model/{model}"
-    self.model = YOLO(self.model_path)
-  
-  def predict(self, image=None ):
-    results = self.model(image)
+    # YOLO is only loaded once a page actually needs it (and dropped when idle)
+    self.model = MODELS.register(f"panels {self.model_path}", lambda: YOLO(self.model_path))
+    self._lock = threading.Lock()  # one YOLO call at a time, as in BoxDetection
+    # Panels per page file, keyed by (path, mtime, size)
+    self.cache = LRUCache(max_entries=1024)
+    self.gutter_detector = GutterPanelDetection() if fast_path else None
+    self.min_confidence = min_confidence
+    self.fast_hits = 0
+    self.model_calls = 0
+
+  @timed("panel_yolo")
+  def _yolo_predict(self, image):
+    with self._lock, self.model.use() as model:
+      self.model_calls += 1
+      results = model(image)
     detections = results[0].boxes.xywhn
     output = []
     for i in range(len(detections)):
       output.append(detections[i].tolist())
     return output
-  
\ No newline at end of file
+  
+  @timed("panel_detect")
+  def predict(self, image=None ):
+    key = file_signature(image) if isinstance(image, str) else None
+    if key is not None:
+      cached = self.cache.get(key)
+      if cached is not None:
+        return [list(panel) for panel in cached]
+    output = None
+    if self.gutter_detector is not None:
+      try:
+        panels, confidence = self.gutter_detector.predict_with_confidence(image)
+      except (OSError, ValueError):
+        panels, confidence = [], 0.0
+      if confidence >= self.min_confidence:
+        self.fast_hits += 1
+        output = panels
+    if output is None:
+      output = self._yolo_predict(image)
+    if key is not None:
+      self.cache.put(key, [tuple(panel) for panel in output])
+    return output